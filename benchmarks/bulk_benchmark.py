@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Scaling benchmark for bulk_schedule
+Plans an organization of generated users over a span of weeks, first in this
+process one user after another and then through the process pool at several
+worker counts, and reports users per second and speedup over the serial run.
+
+Usage: python benchmarks/bulk_benchmark.py [--users 200] [--weeks 13] [--workers 1,2,4,8]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bulk_schedule import generate_schedules, plan_user, validate_specs  # noqa: E402
+from scheduler_engine import DAY_NAMES, DEFAULT_TASKS, PREFERRED_WINDOWS  # noqa: E402
+
+TYPES = list(PREFERRED_WINDOWS)
+
+
+def random_users(count, seed):
+    """Users with the default week plus a few tasks and work days of their own"""
+    rng = random.Random(seed)
+    users = []
+    for index in range(count):
+        extra = [
+            {'title': f'Task {index}.{number}', 'duration': rng.choice([30, 45, 60, 90]),
+             'type': rng.choice(TYPES), 'deadline': rng.randrange(1, 5)}
+            for number in range(rng.randrange(5, 25))
+        ]
+        users.append({
+            'user': f'user{index}@example.com',
+            'tasks': DEFAULT_TASKS + extra,
+            'work_days': rng.choice([None, DAY_NAMES[:5], DAY_NAMES[1:6]]),
+        })
+    return validate_specs(users)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--weeks', type=int, default=13)
+    parser.add_argument('--workers', default='1,2,4,8', help='comma-separated pool sizes')
+    args = parser.parse_args()
+
+    specs = random_users(args.users, seed=42)
+    start = date(2026, 1, 4)
+    print(f"🏢 Planning {args.users} users over {args.weeks} weeks ({os.cpu_count()} cores)\n")
+
+    began = time.perf_counter()
+    sessions = sum(len(day['sessions']) for spec in specs for day in plan_user(spec, start, args.weeks)['schedule'])
+    serial = time.perf_counter() - began
+    print(f"   {'serial, in process':<22} {serial:7.2f}s  {args.users / serial:8.1f} users/s  "
+          f"{sessions} sessions")
+
+    for workers in [int(value) for value in args.workers.split(',')]:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Start the workers before timing
+            list(executor.map(abs, range(workers)))
+            began = time.perf_counter()
+            first = None
+            results = 0
+            for result in generate_schedules(specs, args.weeks, start, executor=executor):
+                assert result['success'], result
+                results += 1
+                first = first or time.perf_counter() - began
+            elapsed = time.perf_counter() - began
+        print(f"   {f'{workers} workers':<22} {elapsed:7.2f}s  {results / elapsed:8.1f} users/s  "
+              f"speedup {serial / elapsed:4.1f}x  first result {first * 1000:6.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Dashboard reload benchmark for the HTTP response cache
+Times a month of /api/get-calendar-events served cold (built and serialized),
+from the response cache, and revalidated with If-None-Match, plus the index page,
+and reports the bytes each sends. Runs against an in-process fake Calendar API.
+
+Usage: python benchmarks/dashboard_benchmark.py [--events 2000] [--runs 50]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# Configuration is read at import time, so it has to be in place before the app loads
+_workdir = tempfile.mkdtemp(prefix='schedule-bench-')
+os.environ.setdefault('SCHEDULE_STORE_PATH', os.path.join(_workdir, 'schedules.db'))
+os.environ.setdefault('JOB_DB_PATH', os.path.join(_workdir, 'jobs.db'))
+os.environ.setdefault('TOKEN_DB_PATH', os.path.join(_workdir, 'tokens.db'))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import schedule_creator_app  # noqa: E402
+from fake_calendar import FakeCalendarService  # noqa: E402
+
+
+def timed(func, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        response = func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), response
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, default=2000, help='events on the fake calendar')
+    parser.add_argument('--runs', type=int, default=50)
+    args = parser.parse_args()
+
+    fake = FakeCalendarService(seed=1)
+    fake.seed_events(args.events, time.time(), days=30)
+    schedule_creator_app.calendar_service_pool.get_service = lambda user=None: fake
+    cache = schedule_creator_app.response_cache
+    client = schedule_creator_app.app.test_client()
+
+    today = time.strftime('%Y-%m-%d')
+    end = time.strftime('%Y-%m-%d', time.localtime(time.time() + 41 * 24 * 3600))
+    url = f'/api/get-calendar-events?start={today}&end={end}&timezone=UTC'
+    gzip = {'Accept-Encoding': 'gzip'}
+    etag = client.get(url, headers=gzip).headers['ETag']
+
+    def cold():
+        cache.discard(lambda key: True)
+        return client.get(url, headers=gzip)
+
+    page_etag = client.get('/', headers=gzip).headers['ETag']
+    cases = [
+        ('events, uncached', cold),
+        ('events, cached', lambda: client.get(url, headers=gzip)),
+        ('events, 304', lambda: client.get(url, headers={**gzip, 'If-None-Match': etag})),
+        ('index page', lambda: client.get('/', headers=gzip)),
+        ('index page, 304', lambda: client.get('/', headers={**gzip, 'If-None-Match': page_etag})),
+    ]
+
+    print(f"⏱️  Dashboard loads over {args.events} fake events ({args.runs} runs)\n")
+    for name, func in cases:
+        median, response = timed(func, args.runs)
+        print(f"   {name:<18} {response.status_code}  {median:7.2f}ms  {len(response.data):>8} bytes")
+    print(f"\n   {cache.get_stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,514 @@
+#!/usr/bin/env python3
+"""
+In-process fake of the Google Calendar v3 service
+Implements the parts of the googleapiclient service the app uses (events list,
+instances, insert, patch, delete, watch, channels stop, batch requests and
+freebusy) on an in-memory event table, with configurable per-call latency and
+injected quota errors, and counts every call. Recurring events (DAILY or WEEKLY
+RRULEs) are stored as one master and expanded for singleEvents lists and
+instances(); deleting an instance cancels that one occurrence. Watch channels
+deliver Google's push notification headers to a driver-supplied callback on
+every change
+"""
+
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+import pytz
+from googleapiclient.errors import HttpError
+from httplib2 import Response
+
+WEEKDAY_CODES = ['MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU']
+# Series without UNTIL or COUNT expand this far past the window start when no timeMax is
+# given; Google keeps expanding them without limit
+EXPANSION_DAYS = 730
+
+
+def _timestamp(value):
+    if 'dateTime' in value:
+        moment = datetime.fromisoformat(value['dateTime'].replace('Z', '+00:00'))
+        if moment.tzinfo is None:
+            moment = pytz.timezone(value.get('timeZone', 'UTC')).localize(moment)
+        return moment.timestamp()
+    return datetime.strptime(value['date'], '%Y-%m-%d').replace(tzinfo=timezone.utc).timestamp()
+
+
+def _param_timestamp(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+
+
+def _rule(event):
+    """The event's RRULE as a dict, or None when it does not recur"""
+    for line in event.get('recurrence') or ():
+        if line.startswith('RRULE:'):
+            return dict(part.split('=', 1) for part in line[len('RRULE:'):].split(';'))
+    return None
+
+
+def _zone(event):
+    # All-day dates are read as UTC days, like _timestamp does
+    return pytz.timezone(event['start'].get('timeZone', 'UTC')) if 'dateTime' in event['start'] else pytz.utc
+
+
+def _stamp_timestamp(value, zone):
+    """Epoch second of an RRULE UNTIL or instance ID stamp; a bare date is its first second"""
+    if 'T' not in value:
+        return zone.localize(datetime.strptime(value, '%Y%m%d')).timestamp()
+    moment = datetime.strptime(value.rstrip('Z'), '%Y%m%dT%H%M%S')
+    return (moment.replace(tzinfo=timezone.utc) if value.endswith('Z') else zone.localize(moment)).timestamp()
+
+
+def _occurrences(event, limit):
+    """Yield the start timestamps of a recurring event in order, up to and including `limit`"""
+    rule = _rule(event)
+    zone = _zone(event)
+    wall = datetime.fromtimestamp(_timestamp(event['start']), zone).replace(tzinfo=None)
+    until = float('inf')
+    if 'UNTIL' in rule:
+        # A date UNTIL includes the whole day
+        until = _stamp_timestamp(rule['UNTIL'], zone) + (0 if 'T' in rule['UNTIL'] else 24 * 3600 - 1)
+    count = int(rule.get('COUNT', 0))
+    interval = int(rule.get('INTERVAL', 1))
+    weekdays = {WEEKDAY_CODES.index(code[-2:]) for code in rule['BYDAY'].split(',')} if 'BYDAY' in rule else None
+    first_week = wall.date() - timedelta(days=wall.weekday())
+    day = wall.date()
+    produced = 0
+    while True:
+        start = zone.localize(datetime.combine(day, wall.time())).timestamp()
+        if start > min(until, limit) or (count and produced >= count):
+            return
+        if rule.get('FREQ') == 'WEEKLY':
+            matches = ((day - first_week).days // 7) % interval == 0 and day.weekday() in (weekdays or {wall.weekday()})
+        else:
+            matches = (day - wall.date()).days % interval == 0 and (weekdays is None or day.weekday() in weekdays)
+        if matches:
+            produced += 1
+            yield start
+        day += timedelta(days=1)
+
+
+def _starts(event, limit):
+    """_occurrences as a tuple, remembered on the event until it next changes"""
+    changed, cache = event.get('_starts') or (None, None)
+    if changed != event['_changed']:
+        cache = {}
+        event['_starts'] = (event['_changed'], cache)
+    if limit not in cache:
+        cache[limit] = tuple(_occurrences(event, limit))
+    return cache[limit]
+
+
+def _overlaps(event, time_min, time_max):
+    """Whether an event, or any occurrence of a series, overlaps [time_min, time_max); None is unbounded"""
+    rule = _rule(event)
+    if rule is None:
+        return ((time_min is None or _timestamp(event['end']) > time_min)
+                and (time_max is None or _timestamp(event['start']) < time_max))
+    start, end = _timestamp(event['start']), float('inf')
+    if 'UNTIL' in rule or 'COUNT' in rule:
+        starts = _starts(event, float('inf'))
+        end = (starts[-1] if starts else start) + _timestamp(event['end']) - start
+    return (time_min is None or end > time_min) and (time_max is None or start < time_max)
+
+
+def quota_error(retry_after=None):
+    """An HttpError shaped like Google's 403 rateLimitExceeded answer"""
+    headers = {'status': '403'}
+    if retry_after is not None:
+        headers['retry-after'] = str(retry_after)
+    content = json.dumps({'error': {'code': 403, 'message': 'Rate Limit Exceeded',
+                                    'errors': [{'reason': 'rateLimitExceeded'}]}}).encode('utf-8')
+    return HttpError(Response(headers), content)
+
+
+def not_found_error():
+    content = json.dumps({'error': {'code': 404, 'message': 'Not Found',
+                                    'errors': [{'reason': 'notFound'}]}}).encode('utf-8')
+    return HttpError(Response({'status': '404'}), content)
+
+
+class FakeRequest:
+    """Stands in for googleapiclient's HttpRequest: execute() runs the call"""
+
+    def __init__(self, calendar, method, func):
+        self.calendar = calendar
+        self.method = method
+        self.methodId = f'calendar.{method}'
+        self.func = func
+
+    def execute(self):
+        self.calendar._count(self.method, round_trip=True)
+        self.calendar._wait()
+        self.calendar._maybe_fail()
+        return self.func()
+
+
+class FakeBatch:
+    """Stands in for BatchHttpRequest: one round trip, a quota check per sub-request"""
+
+    def __init__(self, calendar, callback):
+        self.calendar = calendar
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id=None):
+        self.requests.append((request_id or str(len(self.requests)), request))
+
+    def execute(self, http=None):
+        self.calendar._count('batch', round_trip=True)
+        self.calendar._wait()
+        for request_id, request in self.requests:
+            self.calendar._count(request.method)
+            try:
+                self.calendar._maybe_fail()
+                response, exception = request.func(), None
+            except HttpError as e:
+                response, exception = None, e
+            self.callback(request_id, response, exception)
+
+
+class FakeEvents:
+    def __init__(self, calendar):
+        self.calendar = calendar
+
+    def list(self, calendarId='primary', **params):
+        return FakeRequest(self.calendar, 'events.list', lambda: self.calendar._list(calendarId, params))
+
+    def instances(self, calendarId='primary', eventId=None, **params):
+        return FakeRequest(self.calendar, 'events.instances',
+                           lambda: self.calendar._instances(calendarId, eventId, params))
+
+    def insert(self, calendarId='primary', body=None, **_):
+        return FakeRequest(self.calendar, 'events.insert', lambda: self.calendar._insert(calendarId, body))
+
+    def patch(self, calendarId='primary', eventId=None, body=None, **_):
+        return FakeRequest(self.calendar, 'events.patch', lambda: self.calendar._patch(calendarId, eventId, body))
+
+    def delete(self, calendarId='primary', eventId=None, **_):
+        return FakeRequest(self.calendar, 'events.delete', lambda: self.calendar._delete(calendarId, eventId))
+
+    def watch(self, calendarId='primary', body=None, **_):
+        return FakeRequest(self.calendar, 'events.watch', lambda: self.calendar._watch(calendarId, body))
+
+
+class FakeChannels:
+    def __init__(self, calendar):
+        self.calendar = calendar
+
+    def stop(self, body=None):
+        return FakeRequest(self.calendar, 'channels.stop', lambda: self.calendar._stop(body))
+
+
+class FakeFreebusy:
+    def __init__(self, calendar):
+        self.calendar = calendar
+
+    def query(self, body=None):
+        return FakeRequest(self.calendar, 'freebusy.query', lambda: self.calendar._freebusy(body))
+
+
+class FakeCalendarService:
+    """
+    Thread-safe fake Calendar service. latency is seconds per round trip (a batch is one
+    round trip); error_rate is the chance any single call fails with a 403 quota error.
+    notify(address, headers), when set, is called with the X-Goog-* headers of every
+    push notification a watch channel sends.
+    """
+
+    def __init__(self, latency=0.0, error_rate=0.0, retry_after=None, page_size=250, seed=None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.page_size = page_size
+        # API methods called (batch sub-requests included) and HTTP round trips made
+        self.calls = Counter()
+        self.round_trips = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        # calendar_id -> {event_id: event}
+        self._events = {}
+        # Every change bumps the sequence; sync tokens are sequence numbers
+        self._sequence = 0
+        # channel_id -> watch channel
+        self._channels = {}
+        # (query, sequence, matching events) of the last list, so its later pages are slices
+        self._last_list = (None, None, None)
+        self.notify = None
+
+    # googleapiclient service surface
+
+    def events(self):
+        return FakeEvents(self)
+
+    def freebusy(self):
+        return FakeFreebusy(self)
+
+    def channels(self):
+        return FakeChannels(self)
+
+    def new_batch_http_request(self, callback=None):
+        return FakeBatch(self, callback)
+
+    # Helpers for drivers
+
+    def seed_events(self, count, start, days=7, calendar_id='primary'):
+        """Add `count` one-hour events spread over `days` days from the epoch second `start`"""
+        for index in range(count):
+            begin = start + self._rng.randrange(days * 24) * 3600
+            self._insert(calendar_id, {
+                'summary': f'Seeded event {index}',
+                'start': {'dateTime': datetime.fromtimestamp(begin, timezone.utc).isoformat()},
+                'end': {'dateTime': datetime.fromtimestamp(begin + 3600, timezone.utc).isoformat()},
+            })
+
+    def event_count(self, calendar_id='primary'):
+        with self._lock:
+            return sum(1 for event in self._events.get(calendar_id, {}).values() if event['status'] != 'cancelled')
+
+    def watch_channels(self, calendar_id='primary'):
+        """Open, unexpired channels watching a calendar"""
+        now = time.time() * 1000
+        with self._lock:
+            return [dict(channel) for channel in self._channels.values()
+                    if channel['calendar_id'] == calendar_id and channel['expiration'] > now]
+
+    def reset_calls(self):
+        with self._lock:
+            self.calls.clear()
+            self.round_trips = 0
+
+    # Internals
+
+    def _count(self, method, round_trip=False):
+        with self._lock:
+            self.calls[method] += 1
+            self.round_trips += round_trip
+
+    def _wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _maybe_fail(self):
+        if self.error_rate:
+            with self._lock:
+                failed = self._rng.random() < self.error_rate
+            if failed:
+                with self._lock:
+                    self.calls['quota_errors'] += 1
+                raise quota_error(self.retry_after)
+
+    def _list(self, calendar_id, params):
+        with self._lock:
+            return self._list_locked(calendar_id, params)
+
+    def _list_locked(self, calendar_id, params):
+        query = (calendar_id, repr(sorted((name, value) for name, value in params.items() if name != 'pageToken')))
+        if self._last_list[:2] != (query, self._sequence):
+            self._last_list = (query, self._sequence, self._matching(calendar_id, params))
+        return self._page(self._last_list[2], params)
+
+    def _matching(self, calendar_id, params):
+        events = sorted(self._events.get(calendar_id, {}).values(), key=lambda event: event['_order'])
+        sync_token = params.get('syncToken')
+        time_min = _param_timestamp(params['timeMin']) if params.get('timeMin') and not sync_token else None
+        time_max = _param_timestamp(params['timeMax']) if params.get('timeMax') and not sync_token else None
+        if sync_token:
+            events = [event for event in events if event['_changed'] > int(sync_token)]
+        else:
+            events = [event for event in events if event['status'] != 'cancelled']
+        if params.get('singleEvents'):
+            # An incremental sync reports every occurrence of a changed series, cancelled ones too
+            events = [instance for event in events
+                      for instance in self._expand(event, time_min, time_max, bool(sync_token))]
+        if time_min is not None or time_max is not None:
+            events = [event for event in events if _overlaps(event, time_min, time_max)]
+        for condition in params.get('privateExtendedProperty') or []:
+            name, _, value = condition.partition('=')
+            events = [event for event in events
+                      if event.get('extendedProperties', {}).get('private', {}).get(name) == value]
+        if params.get('q'):
+            query = params['q'].lower()
+            events = [event for event in events if query in event.get('summary', '').lower()]
+        return events
+
+    def _instances(self, calendar_id, event_id, params):
+        with self._lock:
+            master = self._events.get(calendar_id, {}).get(event_id)
+            if master is None or master['status'] == 'cancelled' or _rule(master) is None:
+                raise not_found_error()
+            time_min = _param_timestamp(params['timeMin']) if params.get('timeMin') else None
+            time_max = _param_timestamp(params['timeMax']) if params.get('timeMax') else None
+            return self._page(self._expand(master, time_min, time_max, False), params)
+
+    def _expand(self, event, time_min, time_max, include_cancelled):
+        """The occurrences of a recurring event overlapping [time_min, time_max); other events as they are"""
+        if _rule(event) is None:
+            return [event]
+        duration = _timestamp(event['end']) - _timestamp(event['start'])
+        low = time_min if time_min is not None else _timestamp(event['start'])
+        high = time_max if time_max is not None else low + EXPANSION_DAYS * 24 * 3600
+        instances = []
+        for start in _starts(event, high):
+            if start + duration <= low or start >= high:
+                continue
+            instance = self._instance(event, start, duration)
+            if include_cancelled or instance['status'] != 'cancelled':
+                instances.append(instance)
+        return instances
+
+    @staticmethod
+    def _instance(master, start, duration):
+        zone = _zone(master)
+        all_day = 'date' in master['start']
+
+        def moment(seconds):
+            if all_day:
+                return {'date': time.strftime('%Y-%m-%d', time.gmtime(seconds))}
+            return {'dateTime': datetime.fromtimestamp(seconds, zone).isoformat(), 'timeZone': zone.zone}
+
+        stamp = time.strftime('%Y%m%d' if all_day else '%Y%m%dT%H%M%SZ', time.gmtime(start))
+        instance = {name: value for name, value in master.items() if name not in ('id', 'recurrence', '_starts')}
+        instance.update(id=f"{master['id']}_{stamp}", recurringEventId=master['id'], originalStartTime=moment(start),
+                        start=moment(start), end=moment(start + duration))
+        if start in master.get('_cancelled', ()):
+            instance['status'] = 'cancelled'
+        return instance
+
+    def _page(self, events, params):
+        sequence = self._sequence
+        offset = int(params.get('pageToken') or 0)
+        size = min(int(params.get('maxResults') or self.page_size), self.page_size)
+        page = events[offset:offset + size]
+        result = {'items': [self._public(event) for event in page]}
+        if offset + size < len(events):
+            result['nextPageToken'] = str(offset + size)
+        else:
+            result['nextSyncToken'] = str(sequence)
+        return result
+
+    def _insert(self, calendar_id, body):
+        with self._lock:
+            self._sequence += 1
+            event = json.loads(json.dumps(body))
+            event.setdefault('id', uuid.uuid4().hex)
+            event.update(status='confirmed', _order=self._sequence, _changed=self._sequence)
+            self._events.setdefault(calendar_id, {})[event['id']] = event
+            result = self._public(event)
+        self._notify_watchers(calendar_id)
+        return result
+
+    def _patch(self, calendar_id, event_id, body):
+        with self._lock:
+            event = self._events.get(calendar_id, {}).get(event_id)
+            if event is None or event['status'] == 'cancelled':
+                raise not_found_error()
+            self._sequence += 1
+            event.update(json.loads(json.dumps(body)))
+            event['_changed'] = self._sequence
+            result = self._public(event)
+        self._notify_watchers(calendar_id)
+        return result
+
+    def _delete(self, calendar_id, event_id):
+        with self._lock:
+            event = self._events.get(calendar_id, {}).get(event_id)
+            if event is None and '_' in event_id:
+                # An occurrence of a series: cancel just that one
+                master_id, _, stamp = event_id.rpartition('_')
+                event = self._events.get(calendar_id, {}).get(master_id)
+                start = _stamp_timestamp(stamp, pytz.utc) if event and _rule(event) else None
+                if start is None or event['status'] == 'cancelled' or start in event.get('_cancelled', ()) \
+                        or start not in _occurrences(event, start):
+                    raise not_found_error()
+                self._sequence += 1
+                event.setdefault('_cancelled', set()).add(start)
+                event['_changed'] = self._sequence
+            elif event is None or event['status'] == 'cancelled':
+                raise not_found_error()
+            else:
+                self._sequence += 1
+                event.update(status='cancelled', _changed=self._sequence)
+        self._notify_watchers(calendar_id)
+        return ''
+
+    def _watch(self, calendar_id, body):
+        if not body or body.get('type') != 'web_hook' or not body.get('id') or not body.get('address'):
+            raise HttpError(Response({'status': '400'}), b'{"error": {"code": 400, "message": "Bad Request"}}')
+        ttl = int((body.get('params') or {}).get('ttl', 604800))
+        channel = {
+            'id': body['id'],
+            'calendar_id': calendar_id,
+            'resourceId': uuid.uuid5(uuid.NAMESPACE_URL, calendar_id).hex,
+            'address': body['address'],
+            'token': body.get('token'),
+            'expiration': int((time.time() + ttl) * 1000),
+            'messages': 0,
+        }
+        with self._lock:
+            self._channels[channel['id']] = channel
+        # Google confirms every new channel with a 'sync' message
+        self._deliver(channel, 'sync')
+        return {'kind': 'api#channel', 'id': channel['id'], 'resourceId': channel['resourceId'],
+                'resourceUri': f'https://www.googleapis.com/calendar/v3/calendars/{calendar_id}/events',
+                'token': channel['token'], 'expiration': str(channel['expiration'])}
+
+    def _stop(self, body):
+        with self._lock:
+            channel = self._channels.get((body or {}).get('id'))
+            if channel is None or channel['resourceId'] != body.get('resourceId'):
+                raise not_found_error()
+            del self._channels[channel['id']]
+        return ''
+
+    def _notify_watchers(self, calendar_id):
+        for channel in self.watch_channels(calendar_id):
+            self._deliver(channel, 'exists')
+
+    def _deliver(self, channel, state):
+        with self._lock:
+            channel = self._channels.get(channel['id'], channel)
+            channel['messages'] += 1
+            number = channel['messages']
+            self.calls['notifications'] += 1
+        if self.notify is None:
+            return
+        headers = {
+            'X-Goog-Channel-ID': channel['id'],
+            'X-Goog-Channel-Expiration': time.strftime('%a, %d %b %Y %H:%M:%S GMT',
+                                                       time.gmtime(channel['expiration'] / 1000)),
+            'X-Goog-Resource-ID': channel['resourceId'],
+            'X-Goog-Resource-URI': f"https://www.googleapis.com/calendar/v3/calendars/{channel['calendar_id']}/events",
+            'X-Goog-Resource-State': state,
+            'X-Goog-Message-Number': str(number),
+        }
+        if channel['token']:
+            headers['X-Goog-Channel-Token'] = channel['token']
+        self.notify(channel['address'], headers)
+
+    def _freebusy(self, body):
+        time_min, time_max = _param_timestamp(body['timeMin']), _param_timestamp(body['timeMax'])
+        calendars = {}
+        with self._lock:
+            for item in body.get('items', []):
+                busy = []
+                for event in [instance for event in self._events.get(item['id'], {}).values()
+                              if event['status'] != 'cancelled'
+                              for instance in self._expand(event, time_min, time_max, False)]:
+                    start, end = _timestamp(event['start']), _timestamp(event['end'])
+                    if start < time_max and end > time_min:
+                        busy.append({
+                            'start': datetime.fromtimestamp(max(start, time_min), timezone.utc).isoformat(),
+                            'end': datetime.fromtimestamp(min(end, time_max), timezone.utc).isoformat(),
+                        })
+                calendars[item['id']] = {'busy': sorted(busy, key=lambda period: period['start'])}
+        return {'kind': 'calendar#freeBusy', 'timeMin': body['timeMin'], 'timeMax': body['timeMax'],
+                'calendars': calendars}
+
+    @staticmethod
+    def _public(event):
+        return {name: value for name, value in event.items() if not name.startswith('_')}
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Load benchmark for the Flask endpoints against an in-process fake Calendar API
+Drives /api/create-schedule, /api/get-calendar-events and /api/auth/google at several
+concurrency levels and schedule sizes, and reports throughput, p50/p95/p99 latency,
+Calendar API calls per request and memory. Nothing touches the network.
+
+Usage: python benchmarks/load_benchmark.py [--scenario all|create|events|auth]
+           [--concurrency 1,4,16] [--requests 40] [--days 5,30] [--latency-ms 20]
+           [--error-rate 0.01] [--qps 8] [--trace-memory] [--json results.json]
+"""
+
+import argparse
+import json
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenario', choices=['all', 'create', 'events', 'auth'], default='all')
+    parser.add_argument('--concurrency', default='1,4,16', help='comma-separated thread counts')
+    parser.add_argument('--requests', type=int, default=40, help='requests per run')
+    parser.add_argument('--days', default='5,30', help='comma-separated schedule sizes in days')
+    parser.add_argument('--seed-events', type=int, default=500, help='events on the fake calendar')
+    parser.add_argument('--latency-ms', type=float, default=20, help='fake API round trip time')
+    parser.add_argument('--error-rate', type=float, default=0.01, help='chance of a quota error per call')
+    parser.add_argument('--qps', type=float, help='per-user rate limit (default: effectively unlimited)')
+    parser.add_argument('--trace-memory', action='store_true', help='report tracemalloc peak (slower)')
+    parser.add_argument('--json', help='also write the results to this file')
+    return parser.parse_args()
+
+
+args = parse_args()
+
+# Configuration is read at import time, so it has to be in place before the app loads
+_workdir = tempfile.mkdtemp(prefix='schedule-bench-')
+os.environ.setdefault('SCHEDULE_STORE_PATH', os.path.join(_workdir, 'schedules.db'))
+os.environ.setdefault('JOB_DB_PATH', os.path.join(_workdir, 'jobs.db'))
+os.environ.setdefault('TOKEN_DB_PATH', os.path.join(_workdir, 'tokens.db'))
+os.environ['CALENDAR_QPS'] = str(args.qps or 1e9)
+os.environ['CALENDAR_BURST'] = str(int(max(args.qps or 1e9, 50)))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import schedule_creator_app  # noqa: E402
+from calendar_client import calendar_client  # noqa: E402
+from calendar_service import calendar_service_manager  # noqa: E402
+from event_store import event_store  # noqa: E402
+from fake_calendar import FakeCalendarService  # noqa: E402
+from solver_benchmark import random_tasks  # noqa: E402
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def create_requests(count, days, run_id):
+    for index in range(count):
+        yield 'POST', '/api/create-schedule', {
+            # A fresh schedule name per request, so every save writes all of its events
+            'name': f'bench-{run_id}-{index}',
+            'days': days,
+            'tasks': random_tasks(days * 4, days, seed=index),
+            'max_daily_minutes': None,
+        }
+
+
+def events_requests(count, days, run_id):
+    for index in range(count):
+        # Every tenth dashboard load forces a resync
+        yield 'GET', '/api/get-calendar-events' + ('?refresh=1' if index % 10 == 0 else ''), None
+
+
+def auth_requests(count, days, run_id):
+    for _ in range(count):
+        yield 'GET', '/api/auth/google', None
+
+
+SCENARIOS = {
+    'create': ('/api/create-schedule', create_requests, True),
+    'events': ('/api/get-calendar-events', events_requests, False),
+    'auth': ('/api/auth/google', auth_requests, False),
+}
+
+
+def send(method, path, body):
+    client = schedule_creator_app.app.test_client()
+    start = time.perf_counter()
+    response = client.open(path, method=method, json=body)
+    elapsed = time.perf_counter() - start
+    data = response.get_json(silent=True) or {}
+    return elapsed, response.status_code < 400 and data.get('success', True) is not False
+
+
+def run(fake, scenario, days, concurrency, count, trace_memory):
+    _, make_requests, _ = SCENARIOS[scenario]
+    requests = list(make_requests(count, days, f'{days}d-c{concurrency}'))
+    fake.reset_calls()
+    before = calendar_client.get_stats()
+    if trace_memory:
+        tracemalloc.start()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = list(executor.map(lambda request: send(*request), requests))
+    wall = time.perf_counter() - start
+
+    peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    if trace_memory:
+        tracemalloc.stop()
+    after = calendar_client.get_stats()
+    latencies = [elapsed * 1000 for elapsed, _ in outcomes]
+    calls = dict(fake.calls)
+    calls.pop('batch', None)
+    quota_errors = calls.pop('quota_errors', 0)
+    return {
+        'scenario': scenario,
+        'days': days if SCENARIOS[scenario][2] else None,
+        'concurrency': concurrency,
+        'requests': count,
+        'errors': sum(1 for _, ok in outcomes if not ok),
+        'throughput_rps': count / wall if wall else 0,
+        'p50_ms': percentile(latencies, 0.50),
+        'p95_ms': percentile(latencies, 0.95),
+        'p99_ms': percentile(latencies, 0.99),
+        'mean_ms': statistics.mean(latencies),
+        'api_calls': calls,
+        'api_calls_per_request': sum(calls.values()) / count,
+        'api_round_trips': fake.round_trips,
+        'quota_errors': quota_errors,
+        'retries': after['retries'] - before['retries'],
+        'throttled': after['throttled'] - before['throttled'],
+        'tracemalloc_peak_mb': peak / 2 ** 20 if peak is not None else None,
+        'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def main():
+    fake = FakeCalendarService(latency=args.latency_ms / 1000, error_rate=args.error_rate, retry_after=0, seed=1)
+    fake.seed_events(args.seed_events, time.time() - 24 * 3600, days=14)
+    calendar_service_manager.get_service = lambda: fake
+
+    scenarios = list(SCENARIOS) if args.scenario == 'all' else [args.scenario]
+    concurrencies = [int(value) for value in args.concurrency.split(',')]
+    sizes = [int(value) for value in args.days.split(',')]
+
+    print(f"🏋️  Load benchmark: fake API latency {args.latency_ms:g}ms, quota error rate {args.error_rate:.1%}, "
+          f"{args.requests} requests per run\n")
+    print(f"   {'scenario':<8} {'days':>4} {'conc':>4} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} "
+          f"{'err':>4} {'calls/req':>9} {'trips':>6} {'retry':>5} {'mem MB':>7}")
+
+    results = []
+    for scenario in scenarios:
+        for days in (sizes if SCENARIOS[scenario][2] else [None]):
+            for concurrency in concurrencies:
+                event_store.invalidate()
+                result = run(fake, scenario, days or 0, concurrency, args.requests, args.trace_memory)
+                results.append(result)
+                memory = result['tracemalloc_peak_mb'] if args.trace_memory else result['max_rss_mb']
+                print(f"   {scenario:<8} {days or '-':>4} {concurrency:>4} {result['throughput_rps']:>8.1f} "
+                      f"{result['p50_ms']:>6.1f}ms {result['p95_ms']:>6.1f}ms {result['p99_ms']:>6.1f}ms "
+                      f"{result['errors']:>4} {result['api_calls_per_request']:>9.1f} {result['api_round_trips']:>6} "
+                      f"{result['retries']:>5} {memory:>7.1f}")
+
+    print(f"\n   Fake calendar holds {fake.event_count()} events; memory column is "
+          f"{'tracemalloc peak' if args.trace_memory else 'process max RSS'}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"   Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for nlp_parser
+Parses a bulk text import of generated phrases cold (empty cache), warm (every
+phrase cached) and as a typical import where many lines repeat, then posts the
+same text to /api/parse through the Flask test client.
+
+Usage: python benchmarks/parser_benchmark.py [--lines 5000] [--unique 1000] [--runs 5]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import nlp_parser  # noqa: E402
+
+SUBJECTS = ['Team meeting', 'Code review', 'Gym', 'Lunch with Sam', 'Study session', 'Daily standup',
+            'Deep work', 'Call with the client', 'Write the quarterly report', 'Coffee break', 'Planning']
+WHEN = ['tomorrow', 'today', 'on Friday', 'next tuesday', '10/25', 'Nov 3', '2026-11-02', 'in 3 days', '']
+TIMES = ['at 9am', '2-3:30pm', 'from 9 to 11', 'at 7', '8:30-11:30am', 'at noon', 'in the evening', '']
+EXTRAS = ['for 90 min', 'for an hour', 'every Monday and Wednesday', 'weekdays', 'until Dec 1', 'for 3 weeks', '']
+
+
+def random_lines(count, unique, seed):
+    """count lines drawn from `unique` distinct phrases"""
+    rng = random.Random(seed)
+    phrases = [
+        ' '.join(part for part in (rng.choice(SUBJECTS), rng.choice(WHEN), rng.choice(TIMES), rng.choice(EXTRAS)) if part)
+        + f' #{index}'
+        for index in range(unique)
+    ]
+    return [phrases[index] if index < unique else rng.choice(phrases) for index in range(count)]
+
+
+def time_parse(text, today, runs, clear):
+    timings = []
+    for _ in range(runs):
+        if clear:
+            nlp_parser._parse_cached.cache_clear()
+        start = time.perf_counter()
+        events = nlp_parser.parse_text(text, today)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings, events
+
+
+def report(label, timings, lines):
+    median = statistics.median(timings)
+    print(f"   {label:<28} median {median:7.1f}ms  best {min(timings):7.1f}ms  "
+          f"{lines / median * 1000:>10,.0f} lines/s  {median / lines * 1000:6.1f}ms per 1000 lines")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lines', type=int, default=5000)
+    parser.add_argument('--unique', type=int, default=1000, help='distinct phrases among the lines')
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    today = date(2025, 10, 26)
+    unique = min(args.unique, args.lines)
+    distinct = '\n'.join(random_lines(unique, unique, seed=42))
+    bulk = '\n'.join(random_lines(args.lines, unique, seed=42))
+    print(f"⏱️  Parsing {args.lines} lines ({unique} distinct), cache size {nlp_parser.NLP_CACHE_SIZE}\n")
+
+    timings, events = time_parse(distinct, today, args.runs, clear=True)
+    report(f'cold, {unique} distinct', timings, unique)
+    timings, _ = time_parse(distinct, today, args.runs, clear=False)
+    report(f'warm, {unique} distinct', timings, unique)
+    timings, _ = time_parse(bulk, today, args.runs, clear=True)
+    report(f'bulk import, {args.lines} lines', timings, args.lines)
+    print(f"   {len(events)} events from {unique} lines, "
+          f"{sum(1 for event in events if 'repeat' in event)} repeating")
+
+    from schedule_creator_app import app
+    client = app.test_client()
+    timings = []
+    for _ in range(args.runs):
+        nlp_parser._parse_cached.cache_clear()
+        start = time.perf_counter()
+        response = client.post('/api/parse', json={'text': bulk, 'today': today.isoformat()})
+        timings.append((time.perf_counter() - start) * 1000)
+        assert response.get_json()['success']
+    report('POST /api/parse, bulk', timings, args.lines)
+
+
+if __name__ == '__main__':
+    main()
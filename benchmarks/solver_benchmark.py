@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Placement benchmark for scheduler_engine.solve
+Compares the solver's default week against the static week template it replaced,
+then times placement of a large random task set over a month.
+
+Usage: python benchmarks/solver_benchmark.py [--tasks 1000] [--days 30] [--runs 5]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conflicts import find_conflicts, schedule_intervals  # noqa: E402
+from scheduler_engine import (DEFAULT_BLOCKED, DEFAULT_TASKS, PREFERRED_WINDOWS,  # noqa: E402
+                              solve)
+
+# The hardcoded week create_optimized_schedule used to return: (day, start, end, type)
+STATIC_TEMPLATE = [
+    (0, '09:00', '10:15', 'high_cognitive'), (0, '10:30', '11:45', 'high_cognitive'),
+    (0, '14:00', '15:15', 'medium_cognitive'), (0, '15:30', '16:45', 'medium_cognitive'),
+    (1, '09:00', '10:15', 'high_cognitive'), (1, '10:30', '11:45', 'high_cognitive'),
+    (1, '14:00', '15:15', 'medium_cognitive'), (1, '15:30', '16:45', 'medium_cognitive'),
+    (2, '08:00', '13:00', 'learning'), (2, '14:00', '15:15', 'medium_cognitive'),
+    (2, '15:30', '16:45', 'medium_cognitive'), (2, '17:00', '18:15', 'low_cognitive'),
+    (3, '09:00', '10:15', 'high_cognitive'), (3, '10:30', '11:45', 'high_cognitive'),
+    (3, '13:00', '14:15', 'medium_cognitive'), (3, '14:30', '15:45', 'medium_cognitive'),
+    (4, '08:00', '13:00', 'learning'), (4, '14:00', '15:15', 'medium_cognitive'),
+    (4, '15:30', '16:45', 'low_cognitive'), (4, '17:00', '18:15', 'low_cognitive'),
+]
+
+TYPES = list(PREFERRED_WINDOWS)
+
+
+def static_schedule(sunday):
+    schedule = {}
+    for day, start, end, kind in STATIC_TEMPLATE:
+        day_schedule = schedule.setdefault(day, {'date': sunday + timedelta(days=day), 'sessions': []})
+        day_schedule['sessions'].append({'title': f'{kind} {start}', 'start': start, 'end': end, 'type': kind})
+    return [schedule[day] for day in sorted(schedule)]
+
+
+def evaluate(schedule):
+    """Quality metrics: sessions starting in their preferred window, overlaps, daily load spread"""
+    sessions = [session for day in schedule for session in day['sessions']]
+    preferred = sum(
+        1 for session in sessions
+        if session['type'] in PREFERRED_WINDOWS
+        and PREFERRED_WINDOWS[session['type']][0] <= session['start'] < PREFERRED_WINDOWS[session['type']][1]
+    )
+    daily_minutes = [
+        sum(int(s['end'][:2]) * 60 + int(s['end'][3:]) - int(s['start'][:2]) * 60 - int(s['start'][3:]) for s in day['sessions'])
+        for day in schedule
+    ]
+    return {
+        'sessions': len(sessions),
+        'preferred_ratio': preferred / len(sessions) if sessions else 0,
+        'overlaps': len(find_conflicts(schedule_intervals(schedule))),
+        'daily_minutes_stdev': statistics.pstdev(daily_minutes) if daily_minutes else 0,
+    }
+
+
+def random_tasks(count, days, seed):
+    rng = random.Random(seed)
+    return [
+        {
+            'title': f'Task {index}',
+            'duration': rng.choice([15, 30]),
+            'type': rng.choice(TYPES),
+            'deadline': rng.randrange(min(7, days - 1), days),
+        }
+        for index in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tasks', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    sunday = date(2025, 10, 26)
+    print("📊 Default week: static template vs solver\n")
+    solved, _ = solve(DEFAULT_TASKS, sunday, days=5)
+    for label, schedule in (('static template', static_schedule(sunday)), ('solver', solved)):
+        metrics = evaluate(schedule)
+        print(f"   {label:<16} sessions={metrics['sessions']:<3} preferred={metrics['preferred_ratio']:.0%} "
+              f"overlaps={metrics['overlaps']} daily stdev={metrics['daily_minutes_stdev']:.0f}min")
+
+    print(f"\n⏱️  Placing {args.tasks} tasks over {args.days} days ({args.runs} runs)\n")
+    tasks = random_tasks(args.tasks, args.days, seed=42)
+    timings = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        schedule, stats = solve(tasks, sunday, days=args.days, blocked=DEFAULT_BLOCKED,
+                                day_start='07:00', day_end='22:00', max_daily_minutes=None, buffer_minutes=0)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    metrics = evaluate(schedule)
+    print(f"   median {statistics.median(timings):.1f}ms, best {min(timings):.1f}ms")
+    print(f"   placed {stats['placed']}/{stats['tasks']}, late {stats['late']}, swaps {stats['swaps']}, "
+          f"preferred {metrics['preferred_ratio']:.0%}, overlaps {metrics['overlaps']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark for the Schedule Creator web application
+Measures import time of schedule_creator_app and time to the first authenticated
+request, with the eager Google client startup (FAST_STARTUP=0) and the lazy one
+that builds from the vendored discovery document (FAST_STARTUP=1).
+
+Each run happens in a fresh interpreter so nothing is cached between runs.
+A dummy, unexpired token is used so no network access is needed.
+
+Usage: python benchmarks/startup_benchmark.py [--runs 5]
+"""
+
+import argparse
+import base64
+import json
+import os
+import pickle
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timedelta
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MEASURE_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import schedule_creator_app
+imported = time.perf_counter()
+response = schedule_creator_app.app.test_client().get('/api/auth/google')
+first_request = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'first_request_ms': (first_request - imported) * 1000,
+    'time_to_first_request_ms': (first_request - start) * 1000,
+    'authenticated': response.get_json()['success'],
+}))
+"""
+
+
+def dummy_token():
+    """Return a base64 pickled credential that is valid for the next hour"""
+    from google.oauth2.credentials import Credentials
+
+    creds = Credentials(
+        token='benchmark-token',
+        refresh_token='benchmark-refresh',
+        token_uri='https://oauth2.googleapis.com/token',
+        client_id='benchmark',
+        client_secret='benchmark',
+        expiry=datetime.utcnow() + timedelta(hours=1)
+    )
+    return base64.b64encode(pickle.dumps(creds)).decode('ascii')
+
+
+def measure(fast_startup, token):
+    """Run one cold start in a subprocess and return its timings"""
+    env = dict(os.environ)
+    env.update({
+        'FAST_STARTUP': '1' if fast_startup else '0',
+        'GOOGLE_CREDENTIALS': 'benchmark',
+        'GOOGLE_TOKEN': token,
+        'PYTHONDONTWRITEBYTECODE': '1',
+    })
+    output = subprocess.run(
+        [sys.executable, '-c', MEASURE_SCRIPT],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='cold starts per mode')
+    args = parser.parse_args()
+
+    token = dummy_token()
+    print(f"🚀 Startup benchmark ({args.runs} cold starts per mode)\n")
+    print(f"{'mode':<22}{'import':>12}{'first request':>16}{'total':>12}")
+
+    for label, fast_startup in (('eager (before)', False), ('lazy + static (after)', True)):
+        runs = [measure(fast_startup, token) for _ in range(args.runs)]
+        if not all(run['authenticated'] for run in runs):
+            print(f"❌ {label}: dummy token was not accepted")
+            continue
+        print(f"{label:<22}"
+              f"{statistics.median(run['import_ms'] for run in runs):>10.1f}ms"
+              f"{statistics.median(run['first_request_ms'] for run in runs):>14.1f}ms"
+              f"{statistics.median(run['time_to_first_request_ms'] for run in runs):>10.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
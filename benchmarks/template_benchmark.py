@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Instantiation benchmark for schedule_templates
+Times expanding each day template over many days, and the same events through
+create_custom_schedule into the schedule format the calendar writer takes.
+
+Usage: python benchmarks/template_benchmark.py [--days 3650] [--runs 5]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import schedule_templates  # noqa: E402
+
+
+def timed(func, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, default=3650)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    from schedule_creator_app import ScheduleCreator
+    creator = ScheduleCreator()
+
+    print(f"⏱️  Instantiating templates over {args.days} days ({args.runs} runs)\n")
+    for template in schedule_templates.list_templates():
+        name = template['name']
+        median, events = timed(lambda: schedule_templates.instantiate(name, '2026-01-01', days=args.days), args.runs)
+        custom, schedule = timed(lambda: creator.create_custom_schedule(events), args.runs)
+        print(f"   {name:<20} {len(events):>7} events  instantiate {median:7.1f}ms "
+              f"({median / len(events) * 1000:5.2f}µs/event)  to schedule {custom:7.1f}ms  {len(schedule)} days")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Offline simulator for Calendar push notifications
+Runs the app against the in-process fake Calendar API with a webhook address
+configured. The fake posts Google's X-Goog-* notification headers to
+/webhooks/calendar on every change, optionally after a delivery delay, so the
+whole path can be exercised without a public https endpoint: opening the watch
+channel on the first dashboard load, resyncing on each change, serving idle
+dashboard loads with no Calendar API calls, renewing an expiring channel and
+rejecting notifications from stopped or forged channels.
+
+Usage: python benchmarks/webhook_simulator.py [--changes 20] [--idle-loads 50]
+           [--delivery-ms 0] [--latency-ms 20]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+# Configuration is read at import time, so it has to be in place before the app loads
+_workdir = tempfile.mkdtemp(prefix='schedule-webhook-')
+os.environ.setdefault('SCHEDULE_STORE_PATH', os.path.join(_workdir, 'schedules.db'))
+os.environ.setdefault('JOB_DB_PATH', os.path.join(_workdir, 'jobs.db'))
+os.environ.setdefault('TOKEN_DB_PATH', os.path.join(_workdir, 'tokens.db'))
+os.environ['CHANNEL_DB_PATH'] = os.path.join(_workdir, 'channels.db')
+os.environ.setdefault('CALENDAR_WEBHOOK_URL', 'https://schedule.example.test/webhooks/calendar')
+# Renewal is driven by the simulator, not the background thread
+os.environ['CHANNEL_RENEW_INTERVAL'] = str(24 * 3600)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import schedule_creator_app as app_module  # noqa: E402
+from fake_calendar import FakeCalendarService  # noqa: E402
+
+
+class Deliveries:
+    """Posts the fake's notifications to the app, like Google's push service would"""
+
+    def __init__(self, client, delay):
+        self.client = client
+        self.delay = delay
+        self.statuses = []
+        self._lock = threading.Lock()
+
+    def __call__(self, address, headers):
+        if self.delay:
+            threading.Timer(self.delay, self.post, (address, headers)).start()
+        else:
+            self.post(address, headers)
+
+    def post(self, address, headers):
+        response = self.client.post(urlsplit(address).path, headers=headers)
+        with self._lock:
+            self.statuses.append(response.status_code)
+
+
+def wait_until(condition, timeout=10):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            return False
+        time.sleep(0.001)
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--changes', type=int, default=20, help='calendar changes to push')
+    parser.add_argument('--idle-loads', type=int, default=50, help='dashboard loads with nothing changed')
+    parser.add_argument('--delivery-ms', type=float, default=0, help='delay before each notification is posted')
+    parser.add_argument('--latency-ms', type=float, default=20, help='fake API round trip time')
+    args = parser.parse_args()
+
+    fake = FakeCalendarService(latency=args.latency_ms / 1000, seed=1)
+    fake.seed_events(200, time.time(), days=7)
+    app_module.calendar_service_pool.get_service = lambda user=None: fake
+    client = app_module.app.test_client()
+    deliveries = Deliveries(app_module.app.test_client(), args.delivery_ms / 1000)
+    fake.notify = deliveries
+    channels = app_module.channel_store
+    event_store = app_module.event_store
+
+    def load():
+        response = client.get('/api/get-calendar-events')
+        assert response.status_code == 200 and response.get_json()['success'], response.data
+        return response.get_json()['events']
+
+    print(f"🔔 Webhook simulation: {args.changes} changes, {args.idle_loads} idle loads, "
+          f"delivery delay {args.delivery_ms:g}ms, fake API latency {args.latency_ms:g}ms\n")
+
+    load()
+    channel = channels.get('default')
+    print(f"   Watch channel {channel.channel_id[:8]}… opened on the first load, "
+          f"{fake.calls['events.list']} events.list calls for the initial sync")
+
+    # Nothing changed: loads are answered from the cache without asking Google
+    fake.reset_calls()
+    for _ in range(args.idle_loads):
+        load()
+    print(f"   {args.idle_loads} idle loads: {fake.calls['events.list']} events.list calls")
+
+    # Every change is pushed, resynced in the background and visible on the next load
+    fake.reset_calls()
+    delays = []
+    for index in range(args.changes):
+        version = event_store.version()
+        started = time.perf_counter()
+        fake.events().insert(calendarId='primary', body={
+            'summary': f'Pushed change {index}',
+            'start': {'dateTime': time.strftime('%Y-%m-%dT%H:00:00Z', time.gmtime(time.time() + 3600))},
+            'end': {'dateTime': time.strftime('%Y-%m-%dT%H:00:00Z', time.gmtime(time.time() + 7200))},
+        }).execute()
+        if not wait_until(lambda: event_store.version() != version):
+            print(f"❌ Change {index} was never resynced")
+            return 1
+        delays.append((time.perf_counter() - started) * 1000)
+        titles = {event['title'] for event in load()}
+        if f'Pushed change {index}' not in titles:
+            print(f"❌ Change {index} missing from the dashboard")
+            return 1
+    delays.sort()
+    print(f"   {args.changes} changes: all visible on the next load, resynced in "
+          f"{delays[len(delays) // 2]:.1f}ms median / {delays[-1]:.1f}ms max after the change, "
+          f"{fake.calls['events.list']} events.list calls")
+
+    # An expiring channel is replaced, and the old one stopped
+    old = channels.get('default')
+    # As if the channel's lifetime had nearly run out
+    margin, channels.renew_margin = channels.renew_margin, old.expiration - time.time() + 60
+    channels.renew_due(app_module.calendar_service_pool.get_service)
+    channels.renew_margin = margin
+    new = channels.get('default')
+    assert new.channel_id != old.channel_id and len(fake.watch_channels()) == 1
+    print(f"   Channel renewed before expiry: {old.channel_id[:8]}… stopped, {new.channel_id[:8]}… watching")
+
+    # Stale and forged notifications are turned away without a resync
+    before = app_module.resync_queue.get_stats()['queued']
+    headers = {'X-Goog-Channel-ID': old.channel_id, 'X-Goog-Channel-Token': old.token,
+               'X-Goog-Resource-ID': old.resource_id, 'X-Goog-Resource-State': 'exists'}
+    stale = client.post('/webhooks/calendar', headers=headers).status_code
+    forged = client.post('/webhooks/calendar', headers={**headers, 'X-Goog-Channel-ID': new.channel_id}).status_code
+    assert app_module.resync_queue.get_stats()['queued'] == before
+    print(f"   Notification from the stopped channel: {stale}, with a wrong token: {forged}")
+
+    wait_until(lambda: not app_module.resync_queue.get_stats()['pending'])
+    accepted = sum(1 for status in deliveries.statuses if status < 300)
+    # Without a delivery delay a channel's 'sync' message arrives before watch() has returned
+    # its resource ID, and is turned away; it never carries a change
+    print(f"\n   Notifications posted {len(deliveries.statuses)}, accepted {accepted}")
+    print(f"   Channels {channels.get_stats()}")
+    print(f"   Resyncs  {app_module.resync_queue.get_stats()}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Bulk calendar cleanup
+Finds every event in a date range that matches a title, session type or app tag
+filter, following all result pages, and deletes the matches with batched requests.
+A recurring series is deleted whole when all of it falls inside the range; otherwise
+only its occurrences inside the range are cancelled
+
+Usage:
+    python bulk_delete.py --start 2025-10-01 --end 2025-10-31 --app-only --dry-run
+    python bulk_delete.py --start 2025-10-26 --end 2025-10-27 --title "Deep Work"
+"""
+
+import argparse
+from datetime import datetime, timedelta, timezone
+
+from calendar_batch import execute_batch
+from calendar_client import calendar_client
+from schedule_sync import APP_TAG
+from timezones import DEFAULT_TIMEZONE, date_range, event_seconds, get_zone
+
+PAGE_SIZE = 2500
+
+
+def _matches(event, title, session_type):
+    if title and title.lower() not in event.get('summary', '').lower():
+        return False
+    if session_type:
+        tagged = event.get('extendedProperties', {}).get('private', {}).get('sessionType')
+        # Events written before tagging only carry the type in their description
+        if tagged != session_type and f"Session Type: {session_type}" not in event.get('description', ''):
+            return False
+    return True
+
+
+def _series_end(event):
+    """Epoch second of a series' last possible start from its RRULE UNTIL, or None without one"""
+    for line in event.get('recurrence', ()):
+        if not line.startswith('RRULE:'):
+            continue
+        until = dict(part.split('=', 1) for part in line[len('RRULE:'):].split(';')).get('UNTIL')
+        if until is None:
+            # Open-ended, or bounded by COUNT: treated as reaching past any range
+            return None
+        zone = get_zone(event['start'].get('timeZone') or 'UTC')
+        if 'T' not in until:
+            # A date UNTIL includes that whole day
+            return zone.localize(datetime.strptime(until, '%Y%m%d') + timedelta(days=1)).timestamp() - 1
+        moment = datetime.strptime(until.rstrip('Z'), '%Y%m%dT%H%M%S')
+        if until.endswith('Z'):
+            return moment.replace(tzinfo=timezone.utc).timestamp()
+        return zone.localize(moment).timestamp()
+    return None
+
+
+def _list_pages(request, params):
+    """Every item of a list-style call, following nextPageToken"""
+    items = []
+    while True:
+        result = calendar_client.execute(request(**params))
+        items.extend(result.get('items', []))
+        params['pageToken'] = result.get('nextPageToken')
+        if not params['pageToken']:
+            return items
+
+
+def find_events(service, time_min, time_max, title=None, session_type=None, app_only=False,
+                schedule_name=None, calendar_id='primary'):
+    """
+    Return every event in [time_min, time_max) matching the filters, across all pages.
+
+    A recurring series is returned as its master event when every occurrence overlaps
+    the range, and as its occurrences inside the range otherwise, so deleting the
+    result never touches anything outside the range.
+    """
+    params = {
+        'calendarId': calendar_id,
+        'timeMin': time_min,
+        'timeMax': time_max,
+        # Series come back as one master event instead of every occurrence
+        'singleEvents': False,
+        'maxResults': PAGE_SIZE,
+    }
+    # Let the API do as much of the filtering as it can
+    private = []
+    if app_only or schedule_name:
+        private.append(f'app={APP_TAG}')
+    if schedule_name:
+        private.append(f'scheduleName={schedule_name}')
+    if private:
+        params['privateExtendedProperty'] = private
+    if title:
+        params['q'] = title
+
+    events = [event for event in _list_pages(service.events().list, params) if _matches(event, title, session_type)]
+    range_start = event_seconds({'dateTime': time_min})
+    range_end = event_seconds({'dateTime': time_max})
+
+    matches = []
+    # Occurrences already covered by a master that is deleted or expanded below
+    covered = set()
+    for event in events:
+        if 'recurrence' not in event:
+            continue
+        series_end = _series_end(event)
+        if (event_seconds(event['start']) >= range_start and series_end is not None
+                and series_end < range_end):
+            matches.append(event)
+        else:
+            instances = _list_pages(service.events().instances, {
+                'calendarId': calendar_id,
+                'eventId': event['id'],
+                'timeMin': time_min,
+                'timeMax': time_max,
+                'maxResults': PAGE_SIZE,
+            })
+            matches.extend(instance for instance in instances if _matches(instance, title, session_type))
+        covered.add(event['id'])
+
+    # Single events, and moved or edited occurrences of series that did not match themselves
+    matches.extend(
+        event for event in events
+        if 'recurrence' not in event and event.get('recurringEventId') not in covered
+    )
+    matches.sort(key=lambda event: event_seconds(event['start']))
+    return matches
+
+
+def bulk_delete(service, time_min, time_max, title=None, session_type=None, app_only=False,
+                schedule_name=None, dry_run=False, calendar_id='primary', get_service=None):
+    """
+    Delete the matching events with batched requests.
+
+    Returns {'matched': [...], 'deleted': count, 'failed': [...], 'dry_run': bool}; with
+    dry_run nothing is deleted and 'matched' lists what would be.
+    """
+    events = find_events(service, time_min, time_max, title, session_type, app_only, schedule_name, calendar_id)
+    matched = [
+        {
+            'id': event['id'],
+            'title': event.get('summary', 'Untitled'),
+            'start': event['start'].get('dateTime', event['start'].get('date')),
+            'series': 'recurrence' in event,
+        }
+        for event in events
+    ]
+    report = {'matched': matched, 'deleted': 0, 'failed': [], 'dry_run': dry_run}
+    if dry_run or not events:
+        return report
+
+    requests = [
+        (event['id'], service.events().delete(calendarId=calendar_id, eventId=event['id']))
+        for event in events
+    ]
+    deleted, failed = execute_batch(service, requests, get_service=get_service)
+    report['deleted'] = len(deleted)
+    report['failed'] = [{'id': event_id, 'error': str(error)} for event_id, error in failed.items()]
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Delete calendar events in a date range in bulk',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    parser.add_argument('--start', required=True, help='first day, YYYY-MM-DD')
+    parser.add_argument('--end', required=True, help='last day (inclusive), YYYY-MM-DD')
+    parser.add_argument('--title', help='only events whose title contains this text')
+    parser.add_argument('--type', dest='session_type', help='only sessions of this type, e.g. high_cognitive')
+    parser.add_argument('--app-only', action='store_true', help='only events created by this app')
+    parser.add_argument('--schedule-name', help='only events of this app schedule')
+    parser.add_argument('--timezone', default=DEFAULT_TIMEZONE)
+    parser.add_argument('--dry-run', action='store_true', help='list matches without deleting')
+    args = parser.parse_args()
+
+    from calendar_service import calendar_service_manager
+
+    service = calendar_service_manager.get_service()
+    if not service:
+        print("❌ Google Calendar not authenticated")
+        return 1
+
+    time_min, time_max = date_range(args.start, args.end, args.timezone)
+    report = bulk_delete(service, time_min, time_max, args.title, args.session_type,
+                         args.app_only, args.schedule_name, args.dry_run,
+                         get_service=calendar_service_manager.get_service)
+
+    print(f"\n🗑️  {len(report['matched'])} matching events between {args.start} and {args.end}\n")
+    for event in report['matched']:
+        print(f"   {event['start']}  {event['title']}{'  (whole series)' if event['series'] else ''}")
+    if args.dry_run:
+        print("\n   Dry run - nothing deleted")
+    else:
+        print(f"\n   ✅ Deleted {report['deleted']} events")
+        for failure in report['failed']:
+            print(f"   ❌ {failure['id']}: {failure['error']}")
+    return 1 if report['failed'] else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
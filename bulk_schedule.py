@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Bulk schedule generation
+Plans many users over many weeks in one go. Each user's weeks are solved in a
+worker process, so planning a whole organization spreads across every core, and
+each user's plan is handed back as soon as it is done rather than when the whole
+batch is
+
+Usage:
+    python bulk_schedule.py users.json --weeks 13 > plans.ndjson
+    cat users.ndjson | python bulk_schedule.py - --start 2026-01-04 --workers 8
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+from scheduler_engine import MAX_PLAN_WEEKS, plan_weeks, week_start
+from timezones import DEFAULT_TIMEZONE, get_zone, local_today
+
+# Worker processes per app worker; defaults to one per core
+BULK_WORKERS = int(os.environ.get('BULK_WORKERS', 0)) or os.cpu_count() or 1
+MAX_BULK_USERS = int(os.environ.get('MAX_BULK_USERS', 1000))
+
+# Per-user options passed through to plan_weeks
+SPEC_OPTIONS = ('tasks', 'days', 'blocked', 'work_days', 'max_daily_minutes')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Process pool shared by this process's bulk requests, started on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Forking a threaded server can hand the children locks held by other threads
+            _executor = ProcessPoolExecutor(max_workers=BULK_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+        return _executor
+
+
+def _discard_executor(executor):
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+
+
+def validate_specs(specs):
+    """Return the user specs as plain dicts of the options plan_weeks reads, or raise ValueError"""
+    if not isinstance(specs, list) or not specs:
+        raise ValueError('users must be a non-empty list')
+    if len(specs) > MAX_BULK_USERS:
+        raise ValueError(f'At most {MAX_BULK_USERS} users per request')
+    seen = set()
+    validated = []
+    for number, spec in enumerate(specs, 1):
+        if not isinstance(spec, dict) or not spec.get('user'):
+            raise ValueError(f'User {number}: expected an object with a "user" id')
+        user = str(spec['user'])
+        if user in seen:
+            raise ValueError(f'User {number}: duplicate id {user!r}')
+        seen.add(user)
+        if spec.get('timezone'):
+            get_zone(spec['timezone'])
+        if spec.get('tasks') is not None and not isinstance(spec['tasks'], list):
+            raise ValueError(f'User {number}: tasks must be a list')
+        validated.append({'user': user, 'timezone': spec.get('timezone'),
+                          **{name: spec[name] for name in SPEC_OPTIONS if name in spec}})
+    return validated
+
+
+def plan_user(spec, start, weeks):
+    """Worker entry point: one user's plan over `weeks` weeks from start, ready for JSON"""
+    started = time.perf_counter()
+    schedule, stats = plan_weeks(spec, start, weeks)
+    for day in schedule:
+        day['date'] = day['date'].isoformat()
+    return {
+        'user': spec['user'],
+        'success': True,
+        'start': start.isoformat(),
+        'weeks': weeks,
+        'schedule': schedule,
+        'stats': stats,
+        'seconds': round(time.perf_counter() - started, 4),
+    }
+
+
+def generate_schedules(specs, weeks=1, start=None, timezone=DEFAULT_TIMEZONE, executor=None):
+    """
+    Submit every user to the worker pool and return an iterator of their plans in
+    completion order.
+
+    Plans start on the Sunday of the week containing start, by default the current
+    week in the user's own timezone (or `timezone`). A user whose plan fails comes
+    back as {'user', 'success': False, 'error'}. Closing the iterator early cancels
+    the users not yet started.
+    """
+    if not 1 <= weeks <= MAX_PLAN_WEEKS:
+        raise ValueError(f"weeks must be between 1 and {MAX_PLAN_WEEKS}")
+    pool = executor or get_executor()
+    futures = {}
+    for spec in specs:
+        first = week_start(start or local_today(spec.get('timezone') or timezone))
+        futures[pool.submit(plan_user, spec, first, weeks)] = spec['user']
+    return _completed(futures, pool, shared=executor is None)
+
+
+def _completed(futures, pool, shared):
+    try:
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except BrokenProcessPool as e:
+                # A worker died; the next request starts a fresh pool
+                if shared:
+                    _discard_executor(pool)
+                yield {'user': futures[future], 'success': False, 'error': f'Worker process failed: {e}'}
+            except Exception as e:
+                yield {'user': futures[future], 'success': False, 'error': str(e)}
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def read_specs(path):
+    """Load user specs from a JSON array or NDJSON file ('-' for stdin)"""
+    from event_import import iter_json_records, read_chunks
+
+    stream = sys.stdin if path == '-' else open(path, encoding='utf-8')
+    try:
+        specs = []
+        for number, value in iter_json_records(read_chunks(stream)):
+            if isinstance(value, Exception):
+                raise ValueError(f'Record {number}: {value}')
+            specs.append(value)
+        return specs
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Generate schedules for many users over many weeks in parallel',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    parser.add_argument('path', help='user specs as a JSON array or NDJSON, or - for stdin')
+    parser.add_argument('--weeks', type=int, default=1)
+    parser.add_argument('--start', help='a day in the first week, YYYY-MM-DD (default: this week)')
+    parser.add_argument('--timezone', default=DEFAULT_TIMEZONE, help="for users without their own")
+    parser.add_argument('--workers', type=int, default=BULK_WORKERS)
+    args = parser.parse_args()
+
+    try:
+        specs = validate_specs(read_specs(args.path))
+        start = datetime.strptime(args.start, '%Y-%m-%d').date() if args.start else None
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+
+    started = time.perf_counter()
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        for result in generate_schedules(specs, args.weeks, start, args.timezone, executor):
+            failed += not result['success']
+            print(json.dumps(result, ensure_ascii=False), flush=True)
+            if not result['success']:
+                print(f"❌ {result['user']}: {result['error']}", file=sys.stderr)
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ Planned {len(specs) - failed}/{len(specs)} users over {args.weeks} weeks "
+          f"in {elapsed:.2f}s with {args.workers} workers", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
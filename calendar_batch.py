@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Batch helpers for the Google Calendar API
+Groups individual API requests into batch HTTP calls and retries failed sub-requests
+"""
+
+import functools
+import time
+
+from calendar_client import backoff_delay, calendar_client, is_retryable
+from calendar_fanout import FANOUT_CONCURRENCY, fan_out
+
+# The Calendar API accepts at most 50 calls in a single batch request
+BATCH_LIMIT = 50
+
+
+def _execute_chunk(service, chunk, client, user, get_service=None):
+    """Send one batch request and return a list of (key, request, response, exception)"""
+    outcome = {}
+    # httplib2 is not thread-safe: a chunk sent from a fan-out thread uses that thread's connection
+    http = getattr(get_service(), '_http', None) if get_service else None
+
+    def callback(request_id, response, exception):
+        outcome[int(request_id)] = (response, exception)
+
+    batch = service.new_batch_http_request(callback=callback)
+    for index, (_, http_request) in enumerate(chunk):
+        batch.add(http_request, request_id=str(index))
+
+    try:
+        # Every sub-request counts against the user's quota
+        client.call(lambda: batch.execute(http=http), user, cost=len(chunk), name='batch')
+    except Exception as e:
+        # The batch call itself failed, so every sub-request in it failed
+        return [(key, http_request, None, e) for key, http_request in chunk]
+
+    results = []
+    for index, (key, http_request) in enumerate(chunk):
+        response, exception = outcome.get(index, (None, RuntimeError('No response in batch')))
+        results.append((key, http_request, response, exception))
+    return results
+
+
+def execute_batch(service, requests, max_retries=None, on_result=None, client=calendar_client, user=None,
+                  get_service=None, concurrency=FANOUT_CONCURRENCY):
+    """
+    Execute (key, HttpRequest) pairs through batch HTTP requests of up to BATCH_LIMIT calls.
+
+    Batches go through the shared client's rate limiter and concurrency cap. Only
+    sub-requests that failed with a retryable error are sent again, after a jittered
+    backoff that honours Retry-After. Returns (results, errors): dicts mapping each key
+    to its response or to the exception of its final attempt. on_result(key, response,
+    exception) is called once per key as soon as its final outcome is known.
+
+    With get_service (returning the calling thread's service), up to `concurrency`
+    batch requests are in flight at once; otherwise they go out one after another.
+    """
+    if max_retries is None:
+        max_retries = client.max_retries
+    results = {}
+    errors = {}
+    pending = list(requests)
+    attempt = 0
+
+    while pending:
+        retry = []
+        retry_errors = []
+
+        def collect(index, outcomes):
+            if isinstance(outcomes, Exception):
+                raise outcomes
+            for key, http_request, response, exception in outcomes:
+                if exception is None:
+                    results[key] = response
+                else:
+                    client.record_error(exception)
+                    if attempt < max_retries and is_retryable(exception):
+                        retry.append((key, http_request))
+                        retry_errors.append(exception)
+                        continue
+                    errors[key] = exception
+                    client.record_final_failures(1)
+                if on_result:
+                    on_result(key, response, exception)
+
+        chunks = [pending[start:start + BATCH_LIMIT] for start in range(0, len(pending), BATCH_LIMIT)]
+        fan_out(
+            [functools.partial(_execute_chunk, service, chunk, client, user, get_service) for chunk in chunks],
+            limit=concurrency if get_service else 1,
+            on_done=collect
+        )
+
+        pending = retry
+        if pending:
+            attempt += 1
+            client.record_retries(len(pending))
+            print(f"🔄 Retrying {len(pending)} failed calendar requests (attempt {attempt}/{max_retries})...")
+            time.sleep(backoff_delay(attempt, retry_errors))
+
+    return results, errors
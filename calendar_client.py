@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Rate-limit-aware execution of Google Calendar API requests
+Every request goes through a per-user token bucket and a bounded concurrency pool,
+and rate-limited or transient failures are retried with jittered exponential
+backoff that honours Retry-After
+"""
+
+import contextvars
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from metrics import span
+
+# Per-user request rate (requests/second) and burst size
+CALENDAR_QPS = float(os.environ.get('CALENDAR_QPS', 8))
+CALENDAR_BURST = int(os.environ.get('CALENDAR_BURST', 50))
+# Requests allowed in flight at once across the whole worker
+CALENDAR_MAX_CONCURRENCY = int(os.environ.get('CALENDAR_MAX_CONCURRENCY', 8))
+CALENDAR_MAX_RETRIES = int(os.environ.get('CALENDAR_MAX_RETRIES', 5))
+
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 32
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+RATE_LIMIT_REASONS = {'rateLimitExceeded', 'userRateLimitExceeded'}
+RETRYABLE_REASONS = RATE_LIMIT_REASONS | {'backendError'}
+
+# User whose quota the calls of the current request or job are charged to
+current_user = contextvars.ContextVar('calendar_user', default='default')
+
+
+@contextmanager
+def acting_as(user):
+    """Charge Calendar API calls made inside the block to `user`"""
+    token = current_user.set(user or 'default')
+    try:
+        yield
+    finally:
+        current_user.reset(token)
+
+
+def error_status(exception):
+    """Return the HTTP status of a failed request, or None for transport errors"""
+    resp = getattr(exception, 'resp', None)
+    return int(getattr(resp, 'status', 0) or 0) if resp is not None else None
+
+
+def error_reason(exception):
+    """Return the Google error reason (e.g. 'rateLimitExceeded') of an HttpError, if any"""
+    content = getattr(exception, 'content', None)
+    if not content:
+        return None
+    try:
+        if isinstance(content, bytes):
+            content = content.decode('utf-8')
+        errors = json.loads(content).get('error', {}).get('errors', [])
+        return errors[0].get('reason') if errors else None
+    except (ValueError, AttributeError):
+        return None
+
+
+def is_rate_limited(exception):
+    """Return True if Google throttled the request"""
+    status = error_status(exception)
+    return status == 429 or (status == 403 and error_reason(exception) in RATE_LIMIT_REASONS)
+
+
+def is_retryable(exception):
+    """Return True if a failed request is worth sending again"""
+    status = error_status(exception)
+    if status is None:
+        # Transport level failure (socket error, timeout) - the request never got an answer
+        return True
+    if status in RETRYABLE_STATUSES:
+        return True
+    return status == 403 and error_reason(exception) in RETRYABLE_REASONS
+
+
+def retry_after(exception):
+    """Return the Retry-After delay in seconds sent with a failed request, if any"""
+    resp = getattr(exception, 'resp', None)
+    value = resp.get('retry-after') if hasattr(resp, 'get') else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def backoff_delay(attempt, exceptions=()):
+    """Seconds to wait before retry number `attempt` (1-based), honouring any Retry-After"""
+    requested = [delay for delay in (retry_after(e) for e in exceptions) if delay is not None]
+    if requested:
+        return min(max(requested), BACKOFF_MAX_SECONDS)
+    # Full jitter spreads retries from many threads instead of synchronising them
+    return random.uniform(0, min(BACKOFF_BASE_SECONDS * 2 ** attempt, BACKOFF_MAX_SECONDS))
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `rate` tokens per second"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """Block until `tokens` may be spent and return the seconds spent waiting"""
+        waited = 0.0
+        # Costs above the bucket size wait for a full bucket and then go into debt
+        needed = min(tokens, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= needed:
+                    self._tokens -= tokens
+                    return waited
+                delay = (needed - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class CalendarApiClient:
+    """Shared gatekeeper for Calendar API calls: rate limiting, concurrency cap, retries and counters"""
+
+    def __init__(self, rate=CALENDAR_QPS, burst=CALENDAR_BURST,
+                 max_concurrency=CALENDAR_MAX_CONCURRENCY, max_retries=CALENDAR_MAX_RETRIES):
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._stats = {
+            'requests': 0,
+            'throttled': 0,
+            'retries': 0,
+            'failures': 0,
+            'rate_limit_wait_seconds': 0.0,
+        }
+
+    def bucket(self, user):
+        with self._lock:
+            if user not in self._buckets:
+                self._buckets[user] = TokenBucket(self.rate, self.burst)
+            return self._buckets[user]
+
+    def call(self, func, user=None, cost=1, name='request'):
+        """Run func() once under the user's rate limit (default: the current user) and the concurrency cap"""
+        waited = self.bucket(user or current_user.get()).acquire(cost)
+        with self._lock:
+            self._stats['requests'] += cost
+            self._stats['rate_limit_wait_seconds'] += waited
+        with self._slots, span(f'google_api:{name}'):
+            return func()
+
+    def execute(self, http_request, user=None):
+        """Execute one API request, retrying throttled and transient failures"""
+        attempt = 0
+        while True:
+            try:
+                # googleapiclient requests carry their API method, e.g. calendar.events.list
+                return self.call(http_request.execute, user, name=getattr(http_request, 'methodId', None) or 'request')
+            except Exception as e:
+                self.record_error(e)
+                if attempt >= self.max_retries or not is_retryable(e):
+                    with self._lock:
+                        self._stats['failures'] += 1
+                    raise
+                attempt += 1
+                self.record_retries(1)
+                time.sleep(backoff_delay(attempt, [e]))
+
+    def record_error(self, exception):
+        if is_rate_limited(exception):
+            with self._lock:
+                self._stats['throttled'] += 1
+
+    def record_retries(self, count):
+        with self._lock:
+            self._stats['retries'] += count
+
+    def record_final_failures(self, count):
+        with self._lock:
+            self._stats['failures'] += count
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['users'] = len(self._buckets)
+            return stats
+
+
+# Shared by every Calendar API call made by this worker process
+calendar_client = CalendarApiClient()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Concurrent fan-out of blocking Calendar API work
+Runs independent calls (batch chunks, freebusy queries) concurrently with
+asyncio.gather under a semaphore. googleapiclient is blocking, so each call runs
+on a shared thread pool; completion callbacks run one at a time on the event loop
+"""
+
+import asyncio
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Calls in flight at once per fan-out; CalendarApiClient still caps the whole worker
+FANOUT_CONCURRENCY = int(os.environ.get('CALENDAR_FANOUT_CONCURRENCY', 4))
+FANOUT_THREADS = int(os.environ.get('CALENDAR_FANOUT_THREADS', 32))
+
+_executor = ThreadPoolExecutor(max_workers=FANOUT_THREADS, thread_name_prefix='calendar-fanout')
+
+
+async def gather_calls(calls, limit=FANOUT_CONCURRENCY, on_done=None):
+    """
+    Run the zero-argument callables concurrently, at most `limit` at a time, and return
+    their results in order (exceptions are returned, not raised). on_done(index, result)
+    is called as each one finishes. Each call sees the caller's context variables.
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def run(index, call):
+        async with semaphore:
+            try:
+                # run_in_executor does not carry context variables over to the thread
+                context = contextvars.copy_context()
+                result = await loop.run_in_executor(_executor, context.run, call)
+            except Exception as e:
+                result = e
+        if on_done:
+            on_done(index, result)
+        return result
+
+    return await asyncio.gather(*(run(index, call) for index, call in enumerate(calls)))
+
+
+def fan_out(calls, limit=FANOUT_CONCURRENCY, on_done=None):
+    """Blocking wrapper around gather_calls for synchronous callers"""
+    calls = list(calls)
+    if len(calls) <= 1 or limit <= 1:
+        # Nothing to overlap: skip the event loop
+        results = []
+        for index, call in enumerate(calls):
+            try:
+                result = call()
+            except Exception as e:
+                result = e
+            if on_done:
+                on_done(index, result)
+            results.append(result)
+        return results
+    return asyncio.run(gather_calls(calls, limit, on_done))
@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+"""
+Process-wide Google Calendar service manager
+Loads credentials once per worker, refreshes them before they expire and hands out
+ready-to-use Calendar service objects without rebuilding them on every request
+
+The Google client libraries are imported on first use and the service is built from
+the vendored discovery document in discovery/, so importing this module is cheap.
+Set FAST_STARTUP=0 to import the Google stack eagerly and discover through build().
+
+Regenerate the vendored document with: python calendar_service.py --vendor-discovery
+"""
+
+import base64
+import io
+import json
+import os
+import pickle
+import sys
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from datetime import datetime
+
+FAST_STARTUP = os.environ.get('FAST_STARTUP', '1') != '0'
+DISCOVERY_DOC_PATH = os.environ.get(
+    'CALENDAR_DISCOVERY_DOC',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'discovery', 'calendar.v3.json')
+)
+
+if not FAST_STARTUP:
+    import google.auth.transport.requests  # noqa: F401
+    import googleapiclient.discovery  # noqa: F401
+
+# Refresh the access token this many seconds before it expires
+REFRESH_MARGIN_SECONDS = int(os.environ.get('TOKEN_REFRESH_MARGIN', 300))
+# Wait this long before trying again after a failed background refresh
+REFRESH_RETRY_SECONDS = 60
+# Signed-in users whose credentials are kept in memory per worker, and how long an idle one stays
+CALENDAR_POOL_SIZE = int(os.environ.get('CALENDAR_POOL_SIZE', 256))
+CALENDAR_POOL_IDLE_SECONDS = int(os.environ.get('CALENDAR_POOL_IDLE_SECONDS', 1800))
+# The deployment-wide token from GOOGLE_TOKEN / token.pickle
+DEFAULT_USER = 'default'
+
+
+def load_discovery_document(path=DISCOVERY_DOC_PATH):
+    """Return the vendored Calendar discovery document, or None if it is missing"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Static discovery document unavailable ({e}), falling back to build()")
+        return None
+
+
+def vendor_discovery_document(path=DISCOVERY_DOC_PATH):
+    """Write the discovery document bundled with googleapiclient, minus its docstrings"""
+    from googleapiclient.discovery_cache import get_static_doc
+
+    def strip_descriptions(node):
+        if isinstance(node, dict):
+            # Only drop free-text descriptions; schema properties may be named 'description'
+            return {key: strip_descriptions(value) for key, value in node.items()
+                    if not (key == 'description' and isinstance(value, str))}
+        if isinstance(node, list):
+            return [strip_descriptions(value) for value in node]
+        return node
+
+    document = strip_descriptions(json.loads(get_static_doc('calendar', 'v3')))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(document, f, separators=(',', ':'), sort_keys=True)
+    print(f"✅ Wrote Calendar discovery document revision {document.get('revision')} to {path}")
+
+
+_discovery = None
+_discovery_lock = threading.Lock()
+
+
+def build_calendar_service(creds):
+    """Build a Calendar service for creds from the shared parsed discovery document"""
+    global _discovery
+    try:
+        from googleapiclient.discovery import build, build_from_document
+
+        with _discovery_lock:
+            if _discovery is None and FAST_STARTUP:
+                _discovery = load_discovery_document()
+            if _discovery is None:
+                service = build('calendar', 'v3', credentials=creds)
+                _discovery = service._rootDesc
+                return service
+        return build_from_document(_discovery, credentials=creds)
+    except Exception as e:
+        print(f"Error building calendar service: {e}")
+        return None
+
+
+class CalendarServiceManager:
+    """
+    Caches credentials and Calendar service objects for the whole worker process.
+
+    The parsed discovery document and the credentials are shared by every thread.
+    Each thread gets its own service object because the underlying httplib2
+    connection is not thread-safe; building one from the cached document is cheap.
+    """
+
+    def __init__(self, refresh_margin=REFRESH_MARGIN_SECONDS):
+        self.refresh_margin = refresh_margin
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self._creds = None
+        self._generation = 0
+        self._refresh_timer = None
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'credential_loads': 0,
+            'service_builds': 0,
+            'refreshes': 0,
+            'refresh_failures': 0,
+        }
+
+    def get_service(self):
+        """Return a Calendar service for the current thread, or None if not authenticated"""
+        service = getattr(self._local, 'service', None)
+        if (service is not None and self._local.generation == self._generation
+                and self._creds is not None and self._creds.valid):
+            self._count('hits')
+            return service
+
+        with self._lock:
+            self._stats['misses'] += 1
+            creds = self._get_valid_credentials()
+            if not creds:
+                return None
+
+            service = build_calendar_service(creds)
+            if service is None:
+                return None
+            self._stats['service_builds'] += 1
+
+            self._local.service = service
+            self._local.generation = self._generation
+            return service
+
+    def invalidate(self):
+        """Drop cached credentials and services so the next call reloads them"""
+        with self._lock:
+            self._creds = None
+            self._generation += 1
+            self._cancel_refresh()
+
+    def get_stats(self):
+        """Return cache hit/miss and refresh counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['authenticated'] = self._creds is not None
+            stats['token_expiry'] = self._creds.expiry.isoformat() + 'Z' if self._creds and self._creds.expiry else None
+            return stats
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _get_valid_credentials(self):
+        """Return usable credentials, loading or refreshing them if needed (caller holds the lock)"""
+        if self._creds is None:
+            self._creds = self._load_credentials()
+            if self._creds is None:
+                return None
+            self._stats['credential_loads'] += 1
+            self._generation += 1
+
+        if not self._creds.valid:
+            if not (self._creds.expired and self._creds.refresh_token and self._refresh()):
+                print("No valid credentials found")
+                self._creds = None
+                return None
+
+        self._schedule_refresh()
+        return self._creds
+
+    def _load_credentials(self):
+        """Load pickled credentials from GOOGLE_TOKEN or token.pickle"""
+        creds = None
+
+        # Try to load credentials from environment variable (Railway)
+        creds_json_env = os.environ.get('GOOGLE_CREDENTIALS')
+        token_env = os.environ.get('GOOGLE_TOKEN')
+
+        if creds_json_env and token_env:
+            try:
+                print("Loading credentials from environment variables...")
+
+                # Remove quotes if present
+                if token_env.startswith('"') and token_env.endswith('"'):
+                    token_env = token_env[1:-1]
+
+                # Decode base64 token
+                token_data = base64.b64decode(token_env)
+                creds = pickle.load(io.BytesIO(token_data))
+                print("✅ Successfully loaded token from environment")
+                print(f"Token valid: {creds.valid if creds else None}")
+            except Exception as e:
+                print(f"❌ Error loading credentials from environment: {e}")
+                traceback.print_exc()
+                return None
+
+        # Check for existing token file
+        if not creds and os.path.exists('token.pickle'):
+            try:
+                print("Loading token from file...")
+                with open('token.pickle', 'rb') as token:
+                    creds = pickle.load(token)
+                print("✅ Successfully loaded token from file")
+            except Exception as e:
+                print(f"❌ Error loading token file: {e}")
+                return None
+
+        return creds
+
+    def _refresh(self):
+        """Refresh the access token in place (caller holds the lock)"""
+        from google.auth.transport.requests import Request
+
+        try:
+            print("🔄 Refreshing credentials...")
+            self._creds.refresh(Request())
+            self._stats['refreshes'] += 1
+            return True
+        except Exception as e:
+            print(f"Error refreshing credentials: {e}")
+            self._stats['refresh_failures'] += 1
+            return False
+
+    def _schedule_refresh(self, delay=None):
+        """Arrange a background refresh shortly before the token expires"""
+        if self._refresh_timer is not None or not self._creds or not self._creds.refresh_token:
+            return
+        if delay is None:
+            if not self._creds.expiry:
+                return
+            remaining = (self._creds.expiry - datetime.utcnow()).total_seconds()
+            delay = max(remaining - self.refresh_margin, 0)
+
+        self._refresh_timer = threading.Timer(delay, self._background_refresh)
+        self._refresh_timer.daemon = True
+        self._refresh_timer.start()
+
+    def _cancel_refresh(self):
+        if self._refresh_timer is not None:
+            self._refresh_timer.cancel()
+            self._refresh_timer = None
+
+    def _background_refresh(self):
+        with self._lock:
+            self._refresh_timer = None
+            if self._creds is None:
+                return
+            if self._refresh():
+                self._schedule_refresh()
+            else:
+                self._schedule_refresh(REFRESH_RETRY_SECONDS)
+
+
+# Shared by every request handled by this worker process
+calendar_service_manager = CalendarServiceManager()
+
+
+class _PooledUser:
+    """Credentials of one signed-in user plus the services threads have built for them"""
+
+    __slots__ = ('creds', 'stored_at', 'services', 'last_used', 'lock')
+
+    def __init__(self, creds, stored_at):
+        self.creds = creds
+        self.stored_at = stored_at
+        # One service per thread, as for the default manager; dropped with the entry
+        self.services = threading.local()
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()
+
+
+class CalendarServicePool:
+    """
+    Calendar services for many users, keyed by user ID.
+
+    Tokens live in a TokenStore shared across workers. The pool caches at most
+    max_users users in LRU order and drops entries idle for idle_seconds, so each
+    cached user costs one Credentials object plus a service per thread that served
+    them. Access tokens are refreshed on use when they are about to expire, and the
+    refreshed token is written back for the other workers. The 'default' user is the
+    deployment-wide token handled by CalendarServiceManager. With enabled=False only
+    the 'default' user is served and nobody can sign in.
+    """
+
+    def __init__(self, token_store, fallback=None, max_users=CALENDAR_POOL_SIZE,
+                 idle_seconds=CALENDAR_POOL_IDLE_SECONDS, refresh_margin=REFRESH_MARGIN_SECONDS, enabled=True):
+        self.token_store = token_store
+        self.enabled = enabled
+        self.fallback = fallback
+        self.max_users = max_users
+        self.idle_seconds = idle_seconds
+        self.refresh_margin = refresh_margin
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'refreshes': 0, 'refresh_failures': 0}
+
+    def get_service(self, user=DEFAULT_USER):
+        """Return a Calendar service for user on the current thread, or None if they are not signed in"""
+        if not user or user == DEFAULT_USER:
+            return self.fallback.get_service() if self.fallback else None
+        if not self.enabled:
+            return None
+
+        entry = self._entry(user)
+        if entry is None or not self._ensure_valid(user, entry):
+            return None
+
+        service = getattr(entry.services, 'service', None)
+        if service is None or entry.services.creds is not entry.creds:
+            service = build_calendar_service(entry.creds)
+            entry.services.service = service
+            entry.services.creds = entry.creds
+        return service
+
+    def sign_in(self, user, creds):
+        """Store a user's freshly authorized credentials"""
+        if not self.enabled:
+            raise RuntimeError('Signing in users is disabled')
+        self.token_store.save(user, creds.to_json())
+        self.forget(user)
+
+    def sign_out(self, user):
+        """Delete a user's stored token and drop their cached services"""
+        self.token_store.delete(user)
+        self.forget(user)
+
+    def forget(self, user):
+        with self._lock:
+            self._users.pop(user, None)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['cached_users'] = len(self._users)
+            stats['max_users'] = self.max_users
+        stats['stored_users'] = self.token_store.count()
+        return stats
+
+    def _entry(self, user):
+        now = time.monotonic()
+        with self._lock:
+            # Oldest entries sit at the front, so idle ones can be dropped from there
+            while self._users:
+                oldest, first = next(iter(self._users.items()))
+                if now - first.last_used <= self.idle_seconds:
+                    break
+                del self._users[oldest]
+                self._stats['evictions'] += 1
+
+            entry = self._users.get(user)
+            if entry is not None:
+                self._users.move_to_end(user)
+                entry.last_used = now
+                self._stats['hits'] += 1
+                return entry
+            self._stats['misses'] += 1
+
+        loaded = self._load(user)
+        if loaded is None:
+            return None
+        entry = _PooledUser(*loaded)
+
+        with self._lock:
+            entry = self._users.setdefault(user, entry)
+            self._users.move_to_end(user)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+                self._stats['evictions'] += 1
+        return entry
+
+    def _load(self, user):
+        """Return (Credentials, stored_at) from the token store, or None"""
+        row = self.token_store.get(user)
+        if not row:
+            return None
+        from google.oauth2.credentials import Credentials
+
+        token, stored_at = row
+        try:
+            return Credentials.from_authorized_user_info(json.loads(token)), stored_at
+        except (ValueError, KeyError) as e:
+            print(f"❌ Stored token for {user} is unusable: {e}")
+            return None
+
+    def _ensure_valid(self, user, entry):
+        """Refresh the user's access token if it expires within the margin"""
+        creds = entry.creds
+        if creds.valid and not self._expiring(creds):
+            return True
+
+        with entry.lock:
+            creds = entry.creds
+            if creds.valid and not self._expiring(creds):
+                # Another thread refreshed while we waited
+                return True
+            # Another worker may already have refreshed and stored a newer token
+            loaded = self._load(user)
+            if loaded and loaded[1] > entry.stored_at and loaded[0].valid and not self._expiring(loaded[0]):
+                entry.creds, entry.stored_at = loaded
+                return True
+            if not creds.refresh_token:
+                return creds.valid
+
+            from google.auth.transport.requests import Request
+
+            try:
+                creds.refresh(Request())
+            except Exception as e:
+                print(f"Error refreshing credentials for {user}: {e}")
+                with self._lock:
+                    self._stats['refresh_failures'] += 1
+                return creds.valid
+            # Services built on these credentials pick up the new access token as they are
+            self.token_store.save(user, creds.to_json())
+            entry.stored_at = time.time()
+            with self._lock:
+                self._stats['refreshes'] += 1
+            return True
+
+    def _expiring(self, creds):
+        return creds.expiry is not None and (creds.expiry - datetime.utcnow()).total_seconds() < self.refresh_margin
+
+
+if __name__ == '__main__':
+    if '--vendor-discovery' in sys.argv:
+        vendor_discovery_document()
+    else:
+        print("Usage: python calendar_service.py --vendor-discovery")
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Schedule conflict detection
+Finds sessions that overlap each other or overlap events already on the calendar
+with a sorted sweep line, O((n + m) log(n + m) + k) for n sessions, m events and
+k reported conflicts
+"""
+
+import heapq
+
+from timezones import DEFAULT_TIMEZONE, event_minutes, schedule_minutes
+
+PROPOSED = 0
+EXISTING = 1
+
+
+def schedule_intervals(schedule, timezone=DEFAULT_TIMEZONE):
+    """Return (start, end, session info) in epoch minutes for every session of a schedule"""
+    starts, ends = schedule_minutes(schedule, timezone)
+    infos = []
+    for day_schedule in schedule:
+        date_str = day_schedule['date'].strftime('%Y-%m-%d')
+        infos.extend(
+            {'title': session['title'], 'date': date_str, 'start': session['start'], 'end': session['end']}
+            for session in day_schedule['sessions']
+        )
+    return list(zip(starts, ends, infos))
+
+
+def event_intervals(events, timezone=DEFAULT_TIMEZONE):
+    """Return (start, end, event) in epoch minutes for calendar events with ISO 'start'/'end' strings"""
+    intervals = []
+    for event in events:
+        # All-day events cover the local day
+        start = {'dateTime' if 'T' in event['start'] else 'date': event['start']}
+        end = {'dateTime' if 'T' in event['end'] else 'date': event['end']}
+        intervals.append((event_minutes(start, timezone), event_minutes(end, timezone), event))
+    return intervals
+
+
+def find_conflicts(proposed, existing=()):
+    """
+    Return conflicts between proposed intervals and between proposed and existing ones.
+
+    Both arguments are lists of (start, end, info) in the same time unit. Intervals are half-open, so a
+    session ending at 10:00 does not conflict with one starting at 10:00. Each conflict
+    is {'type': 'internal' | 'calendar', 'session': info, 'conflicts_with': info}.
+    """
+    sweep = [(start, end, PROPOSED, index) for index, (start, end, _) in enumerate(proposed)]
+    sweep.extend((start, end, EXISTING, index) for index, (start, end, _) in enumerate(existing))
+    sweep.sort()
+
+    # Min-heaps by end time of the intervals still open at the sweep position
+    active = ([], [])
+    conflicts = []
+
+    for start, end, kind, index in sweep:
+        if end <= start:
+            continue
+        for heap in active:
+            while heap and heap[0][0] <= start:
+                heapq.heappop(heap)
+
+        if kind == PROPOSED:
+            for _, other in active[PROPOSED]:
+                conflicts.append({
+                    'type': 'internal',
+                    'session': proposed[other][2],
+                    'conflicts_with': proposed[index][2],
+                })
+            for _, other in active[EXISTING]:
+                conflicts.append({
+                    'type': 'calendar',
+                    'session': proposed[index][2],
+                    'conflicts_with': existing[other][2],
+                })
+        else:
+            for _, other in active[PROPOSED]:
+                conflicts.append({
+                    'type': 'calendar',
+                    'session': proposed[other][2],
+                    'conflicts_with': existing[index][2],
+                })
+
+        heapq.heappush(active[kind], (end, index))
+
+    return conflicts
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Streaming import of large custom event sets
+Reads events as NDJSON (one object per line) or as a JSON array, validates each one
+as it arrives and writes them to the calendar in bounded batches, so memory stays
+flat and the first events land before the whole upload has been read
+
+Usage:
+    python event_import.py plan.ndjson --name q1-plan
+    cat plan.json | python event_import.py - --name q1-plan --validate-only
+"""
+
+import argparse
+import codecs
+import json
+import os
+import sys
+from datetime import datetime
+
+from schedule_sync import event_key, session_event, sync_events, tag_event
+from timeslots import format_minutes, parse_hhmm
+from timezones import DEFAULT_TIMEZONE, date_range, session_minutes
+
+# Events written per sync; a multiple of the 50-call batch limit
+IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', 250))
+# Invalid rows listed in the report; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+READ_SIZE = 64 * 1024
+# Longest single record; a bigger one (or one that never ends) stops the import
+MAX_RECORD_BYTES = int(os.environ.get('IMPORT_MAX_RECORD_BYTES', 1024 * 1024))
+
+_decoder = json.JSONDecoder()
+
+
+def iter_json_records(chunks):
+    """
+    Yield (record_number, value) from an iterable of text or byte chunks holding either
+    NDJSON or a single JSON array. Values that fail to parse are yielded as ValueError
+    and skipped. A record longer than MAX_RECORD_BYTES is yielded as ValueError and
+    ends the stream, since where it ends cannot be known without holding all of it.
+    """
+    buffer = ''
+    in_array = None
+    number = 0
+    # Chunk boundaries may split a multi-byte character
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    for chunk in chunks:
+        buffer += utf8.decode(chunk) if isinstance(chunk, bytes) else chunk
+        if in_array is None:
+            buffer = buffer.lstrip()
+            if not buffer:
+                continue
+            in_array = buffer.startswith('[')
+            if in_array:
+                buffer = buffer[1:]
+
+        if not in_array:
+            *lines, buffer = buffer.split('\n')
+            for line in lines:
+                if line.strip():
+                    number += 1
+                    yield number, _parse_line(line)
+        else:
+            position = 0
+            while True:
+                while position < len(buffer) and buffer[position] in ', \t\r\n':
+                    position += 1
+                if buffer.startswith(']', position):
+                    return
+                try:
+                    value, position_after = _decoder.raw_decode(buffer, position)
+                except ValueError as e:
+                    end = _element_end(buffer, position)
+                    if end < 0:
+                        # Incomplete value: wait for more input
+                        break
+                    # The element is all here and still does not parse: report it, go on after it
+                    number += 1
+                    # A stray closing brace is the whole element
+                    position = max(end, position + 1)
+                    yield number, ValueError(f'Invalid JSON: {e.msg}')
+                    continue
+                if position_after == len(buffer):
+                    # A number may go on in the next chunk
+                    break
+                number += 1
+                position = position_after
+                yield number, value
+            buffer = buffer[position:]
+
+        if len(buffer) > MAX_RECORD_BYTES:
+            yield number + 1, ValueError(f'Record longer than {MAX_RECORD_BYTES} bytes or never terminated; '
+                                         f'import stopped')
+            return
+
+    if buffer.strip():
+        number += 1
+        yield number, ValueError('Unterminated JSON array') if in_array else _parse_line(buffer)
+
+
+def _element_end(buffer, position):
+    """
+    Index of the ',' or ']' ending the array element that starts at position, skipping
+    over strings and nested brackets, or -1 if the element is not complete yet
+    """
+    depth = 0
+    in_string = escaped = False
+    for index in range(position, len(buffer)):
+        char = buffer[index]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in '[{':
+            depth += 1
+        elif char in ']}':
+            if depth == 0:
+                return index
+            depth -= 1
+        elif char == ',' and depth == 0:
+            return index
+    return -1
+
+
+def _parse_line(line):
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return ValueError(f'Invalid JSON: {e}')
+
+
+def validate_event(event):
+    """Return the event as a schedule session dict plus its date, or raise ValueError"""
+    if not isinstance(event, dict):
+        raise ValueError('Event must be a JSON object')
+    title = str(event.get('title') or '').strip()
+    if not title:
+        raise ValueError('Missing title')
+    try:
+        date_str = datetime.strptime(str(event.get('date')), '%Y-%m-%d').strftime('%Y-%m-%d')
+    except ValueError:
+        raise ValueError(f"Invalid date: {event.get('date')!r}, expected YYYY-MM-DD")
+    try:
+        start = parse_hhmm(str(event.get('time')))
+    except ValueError:
+        raise ValueError(f"Invalid time: {event.get('time')!r}, expected HH:MM")
+    try:
+        duration = int(event.get('duration', 60))
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid duration: {event.get('duration')!r}")
+    if not 0 <= start < 24 * 60 or duration <= 0 or start + duration > 24 * 60:
+        raise ValueError('Event must start and end within its day')
+
+    return date_str, {
+        'title': title,
+        'start': format_minutes(start),
+        'end': format_minutes(start + duration),
+        'description': event.get('description', title),
+        'type': event.get('type', 'custom'),
+    }
+
+
+def iter_valid_events(records, report):
+    """Yield (date_str, session) for valid records, counting invalid ones into report"""
+    for number, value in records:
+        report['received'] += 1
+        try:
+            if isinstance(value, Exception):
+                raise value
+            yield validate_event(value)
+        except ValueError as e:
+            report['invalid'] += 1
+            if len(report['errors']) < MAX_REPORTED_ERRORS:
+                report['errors'].append({'record': number, 'error': str(e)})
+
+
+def new_report():
+    return {'received': 0, 'invalid': 0, 'errors': [], 'batches': 0,
+            'inserted': 0, 'updated': 0, 'unchanged': 0, 'failed': 0}
+
+
+def write_batch(service, batch, schedule_name, timezone=DEFAULT_TIMEZONE):
+    """Sync one batch of (date_str, session) pairs; returns the sync_events summary"""
+    desired = {}
+    for date_str, session in batch:
+        # Re-importing the same row updates the event it created instead of adding another
+        key = event_key(schedule_name, 'import', date_str, session['start'], session['title'])
+        start, end = session_minutes(date_str, session, timezone)
+        desired[key] = tag_event(session_event(session, start, end, timezone), key, schedule_name,
+                                 sessionType=session['type'])
+
+    dates = sorted(date_str for date_str, _ in batch)
+    time_min, time_max = date_range(dates[0], dates[-1], timezone)
+    # Only this batch's events are known here, so nothing else in the range is deleted
+    return sync_events(service, desired, schedule_name, time_min, time_max, delete_missing=False)
+
+
+def import_events(service, chunks, schedule_name, batch_size=IMPORT_BATCH_SIZE,
+                  timezone=DEFAULT_TIMEZONE, validate_only=False):
+    """
+    Stream events from chunks into the calendar, yielding the running report after
+    each batch is written (and once more at the end). Holds at most one batch in memory.
+    Input sorted by date keeps each batch's sync to a short time range.
+    """
+    report = new_report()
+    batch = []
+
+    def flush():
+        report['batches'] += 1
+        if validate_only:
+            return
+        summary = write_batch(service, batch, schedule_name, timezone)
+        for action in ('inserted', 'updated', 'unchanged', 'failed'):
+            report[action] += len(summary[action])
+
+    for item in iter_valid_events(iter_json_records(chunks), report):
+        batch.append(item)
+        if len(batch) >= batch_size:
+            flush()
+            batch = []
+            yield report
+    if batch:
+        flush()
+    yield report
+
+
+def read_chunks(stream, size=READ_SIZE):
+    """Yield chunks from a file-like object until it is exhausted"""
+    while True:
+        chunk = stream.read(size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Import NDJSON or JSON array events into Google Calendar',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    parser.add_argument('path', help="events file, or - for stdin")
+    parser.add_argument('--name', default='import', help='schedule name the events are tagged with')
+    parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+    parser.add_argument('--timezone', default=DEFAULT_TIMEZONE)
+    parser.add_argument('--validate-only', action='store_true', help='check every event without writing')
+    args = parser.parse_args()
+
+    service = None
+    if not args.validate_only:
+        from calendar_service import calendar_service_manager
+
+        service = calendar_service_manager.get_service()
+        if not service:
+            print("❌ Google Calendar not authenticated")
+            return 1
+
+    stream = sys.stdin if args.path == '-' else open(args.path, encoding='utf-8')
+    try:
+        for report in import_events(service, read_chunks(stream), args.name, args.batch_size,
+                                    args.timezone, args.validate_only):
+            print(f"📥 {report['received']} read, {report['inserted']} inserted, {report['updated']} updated, "
+                  f"{report['unchanged']} unchanged, {report['failed']} failed, {report['invalid']} invalid")
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+    for error in report['errors']:
+        print(f"   ❌ Record {error['record']}: {error['error']}")
+    return 1 if report['failed'] or report['invalid'] else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Local calendar event store
+Keeps a SQLite copy of Google Calendar events up to date with incremental sync
+tokens, so dashboard reads do not need a full events().list on every page load.
+Each signed-in user's calendars are cached and synced separately
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from calendar_client import calendar_client
+from timezones import event_seconds
+
+EVENT_CACHE_PATH = os.environ.get('EVENT_CACHE_PATH', ':memory:')
+# Seconds before cached events are considered stale and resynced from Google
+EVENT_CACHE_MAX_AGE = int(os.environ.get('EVENT_CACHE_MAX_AGE', 60))
+# Calendars with a push notification channel resync when Google reports a change;
+# this longer max age only covers notifications that never arrive
+WATCHED_CACHE_MAX_AGE = int(os.environ.get('WATCHED_EVENT_CACHE_MAX_AGE', 3600))
+# How far back the initial full sync reaches
+SYNC_LOOKBACK_DAYS = int(os.environ.get('EVENT_SYNC_LOOKBACK_DAYS', 30))
+# How far ahead it reaches; Google expands a recurring series without an end through the
+# whole window, so it has to stop somewhere. Covers the longest range the dashboard reads
+SYNC_HORIZON_DAYS = int(os.environ.get('EVENT_SYNC_HORIZON_DAYS', 400))
+PAGE_SIZE = 2500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    calendar_id TEXT NOT NULL,
+    event_id TEXT NOT NULL,
+    summary TEXT,
+    description TEXT,
+    start TEXT,
+    end TEXT,
+    start_ts REAL,
+    end_ts REAL,
+    PRIMARY KEY (calendar_id, event_id)
+);
+CREATE INDEX IF NOT EXISTS events_by_start ON events (calendar_id, start_ts);
+CREATE TABLE IF NOT EXISTS sync_state (
+    calendar_id TEXT PRIMARY KEY,
+    sync_token TEXT,
+    synced_at REAL
+);
+"""
+
+
+def cache_scope(user, calendar_id):
+    """Key the cached copy of a user's calendar is stored under"""
+    # 'primary' names a different calendar for every user
+    return calendar_id if not user or user == 'default' else f'{user}/{calendar_id}'
+
+
+class SyncTokenExpired(Exception):
+    """Google answered 410 Gone: the sync token is no longer valid and a full sync is needed"""
+
+
+class EventStore:
+    """SQLite event cache kept current with Calendar API incremental sync"""
+
+    def __init__(self, path=EVENT_CACHE_PATH, max_age=EVENT_CACHE_MAX_AGE):
+        self.max_age = max_age
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._sync_locks = {}
+        # scope -> end of the window its sync token covers (epoch seconds)
+        self._horizons = {}
+        with self._lock:
+            if path != ':memory:':
+                self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.executescript(SCHEMA)
+
+    def get_events(self, service, time_min, time_max, calendar_id='primary', force_refresh=False, user='default'):
+        """Return events overlapping [time_min, time_max) (epoch seconds), syncing first if stale"""
+        self.refresh(service, calendar_id, force_refresh, user)
+        return self.query(time_min, time_max, calendar_id, user)
+
+    def refresh(self, service, calendar_id='primary', force_refresh=False, user='default', changed_at=None):
+        """
+        Sync the cached calendar if it is stale (always with force_refresh). For a
+        watched calendar, changed_at is the time of the last change notification and
+        the copy is stale only if it was synced before then.
+        """
+        scope = cache_scope(user, calendar_id)
+        sync_lock = self._sync_lock(scope)
+        synced_at = self._synced_at(scope)
+        if force_refresh or self._outdated(synced_at, changed_at):
+            if synced_at is None or force_refresh:
+                # Nothing usable cached yet: wait for whichever thread is syncing
+                with sync_lock:
+                    if force_refresh or self._outdated(self._synced_at(scope), changed_at):
+                        self.sync(service, calendar_id, user)
+            elif sync_lock.acquire(blocking=False):
+                # Stale but present: one thread resyncs, the others serve the cached copy
+                try:
+                    self.sync(service, calendar_id, user)
+                finally:
+                    sync_lock.release()
+
+    def query(self, time_min, time_max, calendar_id='primary', user='default'):
+        """Return the cached events overlapping [time_min, time_max) without syncing"""
+        scope = cache_scope(user, calendar_id)
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT summary, description, start, end FROM events '
+                'WHERE calendar_id = ? AND start_ts < ? AND end_ts > ? ORDER BY start_ts',
+                (scope, time_max, time_min)
+            ).fetchall()
+
+        return [
+            {'title': summary or 'No Title', 'start': start, 'end': end, 'description': description or ''}
+            for summary, description, start, end in rows
+        ]
+
+    def sync(self, service, calendar_id='primary', user='default'):
+        """Bring the cache up to date, incrementally when a sync token is available"""
+        scope = cache_scope(user, calendar_id)
+        sync_token = self._sync_token(scope)
+        # Changes Google reports while the pages are being read must still count as unsynced
+        started = time.time()
+        if sync_token and self._horizons.get(scope, 0) < started + (SYNC_HORIZON_DAYS - SYNC_LOOKBACK_DAYS) * 86400:
+            # A sync token keeps the window of its full sync; move the window forward
+            # once it has slid as far as the lookback
+            sync_token = None
+        try:
+            items, next_sync_token = self._list_all(service, calendar_id, sync_token)
+        except SyncTokenExpired:
+            print(f"🔄 Sync token for {calendar_id} expired, running full sync...")
+            sync_token = None
+            items, next_sync_token = self._list_all(service, calendar_id, None)
+
+        with self._lock, self._conn:
+            if sync_token is None:
+                self._conn.execute('DELETE FROM events WHERE calendar_id = ?', (scope,))
+            for event in items:
+                if event.get('status') == 'cancelled' or 'start' not in event:
+                    self._conn.execute(
+                        'DELETE FROM events WHERE calendar_id = ? AND event_id = ?',
+                        (scope, event['id'])
+                    )
+                    continue
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    (
+                        scope,
+                        event['id'],
+                        event.get('summary'),
+                        event.get('description'),
+                        event['start'].get('dateTime', event['start'].get('date')),
+                        event['end'].get('dateTime', event['end'].get('date')),
+                        event_seconds(event['start']),
+                        event_seconds(event['end']),
+                    )
+                )
+            self._conn.execute(
+                'INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?)',
+                (scope, next_sync_token, started)
+            )
+            if sync_token is None:
+                self._horizons[scope] = started + SYNC_HORIZON_DAYS * 86400
+
+        print(f"✅ {'Incremental' if sync_token else 'Full'} sync of {scope}: {len(items)} changes")
+        return len(items)
+
+    def version(self, calendar_id='primary', user='default'):
+        """Token that changes whenever a sync may have changed the cached events (None before the first sync)"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT sync_token, synced_at FROM sync_state WHERE calendar_id = ?', (cache_scope(user, calendar_id),)
+            ).fetchone()
+        # Every sync stores Google's new sync token; without one fall back to the sync time
+        return (row[0] or row[1]) if row else None
+
+    def invalidate(self, calendar_id='primary', user='default'):
+        """Mark cached events stale so the next read resyncs (keeps the sync token)"""
+        with self._lock, self._conn:
+            self._conn.execute('UPDATE sync_state SET synced_at = 0 WHERE calendar_id = ?',
+                               (cache_scope(user, calendar_id),))
+
+    def forget(self, user):
+        """Drop everything cached for a signed-in user's calendars"""
+        prefix = cache_scope(user, '')
+        if not prefix:
+            return
+        with self._lock, self._conn:
+            for table in ('events', 'sync_state'):
+                self._conn.execute(f'DELETE FROM {table} WHERE substr(calendar_id, 1, ?) = ?', (len(prefix), prefix))
+        with self._lock:
+            for scope in [scope for scope in self._sync_locks if scope.startswith(prefix)]:
+                del self._sync_locks[scope]
+            for scope in [scope for scope in self._horizons if scope.startswith(prefix)]:
+                del self._horizons[scope]
+
+    def _list_all(self, service, calendar_id, sync_token):
+        """Follow nextPageToken through every page; return (items, nextSyncToken)"""
+        params = {'calendarId': calendar_id, 'singleEvents': True, 'maxResults': PAGE_SIZE}
+        if sync_token:
+            params['syncToken'] = sync_token
+        else:
+            now = datetime.now(timezone.utc)
+            params['timeMin'] = (now - timedelta(days=SYNC_LOOKBACK_DAYS)).isoformat()
+            params['timeMax'] = (now + timedelta(days=SYNC_HORIZON_DAYS)).isoformat()
+
+        items = []
+        while True:
+            try:
+                result = calendar_client.execute(service.events().list(**params))
+            except Exception as e:
+                if sync_token and getattr(getattr(e, 'resp', None), 'status', None) == 410:
+                    raise SyncTokenExpired() from e
+                raise
+            items.extend(result.get('items', []))
+            params['pageToken'] = result.get('nextPageToken')
+            if not params['pageToken']:
+                return items, result.get('nextSyncToken')
+
+    def _sync_lock(self, scope):
+        with self._lock:
+            return self._sync_locks.setdefault(scope, threading.Lock())
+
+    def _synced_at(self, calendar_id):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT synced_at FROM sync_state WHERE calendar_id = ?', (calendar_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def _outdated(self, synced_at, changed_at=None):
+        if synced_at is None:
+            return True
+        if changed_at is not None:
+            return synced_at < changed_at or time.time() - synced_at > WATCHED_CACHE_MAX_AGE
+        return time.time() - synced_at > self.max_age
+
+    def _sync_token(self, calendar_id):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT sync_token FROM sync_state WHERE calendar_id = ?', (calendar_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+
+# Shared by every request handled by this worker process
+event_store = EventStore()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Bulk free/busy lookup across many calendars
+Queries the Calendar freebusy API in chunks of up to 50 calendars, runs the chunks
+concurrently and merges the answers into one slot matrix for scheduling
+"""
+
+import functools
+from datetime import datetime, timezone
+
+from calendar_client import calendar_client
+from calendar_fanout import fan_out
+from timeslots import SLOT_MINUTES, iter_runs, slot_range_mask
+from timezones import event_seconds
+
+# The freebusy API accepts at most 50 calendars per query
+FREEBUSY_LIMIT = 50
+MAX_WORKERS = 4
+
+
+def _iso(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat().replace('+00:00', 'Z')
+
+
+def _query_chunk(get_service, calendar_ids, time_min, time_max):
+    """Run one freebusy query; each worker thread uses its own service object"""
+    service = get_service()
+    if not service:
+        raise RuntimeError('Not authenticated')
+    return calendar_client.execute(service.freebusy().query(body={
+        'timeMin': _iso(time_min),
+        'timeMax': _iso(time_max),
+        'items': [{'id': calendar_id} for calendar_id in calendar_ids],
+    }))
+
+
+def query_freebusy(get_service, calendar_ids, time_min, time_max, max_workers=MAX_WORKERS):
+    """
+    Return {calendar_id: {'busy': [(start_ts, end_ts), ...], 'errors': [...]}} for
+    [time_min, time_max) in epoch seconds. get_service is called inside each worker.
+    """
+    calendar_ids = list(dict.fromkeys(calendar_ids))
+    chunks = [calendar_ids[start:start + FREEBUSY_LIMIT] for start in range(0, len(calendar_ids), FREEBUSY_LIMIT)]
+    calendars = {}
+
+    answers = fan_out(
+        [functools.partial(_query_chunk, get_service, chunk, time_min, time_max) for chunk in chunks],
+        limit=max_workers
+    )
+    for chunk, answer in zip(chunks, answers):
+        if isinstance(answer, Exception):
+            print(f"❌ Free/busy query for {len(chunk)} calendars failed: {answer}")
+            answer = {calendar_id: {'errors': [{'reason': str(answer)}]} for calendar_id in chunk}
+        else:
+            answer = answer.get('calendars', {})
+
+        for calendar_id in chunk:
+            entry = answer.get(calendar_id, {'errors': [{'reason': 'missing'}]})
+            calendars[calendar_id] = {
+                'busy': [
+                    (event_seconds({'dateTime': period['start']}), event_seconds({'dateTime': period['end']}))
+                    for period in entry.get('busy', [])
+                ],
+                'errors': entry.get('errors', []),
+            }
+
+    return calendars
+
+
+def busy_matrix(calendars, time_min, time_max, slot_minutes=SLOT_MINUTES):
+    """Return ({calendar_id: busy slot mask}, slot count) on a grid starting at time_min"""
+    slot_seconds = slot_minutes * 60
+    slots = -(-int(time_max - time_min) // slot_seconds)
+    matrix = {}
+    for calendar_id, entry in calendars.items():
+        mask = 0
+        for start, end in entry['busy']:
+            first = max(int(start - time_min) // slot_seconds, 0)
+            last = min(-(-int(end - time_min) // slot_seconds), slots)
+            mask |= slot_range_mask(first, last)
+        matrix[calendar_id] = mask
+    return matrix, slots
+
+
+def common_free(matrix, slots, time_min, slot_minutes=SLOT_MINUTES):
+    """Return (start_ts, end_ts) periods where every calendar in the matrix is free"""
+    busy = 0
+    for mask in matrix.values():
+        busy |= mask
+    free = slot_range_mask(0, slots) & ~busy
+    slot_seconds = slot_minutes * 60
+    return [(time_min + start * slot_seconds, time_min + end * slot_seconds) for start, end in iter_runs(free)]
+
+
+def freebusy_report(get_service, calendar_ids, time_min, time_max, slot_minutes=SLOT_MINUTES):
+    """Query and merge free/busy data into a JSON-ready report"""
+    calendars = query_freebusy(get_service, calendar_ids, time_min, time_max)
+    matrix, slots = busy_matrix(calendars, time_min, time_max, slot_minutes)
+    return {
+        'time_min': _iso(time_min),
+        'time_max': _iso(time_max),
+        'slot_minutes': slot_minutes,
+        'slots': slots,
+        'calendars': {
+            calendar_id: {
+                'busy': [{'start': _iso(start), 'end': _iso(end)} for start, end in entry['busy']],
+                'errors': entry['errors'],
+            }
+            for calendar_id, entry in calendars.items()
+        },
+        # One string per calendar, character i is '1' when slot i is busy
+        'matrix': {
+            calendar_id: format(mask, f'0{slots}b')[::-1] if slots else ''
+            for calendar_id, mask in matrix.items()
+        },
+        'common_free': [
+            {'start': _iso(start), 'end': _iso(end)}
+            for start, end in common_free(matrix, slots, time_min, slot_minutes)
+        ],
+    }
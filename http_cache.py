@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+HTTP response caching with conditional requests
+Serialized response bodies are kept with a strong ETag (a hash of their exact
+bytes) and a gzip copy made the first time a client accepts it. A request whose
+If-None-Match already names the body gets an empty 304, so reloading unchanged
+data sends headers only
+"""
+
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from flask import Response, request
+
+RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', 1024))
+# Smaller bodies are not worth compressing
+MIN_GZIP_BYTES = 1024
+GZIP_LEVEL = 6
+
+
+class CachedBody:
+    """A response body with its strong ETag and a lazily built gzip copy"""
+
+    __slots__ = ('body', 'etag', '_gzipped')
+
+    def __init__(self, body):
+        self.body = body
+        self.etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+        self._gzipped = None
+
+    def gzipped(self):
+        if self._gzipped is None:
+            # mtime=0 keeps the bytes, and so the ETag, the same in every worker
+            self._gzipped = gzip.compress(self.body, GZIP_LEVEL, mtime=0)
+        return self._gzipped
+
+
+class ResponseCache:
+    """LRU map of cache key -> CachedBody, shared by the threads of one worker"""
+
+    def __init__(self, max_entries=RESPONSE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'not_modified': 0}
+
+    def get(self, key):
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is None:
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return cached
+
+    def put(self, key, body):
+        """Store a serialized body under key and return its CachedBody"""
+        cached = CachedBody(body)
+        with self._lock:
+            self._entries[key] = cached
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return cached
+
+    def discard(self, match):
+        """Drop every entry whose key satisfies match(key)"""
+        with self._lock:
+            for key in [key for key in self._entries if match(key)]:
+                del self._entries[key]
+
+    def count_not_modified(self):
+        with self._lock:
+            self._stats['not_modified'] += 1
+
+    def get_stats(self):
+        with self._lock:
+            return {**self._stats, 'entries': len(self._entries), 'max_entries': self.max_entries}
+
+
+def send(cached, mimetype, cache_control='private, no-cache', cache=None):
+    """
+    Respond with a cached body: 304 when If-None-Match names it, otherwise the body,
+    gzip-encoded when the client accepts it. The gzip copy is a different
+    representation, so it gets its own ETag.
+    """
+    compress = len(cached.body) >= MIN_GZIP_BYTES and 'gzip' in request.accept_encodings
+    etag = f'{cached.etag}-gz' if compress else cached.etag
+    headers = {'Cache-Control': cache_control, 'Vary': 'Accept-Encoding'}
+
+    if request.if_none_match.contains(etag):
+        if cache is not None:
+            cache.count_not_modified()
+        response = Response(status=304, headers=headers)
+    elif compress:
+        response = Response(cached.gzipped(), mimetype=mimetype, headers={**headers, 'Content-Encoding': 'gzip'})
+    else:
+        response = Response(cached.body, mimetype=mimetype, headers=headers)
+    response.set_etag(etag)
+    return response
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+In-process background jobs with progress tracking
+Long-running work (schedule creation and calendar writes) runs on a thread pool
+inside the worker; job state lives in a shared SQLite file so any gunicorn worker
+can answer status polls. Each job belongs to the user who started it and is only
+shown to them
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+JOB_DB_PATH = os.environ.get('JOB_DB_PATH', os.path.join(tempfile.gettempdir(), 'schedule_jobs.db'))
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 4))
+# Finished jobs are forgotten after this many seconds
+JOB_RETENTION_SECONDS = int(os.environ.get('JOB_RETENTION_SECONDS', 3600))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT,
+    user TEXT,
+    status TEXT NOT NULL,
+    total INTEGER,
+    done INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS job_events (
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (job_id, seq)
+);
+"""
+
+
+class Job:
+    """Handle passed to a running job function for reporting progress"""
+
+    def __init__(self, queue, job_id):
+        self.queue = queue
+        self.id = job_id
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def set_total(self, total):
+        """Declare how many items the job will process"""
+        self.queue._execute('UPDATE jobs SET total = ?, updated_at = ? WHERE id = ?', (total, time.time(), self.id))
+
+    def record(self, item, success=True):
+        """Record the outcome of one item (e.g. one calendar event)"""
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+        column = 'done' if success else 'failed'
+        self.queue._execute_many([
+            ('INSERT INTO job_events VALUES (?, ?, ?)', (self.id, seq, self.queue.dumps(item))),
+            (f'UPDATE jobs SET {column} = {column} + 1, updated_at = ? WHERE id = ?', (time.time(), self.id)),
+        ])
+
+
+class JobQueue:
+    """Thread pool that runs jobs and keeps their state in SQLite"""
+
+    def __init__(self, path=JOB_DB_PATH, max_workers=JOB_WORKERS, dumps=json.dumps):
+        self.path = path
+        self.dumps = dumps
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='schedule-job')
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+            # Job files written before jobs had owners
+            if 'user' not in {row[1] for row in conn.execute('PRAGMA table_info(jobs)')}:
+                try:
+                    conn.execute('ALTER TABLE jobs ADD COLUMN user TEXT')
+                except sqlite3.OperationalError:
+                    # Another worker added it first
+                    pass
+
+    def submit(self, kind, user, func, *args, **kwargs):
+        """Queue func(job, *args, **kwargs) on behalf of `user` and return the new job ID at once"""
+        self._purge()
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._execute(
+            'INSERT INTO jobs (id, kind, user, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)',
+            (job_id, kind, user, 'queued', now, now)
+        )
+        self._executor.submit(self._run, job_id, func, args, kwargs)
+        return job_id
+
+    def get(self, job_id, user, since=0):
+        """
+        Return the job's state with the item outcomes recorded after sequence `since`,
+        or None when there is no such job or it belongs to someone other than `user`
+        """
+        conn = self._connect()
+        row = conn.execute(
+            'SELECT id, kind, status, total, done, failed, result, error, created_at, updated_at FROM jobs '
+            'WHERE id = ? AND user = ?',
+            (job_id, user)
+        ).fetchone()
+        if not row:
+            return None
+        events = conn.execute(
+            'SELECT seq, data FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq',
+            (job_id, since)
+        ).fetchall()
+        job_id, kind, status, total, done, failed, result, error, created_at, updated_at = row
+        return {
+            'id': job_id,
+            'kind': kind,
+            'status': status,
+            'total': total,
+            'done': done,
+            'failed': failed,
+            'events': [json.loads(data) for _, data in events],
+            'next_since': events[-1][0] if events else since,
+            'result': json.loads(result) if result else None,
+            'error': error,
+            'created_at': created_at,
+            'updated_at': updated_at,
+        }
+
+    def _run(self, job_id, func, args, kwargs):
+        self._execute('UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?', ('running', time.time(), job_id))
+        try:
+            result = func(Job(self, job_id), *args, **kwargs)
+            self._execute(
+                'UPDATE jobs SET status = ?, result = ?, updated_at = ? WHERE id = ?',
+                ('completed', self.dumps(result), time.time(), job_id)
+            )
+        except Exception as e:
+            traceback.print_exc()
+            self._execute(
+                'UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?',
+                ('failed', str(e), time.time(), job_id)
+            )
+
+    def _purge(self):
+        cutoff = time.time() - JOB_RETENTION_SECONDS
+        self._execute_many([
+            ("DELETE FROM job_events WHERE job_id IN "
+             "(SELECT id FROM jobs WHERE status IN ('completed', 'failed') AND updated_at < ?)", (cutoff,)),
+            ("DELETE FROM jobs WHERE status IN ('completed', 'failed') AND updated_at < ?", (cutoff,)),
+        ])
+
+    def _connect(self):
+        """One connection per thread; SQLite connections must not be shared across threads"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            self._local.conn = conn
+        return conn
+
+    def _execute(self, sql, params):
+        self._execute_many([(sql, params)])
+
+    def _execute_many(self, statements):
+        conn = self._connect()
+        with conn:
+            for sql, params in statements:
+                conn.execute(sql, params)
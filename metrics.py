@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+In-process timing metrics
+Timing spans around the hot paths (auth, Google API calls, schedule generation,
+storage) feed fixed-bucket histograms that are rendered in the Prometheus text
+format. Every gunicorn worker keeps its own numbers, as Prometheus expects
+"""
+
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; the Prometheus client library defaults
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class Histogram:
+    """Cumulative-bucket histogram of observations, one series per label set"""
+
+    def __init__(self, name, help_text, label_names, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.label_names)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            snapshot = sorted((key, list(counts), total, count) for key, (counts, total, count) in self._series.items())
+        for key, counts, total, count in snapshot:
+            labels = list(zip(self.label_names, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{_format_labels(labels, [("le", repr(bound))])} {cumulative}')
+            lines.append(f'{self.name}_bucket{_format_labels(labels, [("le", "+Inf")])} {count}')
+            lines.append(f'{self.name}_sum{_format_labels(labels)} {total}')
+            lines.append(f'{self.name}_count{_format_labels(labels)} {count}')
+        return lines
+
+
+span_seconds = Histogram(
+    'schedule_span_seconds', 'Time spent in instrumented code paths', ('span', 'outcome')
+)
+request_seconds = Histogram(
+    'schedule_http_request_seconds', 'HTTP request handling time', ('method', 'endpoint', 'status')
+)
+HISTOGRAMS = [span_seconds, request_seconds]
+
+
+@contextmanager
+def span(name):
+    """Time the enclosed block into schedule_span_seconds{span=name}"""
+    start = time.perf_counter()
+    outcome = 'error'
+    try:
+        yield
+        outcome = 'ok'
+    finally:
+        span_seconds.observe(time.perf_counter() - start, span=name, outcome=outcome)
+
+
+def timed(name):
+    """Decorator form of span()"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def render_prometheus(gauges=()):
+    """
+    Return every histogram plus extra (name, help, type, {labels: value} or value)
+    metrics in the Prometheus text exposition format
+    """
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    for name, help_text, kind, values in gauges:
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        if not isinstance(values, dict):
+            values = {(): values}
+        for labels, value in values.items():
+            lines.append(f'{name}{_format_labels(labels)} {float(value or 0)}')
+    return '\n'.join(lines) + '\n'
+
+
+def init_app(app):
+    """Time every Flask request by its route into schedule_http_request_seconds"""
+    from flask import g, request
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _observe_request(response):
+        start = g.pop('metrics_start', None)
+        if start is not None:
+            endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+            request_seconds.observe(time.perf_counter() - start, method=request.method,
+                                    endpoint=endpoint, status=response.status_code)
+        return response
@@ -0,0 +1,468 @@
+#!/usr/bin/env python3
+"""
+Natural-language event parser
+Turns phrases like "Team standup every weekday 9:30am for 15 min" or
+"Code review friday 2-3:30pm" into events for create_custom_schedule. The grammar
+is a handful of regular expressions compiled once at import, and parsed phrases
+are kept in an LRU cache, so a repeated line in a bulk import costs a dict copy
+"""
+
+import os
+import re
+from datetime import date, timedelta
+from functools import lru_cache
+
+from scheduler_engine import DAY_NAMES
+from timeslots import format_minutes, parse_hhmm
+
+NLP_CACHE_SIZE = int(os.environ.get('NLP_CACHE_SIZE', 4096))
+# Weekly repeats without an end date run this many weeks
+DEFAULT_REPEAT_WEEKS = int(os.environ.get('NLP_REPEAT_WEEKS', 4))
+DEFAULT_TIME = '09:00'
+DEFAULT_DURATION = 60
+# Shorter phrases with no date or time in them are ignored
+MIN_PHRASE_LENGTH = 10
+MAX_TITLE_LENGTH = 80
+# Largest block of text /api/parse accepts
+MAX_TEXT_LENGTH = int(os.environ.get('NLP_MAX_TEXT_LENGTH', 1_000_000))
+
+PERIOD_TIMES = {'morning': 9 * 60, 'afternoon': 14 * 60, 'evening': 18 * 60, 'night': 20 * 60, 'tonight': 20 * 60}
+# Periods in which a bare "at 7" means 7pm
+PM_PERIODS = {'afternoon', 'evening', 'night', 'tonight'}
+
+EVENT_TYPES = [
+    (('meeting', 'call', 'conference'), 'Meeting'),
+    (('coding', 'development', 'programming'), 'Development'),
+    (('standup', 'stand-up', 'daily'), 'Standup'),
+    (('review', 'code review'), 'Code Review'),
+    (('lunch', 'break', 'coffee'), 'Break'),
+    (('workout', 'exercise', 'gym'), 'Exercise'),
+    (('study', 'learning', 'training'), 'Learning'),
+]
+
+MONTHS = {name: index for index, names in enumerate([
+    ('jan', 'january'), ('feb', 'february'), ('mar', 'march'), ('apr', 'april'), ('may',), ('jun', 'june'),
+    ('jul', 'july'), ('aug', 'august'), ('sep', 'sept', 'september'), ('oct', 'october'),
+    ('nov', 'november'), ('dec', 'december'),
+], start=1) for name in names}
+
+# Three-letter "sat" and "sun" are left out: they are more often plain words
+WEEKDAYS = {name: index for index, names in enumerate([
+    ('monday', 'mon'), ('tuesday', 'tue', 'tues'), ('wednesday', 'wed'), ('thursday', 'thu', 'thur', 'thurs'),
+    ('friday', 'fri'), ('saturday',), ('sunday',),
+]) for name in names}
+
+_MONTH = '|'.join(sorted(MONTHS, key=len, reverse=True))
+_WEEKDAY = '|'.join(sorted(WEEKDAYS, key=len, reverse=True))
+_FULL_WEEKDAY = '|'.join(day.lower() for day in DAY_NAMES)
+_JOIN = r'\s*(?:,|&|\band\b)\s*'
+
+# Grammar fragments; they share one namespace of group names
+_DATE = rf"""
+    \b(?:on\s+)?(?:
+        (?P<iso>\d{{4}}-\d{{1,2}}-\d{{1,2}})
+      | (?P<month>\d{{1,2}})/(?P<day>\d{{1,2}})(?:/(?P<year>\d{{2}}|\d{{4}}))?
+      | (?P<month_name>{_MONTH})\.?\s+(?P<month_day>\d{{1,2}})(?:st|nd|rd|th)?\b(?:,?\s+(?P<month_year>\d{{4}}))?
+      | (?P<day_month>\d{{1,2}})(?:st|nd|rd|th)?\s+(?:of\s+)?(?P<day_month_name>{_MONTH})\b(?:,?\s+(?P<day_month_year>\d{{4}}))?
+      | (?P<relative>day\s+after\s+tomorrow|today|tonight|tomorrow|tmrw|yesterday)
+      | in\s+(?P<in_days>\d{{1,3}})\s+days?
+      | (?:(?P<next>next|this|coming)\s+)?(?P<weekday>{_WEEKDAY})
+    )\b\.?
+"""
+
+_RECURRENCE = rf"""
+    \b(?:
+        every\s+(?:(?P<every_day>day)|(?P<every_weekday>weekday)|(?P<every_week>week)
+                  |(?P<every_days>(?:{_FULL_WEEKDAY})s?(?:{_JOIN}(?:{_FULL_WEEKDAY})s?)*))
+      | (?P<daily>daily)
+      | (?P<weekly>weekly)
+      | (?:on\s+)?(?P<weekdays>weekdays)
+      | (?:on\s+)?(?P<plural_days>(?:{_FULL_WEEKDAY})s(?:{_JOIN}(?:{_FULL_WEEKDAY})s)*)
+    )\b
+"""
+
+_UNTIL = r'\b(?:until|till|through|thru)\s+'
+_FOR_WEEKS = r'\bfor\s+(?P<weeks>\d{1,2})\s+weeks?\b'
+
+_DURATION = r"""
+    \b(?:for\s+)?(?:
+        (?P<hours>\d+(?:\.\d+)?|an?|one|half\s+an?)\s*(?:h|hrs?|hours?)\b
+        (?:\s*(?:and\s+)?(?P<extra_minutes>\d{1,2})\s*(?:m|mins?|minutes?)\b)?
+      | (?P<minutes>\d{1,4})\s*(?:m|mins?|minutes?)\b
+    )
+"""
+
+_MERIDIEM = r'(?:[ap]\.?m\b\.?)'
+
+_TIME_RANGE = rf"""
+    (?:\bfrom\s+)?\b(?P<start_hour>\d{{1,2}})(?::(?P<start_minute>\d{{2}}))?\s*(?P<start_meridiem>{_MERIDIEM})?
+    \s*(?:-|–|to\b|until\b|till\b)\s*
+    (?P<end_hour>\d{{1,2}})(?::(?P<end_minute>\d{{2}}))?\s*(?P<end_meridiem>{_MERIDIEM})?
+"""
+
+_TIME = rf"""
+    (?:\bat\s+|@\s*)?(?:
+        \b(?P<hour>\d{{1,2}})(?::(?P<minute>\d{{2}}))?\s*(?P<meridiem>{_MERIDIEM})
+      | \b(?P<clock_hour>\d{{1,2}}):(?P<clock_minute>\d{{2}})\b
+      | (?<=at\s)(?P<bare_hour>\d{{1,2}})\b(?!\s*(?:/|-|:|h|m|days?|weeks?|people|%))
+      | \b(?P<word>noon|midnight)\b
+    )
+"""
+
+_PERIOD = r'\b(?:in\s+the\s+|this\s+)?(?P<period>morning|afternoon|evening|tonight|night)\b'
+
+# Every construct in one alternation, tried only where a word can start one. Where two
+# match at the same word the earlier one wins: "every monday" is a repeat, not a date.
+# Phrases are lowercased first because case-insensitive matching is markedly slower
+TOKEN = re.compile('|'.join(f'(?P<{kind}>{pattern})' for kind, pattern in [
+    ('recurrence', _RECURRENCE),
+    ('until', _UNTIL),
+    ('for_weeks', _FOR_WEEKS),
+    ('date', _DATE),
+    ('time_range', _TIME_RANGE),
+    ('time', _TIME),
+    ('duration', _DURATION),
+    ('period_of_day', _PERIOD),
+]), re.VERBOSE)
+# The date after "until"
+DATE = re.compile(_DATE, re.VERBOSE)
+FULL_WEEKDAY = re.compile(_FULL_WEEKDAY)
+
+WORD = re.compile(r'\w+(?:-\w+)*|@')
+# Words a token can start with, besides numbers and '@'
+TOKEN_WORDS = {
+    'every', 'daily', 'weekly', 'weekdays', 'on', 'until', 'till', 'through', 'thru', 'for', 'from', 'at', 'in',
+    'this', 'next', 'coming', 'day', 'today', 'tonight', 'tomorrow', 'tmrw', 'yesterday', 'a', 'an', 'one', 'half',
+    'noon', 'midnight', *PERIOD_TIMES, *MONTHS, *WEEKDAYS, *(f'{day}s' for day in _FULL_WEEKDAY.split('|')),
+}
+
+# Keyword (and its plural) -> position of its type; a phrase naming several gets the type listed first.
+# Two-word keywords are covered by their single words ('code review' by 'review')
+EVENT_TYPE_WORDS = {
+    word: index
+    for index, (keywords, _) in reversed(list(enumerate(EVENT_TYPES)))
+    for keyword in keywords if ' ' not in keyword
+    for word in (keyword, keyword + 's')
+}
+
+# Sentence ends, but not the dots of a.m./p.m.
+PHRASE_SPLIT = re.compile(r'(?<!\b[ap]\.m)[.!?;]+(?=\s|$)|\n+', re.IGNORECASE)
+# Words left dangling at either end of a title once dates and times are cut out
+TITLE_EDGE_WORDS = {'', 'at', 'on', 'from', 'for', 'every', 'and', 'starting', 'until', 'in', 'the', 'by', 'with'}
+TITLE_PUNCTUATION = ' ,:;-–@()'
+
+
+def _meridiem_hour(hour, meridiem):
+    """24-hour hour for an hour and an 'am'/'pm' marker (any dots already ignored)"""
+    if meridiem == 'p':
+        return hour % 12 + 12
+    if meridiem == 'a':
+        return hour % 12
+    return hour
+
+
+def _guess_hour(hour, period=None):
+    """24-hour hour for a time given without am/pm: 1-7 are afternoon, as are evening times"""
+    if hour >= 12:
+        return hour
+    if period in PM_PERIODS or 1 <= hour <= 7:
+        return hour + 12
+    return hour
+
+
+def _meridiem(value):
+    return value[0] if value else None
+
+
+def _year_of(month, day, today):
+    """Year of a month/day given without one: the next such date on or after today"""
+    candidate = date(today.year, month, day)
+    return today.year + 1 if candidate < today else today.year
+
+
+def resolve_date(match, today):
+    """Return the date a DATE match (on lowercased text) refers to, or None if it is not a real date"""
+    groups = match.groupdict()
+    try:
+        if groups['iso']:
+            year, month, day = (int(part) for part in groups['iso'].split('-'))
+            return date(year, month, day)
+        if groups['month']:
+            month, day = int(groups['month']), int(groups['day'])
+            year = groups['year']
+            if year:
+                year = int(year) + (2000 if len(year) == 2 else 0)
+            return date(year or _year_of(month, day, today), month, day)
+        if groups['month_name'] or groups['day_month_name']:
+            month = MONTHS[groups['month_name'] or groups['day_month_name']]
+            day = int(groups['month_day'] or groups['day_month'])
+            year = groups['month_year'] or groups['day_month_year']
+            return date(int(year) if year else _year_of(month, day, today), month, day)
+    except ValueError:
+        return None
+    if groups['relative']:
+        relative = groups['relative']
+        if relative == 'yesterday':
+            return today - timedelta(days=1)
+        if relative in ('tomorrow', 'tmrw'):
+            return today + timedelta(days=1)
+        if relative.startswith('day'):
+            return today + timedelta(days=2)
+        return today
+    if groups['in_days']:
+        return today + timedelta(days=int(groups['in_days']))
+    # "friday" is the coming Friday (today included), "next friday" the one after today
+    ahead = (WEEKDAYS[groups['weekday']] - today.weekday()) % 7
+    if ahead == 0 and groups['next'] and groups['next'] != 'this':
+        ahead = 7
+    return today + timedelta(days=ahead)
+
+
+def _recurrence_days(match, start):
+    """Weekday indexes a RECURRENCE match repeats on"""
+    groups = match.groupdict()
+    if groups['every_day'] or groups['daily']:
+        return list(range(7))
+    if groups['every_weekday'] or groups['weekdays']:
+        return list(range(5))
+    days = groups['every_days'] or groups['plural_days']
+    if days:
+        return sorted({WEEKDAYS[name] for name in FULL_WEEKDAY.findall(days)})
+    return [start.weekday()]
+
+
+def _duration_minutes(match):
+    hours = match.group('hours')
+    if hours is None:
+        return int(match.group('minutes'))
+    if hours.startswith('half'):
+        value = 0.5
+    elif hours in ('a', 'an', 'one'):
+        value = 1
+    else:
+        value = float(hours)
+    return int(round(value * 60)) + int(match.group('extra_minutes') or 0)
+
+
+def _valid_range(match):
+    start_hour, end_hour = int(match.group('start_hour')), int(match.group('end_hour'))
+    start_minute, end_minute = int(match.group('start_minute') or 0), int(match.group('end_minute') or 0)
+    if start_hour > 24 or end_hour > 24 or start_minute > 59 or end_minute > 59:
+        return False
+    # "3-4 people" is not a time range: require am/pm, a clock time or a leading "from"
+    return bool(match.group('start_meridiem') or match.group('end_meridiem') or match.group('start_minute')
+                or match.group('end_minute') or match.group(0).startswith('from'))
+
+
+def _valid_time(match):
+    if match.group('word'):
+        return True
+    hour = int(match.group('hour') or match.group('clock_hour') or match.group('bare_hour'))
+    minute = int(match.group('minute') or match.group('clock_minute') or 0)
+    return hour <= (12 if match.group('meridiem') else 24) and minute <= 59
+
+
+def _range_minutes(match, period):
+    """(start, end) minutes after midnight of a TIME_RANGE match"""
+    start_hour, end_hour = int(match.group('start_hour')), int(match.group('end_hour'))
+    start_meridiem, end_meridiem = _meridiem(match.group('start_meridiem')), _meridiem(match.group('end_meridiem'))
+    start_minute, end_minute = int(match.group('start_minute') or 0), int(match.group('end_minute') or 0)
+
+    if end_meridiem:
+        end = _meridiem_hour(end_hour, end_meridiem) * 60 + end_minute
+    else:
+        end = _guess_hour(end_hour, period) * 60 + end_minute
+    if start_meridiem:
+        start = _meridiem_hour(start_hour, start_meridiem) * 60 + start_minute
+    elif end_meridiem:
+        # "2-3:30pm" shares the end's pm, unless that would put the start after the end ("11-1pm")
+        start = _meridiem_hour(start_hour, end_meridiem) * 60 + start_minute
+        if start >= end:
+            start = _meridiem_hour(start_hour, 'a') * 60 + start_minute
+    else:
+        start = _guess_hour(start_hour, period) * 60 + start_minute
+    if end <= start and end < 12 * 60:
+        end += 12 * 60
+    return start, end
+
+
+def _time_minutes(match, period):
+    word = match.group('word')
+    if word:
+        return 12 * 60 if word == 'noon' else 0
+    if match.group('meridiem'):
+        return _meridiem_hour(int(match.group('hour')), _meridiem(match.group('meridiem'))) * 60 + int(match.group('minute') or 0)
+    if match.group('clock_hour'):
+        hour = int(match.group('clock_hour'))
+        return _guess_hour(hour, period) * 60 + int(match.group('clock_minute'))
+    return _guess_hour(int(match.group('bare_hour')), period) * 60
+
+
+def _title(remainder, event_type):
+    """Title from the words not taken by dates and times, falling back to the event type"""
+    words = remainder.split()
+    while words and words[0].strip(TITLE_PUNCTUATION).lower() in TITLE_EDGE_WORDS:
+        words.pop(0)
+    while words and words[-1].strip(TITLE_PUNCTUATION).lower() in TITLE_EDGE_WORDS:
+        words.pop()
+    title = ' '.join(words).strip(TITLE_PUNCTUATION)
+    if not title:
+        return event_type
+    if len(title) > MAX_TITLE_LENGTH:
+        title = title[:MAX_TITLE_LENGTH - 3].rstrip() + '...'
+    return title[0].upper() + title[1:]
+
+
+def _scan(phrase, today):
+    """
+    Return the first valid match of each kind in a phrase (dates resolved), the text
+    left over for the title and the event type named by the words left over.
+    """
+    text = phrase.lower()
+    if len(text) != len(phrase):
+        # A few characters lowercase to two; keep offsets aligned with the original
+        text = ''.join(char.lower() if len(char.lower()) == 1 else char for char in phrase)
+    found = {}
+    kept = []
+    position = 0
+    cut_from = 0
+    type_index = len(EVENT_TYPES)
+    for word in WORD.finditer(text):
+        start = word.start()
+        if start < position:
+            continue
+        word = word.group()
+        end = _token_end(text, start, word, found, today)
+        if end is None:
+            # Type keywords count only outside tokens, so the 'daily' of "daily at 9" is not a standup
+            type_index = min(type_index, EVENT_TYPE_WORDS.get(word, type_index))
+            continue
+        kept.append(phrase[cut_from:start])
+        cut_from = position = end
+    kept.append(phrase[cut_from:])
+    event_type = EVENT_TYPES[type_index][1] if type_index < len(EVENT_TYPES) else 'General'
+    return found, ' '.join(kept), event_type
+
+
+def _token_end(text, start, word, found, today):
+    """Record the token starting at a word in found and return where it ends, or None if there is none"""
+    if not (word[0].isdigit() or word in TOKEN_WORDS):
+        return None
+    match = TOKEN.match(text, start)
+    if match is None:
+        return None
+    kind = match.lastgroup
+    end = match.end()
+    value = match
+    if kind == 'until':
+        date_match = DATE.match(text, end)
+        value = date_match and resolve_date(date_match, today)
+        end = date_match.end() if value else end
+    elif kind == 'date':
+        value = resolve_date(match, today)
+    elif kind == 'time_range':
+        value = _valid_range(match) and match
+    elif kind == 'time':
+        value = _valid_time(match) and match
+
+    if not value or kind in found or end == start:
+        # Not what it looked like ("until" in a sentence, "3-4 people")
+        return None
+    found[kind] = value
+    if kind == 'date' and match.group('relative') == 'tonight':
+        found['tonight'] = True
+    return end
+
+
+def _parse(phrase, today):
+    """Parse one phrase into an event dict, or None if it holds nothing to schedule"""
+    found, remainder, event_type = _scan(phrase, today)
+    if not found and len(phrase) < MIN_PHRASE_LENGTH:
+        return None
+
+    day = found.get('date')
+    period = found['period_of_day'].group('period') if 'period_of_day' in found else None
+    if period is None and found.get('tonight'):
+        period = 'tonight'
+
+    duration = None
+    if 'time_range' in found:
+        start, end = _range_minutes(found['time_range'], period)
+        duration = end - start if end > start else None
+    elif 'time' in found:
+        start = _time_minutes(found['time'], period)
+    else:
+        start = PERIOD_TIMES.get(period, parse_hhmm(DEFAULT_TIME))
+    if duration is None and 'duration' in found:
+        duration = _duration_minutes(found['duration'])
+
+    start = min(start, 24 * 60 - 1)
+    # Events end by midnight; create_custom_schedule works within one day
+    duration = max(1, min(duration or DEFAULT_DURATION, 24 * 60 - start))
+    event = {
+        'title': _title(remainder, event_type),
+        'description': phrase,
+        'date': (day or today).isoformat(),
+        'time': format_minutes(start),
+        'duration': duration,
+        'type': event_type,
+    }
+
+    recurrence = found.get('recurrence')
+    if recurrence:
+        first = day or today
+        days = _recurrence_days(recurrence, first)
+        # Start on the first matching weekday
+        while first.weekday() not in days:
+            first += timedelta(days=1)
+        until = found.get('until')
+        if until is None:
+            weeks = int(found['for_weeks'].group('weeks')) if 'for_weeks' in found else DEFAULT_REPEAT_WEEKS
+            until = first + timedelta(weeks=weeks, days=-1)
+        until = max(until, first)
+        event['date'] = first.isoformat()
+        event['repeat'] = {'days': [DAY_NAMES[index] for index in days], 'until': until.isoformat()}
+    return event
+
+
+@lru_cache(maxsize=NLP_CACHE_SIZE)
+def _parse_cached(phrase, today):
+    return _parse(phrase, today)
+
+
+def parse_phrase(phrase, today=None):
+    """Return the event described by one phrase, or None; relative dates count from today"""
+    event = _parse_cached(phrase.strip(), today or date.today())
+    if event is None:
+        return None
+    event = dict(event)
+    if 'repeat' in event:
+        event['repeat'] = {'days': list(event['repeat']['days']), 'until': event['repeat']['until']}
+    return event
+
+
+def split_phrases(text):
+    """Yield the non-empty sentences and lines of a block of text"""
+    for phrase in PHRASE_SPLIT.split(text):
+        phrase = phrase.strip()
+        if phrase:
+            yield phrase
+
+
+def parse_text(text, today=None):
+    """Return the events described by a block of text, one per sentence or line that holds one"""
+    today = today or date.today()
+    return [event for event in (parse_phrase(phrase, today) for phrase in split_phrases(text)) if event]
+
+
+def cache_info():
+    """Hits, misses and size of the parsed-phrase cache"""
+    info = _parse_cached.cache_info()
+    return {'hits': info.hits, 'misses': info.misses, 'size': info.currsize, 'max_size': info.maxsize}
+
+
+if __name__ == '__main__':
+    import json
+    import sys
+
+    print(json.dumps(parse_text(sys.stdin.read()), indent=2))
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Opt-in per-request profiling
+With PROFILING_ENABLED=1, a request carrying ?profile=1 (cProfile) or
+?profile=pyinstrument runs under the profiler and the report replaces its
+response body. One request is profiled at a time; others run normally
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import threading
+
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '0') == '1'
+# Lines of the cProfile report, sorted by cumulative time
+PROFILE_LINES = int(os.environ.get('PROFILE_LINES', 40))
+
+_active = threading.Lock()
+
+
+class _CProfile:
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+
+    def start(self):
+        self.profiler.enable()
+
+    def stop(self):
+        self.profiler.disable()
+        output = io.StringIO()
+        pstats.Stats(self.profiler, stream=output).sort_stats('cumulative').print_stats(PROFILE_LINES)
+        return output.getvalue(), 'text/plain'
+
+
+class _Pyinstrument:
+    def __init__(self):
+        from pyinstrument import Profiler
+        self.profiler = Profiler()
+
+    def start(self):
+        self.profiler.start()
+
+    def stop(self):
+        self.profiler.stop()
+        return self.profiler.output_html(), 'text/html'
+
+
+def _make_profiler(kind):
+    if kind == 'pyinstrument':
+        try:
+            return _Pyinstrument()
+        except ImportError:
+            pass
+    return _CProfile()
+
+
+def init_app(app, enabled=PROFILING_ENABLED):
+    """Install the ?profile= hook on a Flask app when profiling is enabled"""
+    if not enabled:
+        return
+    from flask import g, request
+
+    @app.before_request
+    def _start_profile():
+        kind = request.args.get('profile')
+        if not kind or kind == '0' or not _active.acquire(blocking=False):
+            return
+        g.profiler = _make_profiler(kind)
+        g.profiler.start()
+
+    @app.after_request
+    def _finish_profile(response):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return response
+        try:
+            report, mimetype = profiler.stop()
+        finally:
+            _active.release()
+        return app.response_class(report, mimetype=mimetype)
+
+    @app.teardown_request
+    def _release_profile(exception):
+        # after_request does not run when the view raised
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.stop()
+            _active.release()
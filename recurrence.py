@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Weekly recurrence for schedules
+Finds sessions that repeat at the same time on the same weekdays and folds each
+set into one series written as a single RRULE event
+"""
+
+import time
+from datetime import datetime, timedelta
+
+from scheduler_engine import DAY_NAMES
+from timezones import to_epoch_minutes
+
+# RFC 5545 weekday codes in datetime.weekday() order
+WEEKDAY_CODES = ['MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU']
+
+# Fewer occurrences than this are cheaper to write as plain events
+MIN_OCCURRENCES = 2
+
+
+def parse_weekday(day):
+    """Return the weekday index of a day name ('Tuesday', 'tue') or RRULE code ('TU')"""
+    name = str(day).strip().lower()
+    for index, (full, code) in enumerate(zip(DAY_NAMES, WEEKDAY_CODES)):
+        if name == code.lower() or (len(name) >= 3 and full.lower().startswith(name)):
+            return index
+    raise ValueError(f"Unknown weekday: {day}")
+
+
+def _order(item):
+    return item[0], item[1]['start']
+
+
+def _as_date(value):
+    if isinstance(value, str):
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    return value.date() if isinstance(value, datetime) else value
+
+
+class Series:
+    """A session repeating weekly on some weekdays from `first` through `until`"""
+
+    __slots__ = ('session', 'weekdays', 'first', 'until')
+
+    def __init__(self, session, weekdays, first, until):
+        self.session = session
+        self.weekdays = frozenset(weekdays)
+        self.first = _as_date(first)
+        self.until = _as_date(until)
+
+    @classmethod
+    def from_repeat(cls, session, first, repeat):
+        """Build a series from {'days': [...], 'until': 'YYYY-MM-DD'}; days default to first's weekday"""
+        first = _as_date(first)
+        weekdays = [parse_weekday(day) for day in repeat.get('days', ())] or [first.weekday()]
+        return cls(session, weekdays, first, repeat['until'])
+
+    def dates(self, start=None, end=None):
+        """Yield occurrence dates within [start, end] (inclusive, defaults to the whole series)"""
+        day = max(self.first, _as_date(start)) if start else self.first
+        last = min(self.until, _as_date(end)) if end else self.until
+        while day <= last:
+            if day.weekday() in self.weekdays:
+                yield day
+            day += timedelta(days=1)
+
+    def __len__(self):
+        return sum(1 for _ in self.dates())
+
+    def byday(self):
+        return ','.join(WEEKDAY_CODES[index] for index in sorted(self.weekdays))
+
+    def rrule(self, timezone):
+        """Return the RRULE line; UNTIL is the end of the last day in UTC, as RFC 5545 requires"""
+        # One second before the following local midnight
+        until = time.gmtime(to_epoch_minutes(self.until.toordinal() + 1, 0, timezone) * 60 - 1)
+        return f"RRULE:FREQ=WEEKLY;BYDAY={self.byday()};UNTIL={time.strftime('%Y%m%dT%H%M%SZ', until)}"
+
+
+def detect_series(schedule, min_occurrences=MIN_OCCURRENCES):
+    """
+    Split a schedule into (series, singles).
+
+    Sessions identical in title, times, description and type form a series when they
+    occur on every matching weekday between their first and last date. Everything else
+    is returned as (date, session) singles.
+    """
+    groups = {}
+    singles = []
+    for day_schedule in schedule:
+        day = _as_date(day_schedule['date'])
+        for session in day_schedule['sessions']:
+            identity = (session['title'], session['start'], session['end'],
+                        session.get('description'), session.get('type'))
+            dates = groups.setdefault(identity, {})
+            if day in dates:
+                # A second copy on the same day cannot share the series
+                singles.append((day, session))
+            else:
+                dates[day] = session
+
+    series = []
+    for dates in groups.values():
+        days = sorted(dates)
+        candidate = Series(dates[days[0]], {day.weekday() for day in days}, days[0], days[-1])
+        if len(days) >= min_occurrences and len(candidate) == len(days):
+            series.append(candidate)
+        else:
+            singles.extend((day, dates[day]) for day in days)
+
+    singles.sort(key=_order)
+    return series, singles
+
@@ -6,90 +6,70 @@ A clean web UI for creating optimized schedules and managing Google Calendar
 
 import os
 import json
-from datetime import datetime, timedelta
-from flask import Flask, render_template, request, jsonify
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
-import pickle
+import secrets
+import time
+from datetime import date, datetime
+from flask import Flask, Response, g, redirect, render_template, request, jsonify, session, stream_with_context
+from calendar_service import calendar_service_manager, build_calendar_service, CalendarServicePool, DEFAULT_USER
+from calendar_client import calendar_client, current_user as api_user, acting_as
+from token_store import TokenStore
+from event_store import event_store
+from conflicts import schedule_intervals, event_intervals, find_conflicts
+from scheduler_engine import DAY_NAMES, plan_weeks, week_start
+from timeslots import parse_hhmm, format_minutes
+from freebusy import freebusy_report
+from jobs import JobQueue
+from schedule_sync import event_key, tag_event, sync_events, session_event
+from bulk_delete import bulk_delete
+from recurrence import Series, detect_series, parse_weekday
+from event_import import IMPORT_BATCH_SIZE, import_events, read_chunks
+from bulk_schedule import generate_schedules, validate_specs
+from nlp_parser import MAX_TEXT_LENGTH, cache_info as parser_cache_info, parse_text
+from schedule_store import open_schedule_store
+from schedule_templates import get_template, instantiate, list_templates
+from watch_channels import ChannelStore, ResyncQueue
+from timezones import (DEFAULT_TIMEZONE, date_range, day_ordinal, event_seconds, get_zone, local_today, session_minutes,
+                       to_epoch_minutes)
+import http_cache
+import metrics
+import profiling
+from metrics import timed
 
 # If modifying these scopes, delete the file token.pickle.
 SCOPES = ['https://www.googleapis.com/auth/calendar']
 
+# Session cookies name the signed-in user, so anyone holding the signing key can act as
+# any user; Google sign-in stays off until SECRET_KEY is set to a real secret
+PLACEHOLDER_SECRET_KEY = 'your-secret-key-change-this-in-production'
+SECRET_KEY = os.environ.get('SECRET_KEY')
+USER_SIGN_IN = bool(SECRET_KEY) and SECRET_KEY != PLACEHOLDER_SECRET_KEY
+
 app = Flask(__name__)
-app.secret_key = os.environ.get('SECRET_KEY', 'your-secret-key-change-this-in-production')
+# Without a configured key, sessions only carry the timezone and OAuth state of this process
+app.secret_key = SECRET_KEY if USER_SIGN_IN else secrets.token_hex(32)
+if not USER_SIGN_IN:
+    print("⚠️ SECRET_KEY is unset or the placeholder: Google sign-in is disabled, "
+          "only the deployment-wide calendar is served")
+metrics.init_app(app)
+profiling.init_app(app)
 
 class ScheduleCreator:
-    def __init__(self):
+    def __init__(self, user=DEFAULT_USER, timezone=DEFAULT_TIMEZONE):
+        self.user = user
+        self.timezone = timezone
         self.service = None
         
+    @timed('authenticate_google_calendar')
     def authenticate_google_calendar(self):
-        """Authenticate and return Google Calendar service"""
-        creds = None
-        
-        # Try to load credentials from environment variable (Railway)
-        creds_json_env = os.environ.get('GOOGLE_CREDENTIALS')
-        token_env = os.environ.get('GOOGLE_TOKEN')
-        
-        if creds_json_env and token_env:
-            try:
-                import base64
-                import json
-                import io
-                print("Loading credentials from environment variables...")
-                print(f"Credentials length: {len(creds_json_env)}")
-                print(f"Token length: {len(token_env)}")
-                
-                # Remove quotes if present
-                if creds_json_env.startswith('"') and creds_json_env.endswith('"'):
-                    creds_json_env = creds_json_env[1:-1]
-                if token_env.startswith('"') and token_env.endswith('"'):
-                    token_env = token_env[1:-1]
-                
-                # Decode base64 token
-                token_data = base64.b64decode(token_env)
-                token_file = io.BytesIO(token_data)
-                creds = pickle.load(token_file)
-                print("✅ Successfully loaded token from environment")
-                print(f"Token valid: {creds.valid if creds else None}")
-            except Exception as e:
-                print(f"❌ Error loading credentials from environment: {e}")
-                import traceback
-                traceback.print_exc()
-                return None
-        
-        # Check for existing token file
-        if not creds and os.path.exists('token.pickle'):
-            try:
-                print("Loading token from file...")
-                with open('token.pickle', 'rb') as token:
-                    creds = pickle.load(token)
-                print("✅ Successfully loaded token from file")
-            except Exception as e:
-                print(f"❌ Error loading token file: {e}")
-                return None
-        
-        # If there are no (valid) credentials available, let the user log in.
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                try:
-                    print("🔄 Refreshing expired credentials...")
-                    creds.refresh(Request())
-                except Exception as e:
-                    print(f"Error refreshing credentials: {e}")
-                    return None
-            else:
-                print("No valid credentials found")
-                return None
-        
-        try:
-            self.service = build('calendar', 'v3', credentials=creds)
-            return self.service
-        except Exception as e:
-            print(f"Error building calendar service: {e}")
-            return None
+        """Return the user's Google Calendar service cached for this worker"""
+        self.service = self.get_service()
+        return self.service
     
+    def get_service(self):
+        """The user's service for the calling thread (batch and freebusy fan-out threads call this)"""
+        return calendar_service_pool.get_service(self.user)
+    
+    @timed('create_optimized_schedule')
     def create_optimized_schedule(self, schedule_config):
         """Create optimized schedule based on configuration"""
         
@@ -97,213 +77,51 @@ class ScheduleCreator:
         if 'events' in schedule_config and schedule_config['events']:
             return self.create_custom_schedule(schedule_config['events'])
         
-        # Get current date and calculate the week
-        today = datetime.now()
-        days_ahead = 6 - today.weekday()  # Sunday is 6
-        if days_ahead == 7:
-            days_ahead = 0
-        elif days_ahead > 0:
-            days_ahead -= 7
+        # Or a named day template laid over consecutive days
+        if schedule_config.get('template'):
+            return self.create_custom_schedule(self.instantiate_template(schedule_config['template'], schedule_config))
         
-        sunday = today + timedelta(days=days_ahead)
+        # Start from this week's Sunday in the user's timezone unless a start is given
+        start = schedule_config.get('start')
+        sunday = week_start(datetime.strptime(start, '%Y-%m-%d').date() if start else local_today(self.timezone))
         
-        # Optimized schedule based on research
-        optimized_schedule = [
-            {
-                'date': sunday,
-                'day_name': 'Sunday',
-                'theme': '📊 ANALYSIS & PLANNING',
-                'sessions': [
-                    {
-                        'title': '🔍 JIRA Analysis - Git Comparison',
-                        'start': '09:00',
-                        'end': '10:15',
-                        'description': 'Deep analysis of JIRA tickets and Git commits',
-                        'type': 'high_cognitive'
-                    },
-                    {
-                        'title': '🔍 Test Failure Investigation',
-                        'start': '10:30',
-                        'end': '11:45',
-                        'description': 'Investigate and document test failures',
-                        'type': 'high_cognitive'
-                    },
-                    {
-                        'title': '📝 Use Case Documentation',
-                        'start': '14:00',
-                        'end': '15:15',
-                        'description': 'Document use cases and requirements',
-                        'type': 'medium_cognitive'
-                    },
-                    {
-                        'title': '📝 Implementation Planning',
-                        'start': '15:30',
-                        'end': '16:45',
-                        'description': 'Plan implementation approach and timeline',
-                        'type': 'medium_cognitive'
-                    }
-                ]
-            },
-            {
-                'date': sunday + timedelta(days=1),
-                'day_name': 'Monday',
-                'theme': '🔧 DEVELOPMENT FOCUS',
-                'sessions': [
-                    {
-                        'title': '🔧 Core Logic Implementation',
-                        'start': '09:00',
-                        'end': '10:15',
-                        'description': 'Implement core business logic',
-                        'type': 'high_cognitive'
-                    },
-                    {
-                        'title': '🔧 Integration Development',
-                        'start': '10:30',
-                        'end': '11:45',
-                        'description': 'Develop integration components',
-                        'type': 'high_cognitive'
-                    },
-                    {
-                        'title': '🔍 Test Environment Setup',
-                        'start': '14:00',
-                        'end': '15:15',
-                        'description': 'Set up and configure test environments',
-                        'type': 'medium_cognitive'
-                    },
-                    {
-                        'title': '🔍 Integration Test Development',
-                        'start': '15:30',
-                        'end': '16:45',
-                        'description': 'Develop integration tests',
-                        'type': 'medium_cognitive'
-                    }
-                ]
-            },
-            {
-                'date': sunday + timedelta(days=2),
-                'day_name': 'Tuesday',
-                'theme': '📚 BOOTCAMP & DEVELOPMENT',
-                'sessions': [
-                    {
-                        'title': '📚 Bootcamp Session',
-                        'start': '08:00',
-                        'end': '13:00',
-                        'description': 'Organization-wide bootcamp training',
-                        'type': 'learning'
-                    },
-                    {
-                        'title': '🔧 Post-Bootcamp Development',
-                        'start': '14:00',
-                        'end': '15:15',
-                        'description': 'Apply bootcamp learnings to development',
-                        'type': 'medium_cognitive'
-                    },
-                    {
-                        'title': '🔍 Testing & Debugging',
-                        'start': '15:30',
-                        'end': '16:45',
-                        'description': 'Test and debug developed features',
-                        'type': 'medium_cognitive'
-                    },
-                    {
-                        'title': '🔧 Regular JIRA Tasks',
-                        'start': '17:00',
-                        'end': '18:15',
-                        'description': 'Work on regular JIRA tickets',
-                        'type': 'low_cognitive'
-                    }
-                ]
-            },
-            {
-                'date': sunday + timedelta(days=3),
-                'day_name': 'Wednesday',
-                'theme': '🔍 TESTING & REVIEW',
-                'sessions': [
-                    {
-                        'title': '🔍 Comprehensive Testing',
-                        'start': '09:00',
-                        'end': '10:15',
-                        'description': 'Execute comprehensive test suite',
-                        'type': 'high_cognitive'
-                    },
-                    {
-                        'title': '🔍 Bug Fixing Session',
-                        'start': '10:30',
-                        'end': '11:45',
-                        'description': 'Fix identified bugs and issues',
-                        'type': 'high_cognitive'
-                    },
-                    {
-                        'title': '🔧 Final Development Push',
-                        'start': '13:00',
-                        'end': '14:15',
-                        'description': 'Complete remaining development tasks',
-                        'type': 'medium_cognitive'
-                    },
-                    {
-                        'title': '🎯 Code Review Preparation',
-                        'start': '14:30',
-                        'end': '15:45',
-                        'description': 'Prepare code for review submission',
-                        'type': 'medium_cognitive'
-                    }
-                ]
-            },
-            {
-                'date': sunday + timedelta(days=4),
-                'day_name': 'Thursday',
-                'theme': '📚 BOOTCAMP & FINALIZATION',
-                'sessions': [
-                    {
-                        'title': '📚 Bootcamp Session',
-                        'start': '08:00',
-                        'end': '13:00',
-                        'description': 'Organization-wide bootcamp training',
-                        'type': 'learning'
-                    },
-                    {
-                        'title': '🎯 Final Review & Submission',
-                        'start': '14:00',
-                        'end': '15:15',
-                        'description': 'Final code review and submission',
-                        'type': 'medium_cognitive'
-                    },
-                    {
-                        'title': '📝 Documentation Finalization',
-                        'start': '15:30',
-                        'end': '16:45',
-                        'description': 'Finalize all documentation',
-                        'type': 'low_cognitive'
-                    },
-                    {
-                        'title': '🎯 Project Wrap-up',
-                        'start': '17:00',
-                        'end': '18:15',
-                        'description': 'Project closure and wrap-up activities',
-                        'type': 'low_cognitive'
-                    }
-                ]
-            }
-        ]
+        # Place the tasks into each week's free time around the blocked windows
+        schedule, stats = plan_weeks(schedule_config, sunday, int(schedule_config.get('weeks', 1)))
+        if stats['unplaced']:
+            print(f"⚠️ Could not place {stats['unplaced']} tasks: {', '.join(stats['unplaced_titles'])}")
         
-        return optimized_schedule
+        return schedule
     
+    def instantiate_template(self, name, options):
+        """Events of a day template from options' start (default today in the user's timezone) over 'days' days"""
+        weekdays = options.get('weekdays')
+        return instantiate(
+            name,
+            options.get('start') or local_today(self.timezone),
+            days=int(options.get('days', 1)),
+            weekdays={parse_weekday(day) for day in weekdays} if weekdays else None,
+            shift=int(options.get('shift_minutes', 0))
+        )
+    
+    @timed('create_custom_schedule')
     def create_custom_schedule(self, events):
         """Create schedule from custom events"""
         schedule = []
         
-        # Group events by date
+        # Group events by date; events with a 'repeat' pattern land on each of their dates
         events_by_date = {}
         for event in events:
-            date_str = event['date']
-            if date_str not in events_by_date:
-                events_by_date[date_str] = []
-            events_by_date[date_str].append(event)
+            dates = [event['date']]
+            if event.get('repeat'):
+                series = Series.from_repeat(event, event['date'], event['repeat'])
+                dates = [day.strftime('%Y-%m-%d') for day in series.dates()]
+            for date_str in dates:
+                events_by_date.setdefault(date_str, []).append(event)
         
         # Convert to schedule format
-        for date_str, day_events in events_by_date.items():
-            date_obj = datetime.strptime(date_str, '%Y-%m-%d').date()
-            day_name = date_obj.strftime('%A')
+        for date_str, day_events in sorted(events_by_date.items()):
+            date_obj = date.fromordinal(day_ordinal(date_str))
+            day_name = DAY_NAMES[date_obj.weekday()]
             
             sessions = []
             for event in day_events:
@@ -311,12 +129,7 @@ class ScheduleCreator:
                 duration = event.get('duration', 60)
                 
                 # Calculate end time
-                start_hour, start_min = map(int, start_time.split(':'))
-                start_minutes = start_hour * 60 + start_min
-                end_minutes = start_minutes + duration
-                end_hour = end_minutes // 60
-                end_min = end_minutes % 60
-                end_time = f"{end_hour:02d}:{end_min:02d}"
+                end_time = format_minutes(parse_hhmm(start_time) + int(duration))
                 
                 sessions.append({
                     'title': event['title'],
@@ -335,94 +148,204 @@ class ScheduleCreator:
         
         return schedule
     
-    def save_schedule_to_calendar(self, schedule):
-        """Save schedule to Google Calendar"""
+    @timed('find_schedule_conflicts')
+    def find_schedule_conflicts(self, schedule):
+        """Find sessions overlapping each other or events already on the calendar"""
+        proposed = schedule_intervals(schedule, self.timezone)
+        existing = []
+        if proposed and self.service:
+            # Intervals are epoch minutes, the event store takes seconds
+            existing = event_intervals(event_store.get_events(
+                self.service,
+                time_min=min(start for start, _, _ in proposed) * 60,
+                time_max=max(end for _, end, _ in proposed) * 60,
+                user=self.user
+            ), self.timezone)
+        return find_conflicts(proposed, existing)
+    
+    @timed('save_schedule_to_calendar')
+    def save_schedule_to_calendar(self, schedule, on_progress=None, schedule_name='default', replace=False):
+        """
+        Sync schedule to Google Calendar, returning (success, message, per-event results).
+        Events are tagged with a stable key so saving the same schedule again writes nothing.
+        Sessions repeating weekly are written as a single recurring event. With replace,
+        events saved earlier under schedule_name on the days this schedule has sessions
+        and no longer part of it are deleted; otherwise nothing is deleted.
+        on_progress(None, total=n) is called before writing, then on_progress(result) per event.
+        """
         if not self.service:
-            return False, "Google Calendar not authenticated"
+            return False, "Google Calendar not authenticated", []
+        
+        if not schedule:
+            return True, "No events to save", []
         
         try:
-            # Get primary calendar
-            calendar_list = self.service.calendarList().list().execute()
-            primary_calendar_id = None
+            desired = {}
+            sessions = {}
+            occurrences = {}
+            
+            # Sessions repeating weekly go out as one RRULE event instead of one per day
+            series_list, singles = detect_series(schedule)
             
-            for calendar in calendar_list.get('items', []):
-                if calendar.get('primary'):
-                    primary_calendar_id = calendar['id']
-                    break
+            for series in series_list:
+                session = series.session
+                date_str = series.first.strftime('%Y-%m-%d')
+                # Keyed on the first date, not UNTIL: extending the plan patches UNTIL on the same
+                # event, while a series starting another week is a separate event
+                key = event_key(schedule_name, 'series', date_str, session['title'], session['start'], session['end'],
+                                series.byday())
+                start, end = session_minutes(series.first, session, self.timezone)
+                event = session_event(session, start, end, self.timezone)
+                event['recurrence'] = [series.rrule(self.timezone)]
+                desired[key] = tag_event(event, key, schedule_name, sessionType=session['type'])
+                sessions[key] = (date_str, session, series)
             
-            if not primary_calendar_id:
-                return False, "Primary calendar not found"
+            for day, session in singles:
+                date_str = day.strftime('%Y-%m-%d')
+                # Key on date and title so a moved session is patched rather than duplicated
+                occurrence = occurrences.get((date_str, session['title']), 0)
+                occurrences[(date_str, session['title'])] = occurrence + 1
+                key = event_key(schedule_name, date_str, session['title'], occurrence)
+                
+                start, end = session_minutes(day, session, self.timezone)
+                event = session_event(session, start, end, self.timezone)
+                desired[key] = tag_event(event, key, schedule_name, sessionType=session['type'])
+                sessions[key] = (date_str, session, None)
+            
+            # Only days with sessions are replaced; the days in between are left alone
+            days = {date_str for date_str, _, series in sessions.values() if series is None}
+            for series in series_list:
+                days.update(day.strftime('%Y-%m-%d') for day in series.dates())
+            dates = sorted(days)
+            time_min, time_max = date_range(dates[0], dates[-1], self.timezone)
             
-            created_count = 0
+            results = []
             
-            for day_schedule in schedule:
-                for session in day_schedule['sessions']:
-                    event = {
-                        'summary': session['title'],
-                        'description': f"{session['description']}\n\n📊 Session Type: {session['type']}\n⏰ Duration: 75 minutes\n🎯 Optimized for productivity",
-                        'start': {
-                            'dateTime': f"{day_schedule['date'].strftime('%Y-%m-%d')}T{session['start']}:00",
-                            'timeZone': 'America/New_York',
-                        },
-                        'end': {
-                            'dateTime': f"{day_schedule['date'].strftime('%Y-%m-%d')}T{session['end']}:00",
-                            'timeZone': 'America/New_York',
-                        },
-                        'reminders': {
-                            'useDefault': False,
-                            'overrides': [
-                                {'method': 'email', 'minutes': 1440},
-                                {'method': 'popup', 'minutes': 15},
-                            ],
-                        },
+            def record(key, action, response, exception):
+                if key not in sessions:
+                    result = {'title': None, 'event_id': key, 'action': action, 'success': exception is None}
+                else:
+                    date_str, session, series = sessions[key]
+                    result = {
+                        'title': session['title'],
+                        'date': date_str,
+                        'start': session['start'],
+                        'action': action,
+                        'success': exception is None
                     }
-                    
-                    try:
-                        self.service.events().insert(
-                            calendarId=primary_calendar_id,
-                            body=event
-                        ).execute()
-                        created_count += 1
-                    except Exception as e:
-                        print(f"❌ Failed to create '{session['title']}': {e}")
+                    if series:
+                        result['recurrence'] = series.byday()
+                        result['until'] = series.until.strftime('%Y-%m-%d')
+                        result['occurrences'] = len(series)
+                if exception is None:
+                    result['event_id'] = response.get('id') if response else result.get('event_id')
+                else:
+                    result['error'] = str(exception)
+                    print(f"❌ Failed to sync '{result['title'] or key}': {exception}")
+                results.append(result)
+                if on_progress and key in sessions:
+                    on_progress(result)
+            
+            if on_progress:
+                on_progress(None, total=len(sessions))
+            
+            summary = sync_events(self.service, desired, schedule_name, time_min, time_max, on_result=record,
+                                  get_service=self.get_service, delete_missing=replace, delete_days=days,
+                                  timezone=self.timezone)
             
-            return True, f"Successfully created {created_count} events"
+            message = (f"Created {len(summary['inserted'])}, updated {len(summary['updated'])}, "
+                       f"deleted {len(summary['deleted'])}, unchanged {len(summary['unchanged'])} events")
+            if summary['failed']:
+                message += f", {len(summary['failed'])} failed"
+            return not summary['failed'], message, results
             
         except Exception as e:
-            return False, f"Error saving to calendar: {e}"
+            return False, f"Error saving to calendar: {e}", []
     
-    def save_schedule_to_file(self, schedule):
-        """Save schedule to JSON file"""
+    @timed('save_schedule_to_store')
+    def save_schedule_to_store(self, schedule):
+        """Store a new version of each changed week of the user's schedule"""
         try:
-            schedule_data = {
-                'created_at': datetime.now().isoformat(),
-                'schedule': []
-            }
-            
-            for day_schedule in schedule:
-                day_data = {
-                    'date': day_schedule['date'].strftime('%Y-%m-%d'),
-                    'day_name': day_schedule['day_name'],
-                    'theme': day_schedule['theme'],
-                    'sessions': day_schedule['sessions']
-                }
-                schedule_data['schedule'].append(day_data)
-            
-            with open('schedule_backup.json', 'w') as f:
-                json.dump(schedule_data, f, indent=2)
-            
-            return True, "Schedule saved to schedule_backup.json"
+            written = schedule_store.save(self.user, schedule)
+            if not written:
+                return True, "Schedule unchanged, no new version stored"
+            weeks = ', '.join(f"{item['week']} v{item['version']}" for item in written)
+            return True, f"Schedule saved ({weeks})"
             
         except Exception as e:
             return False, f"Error saving schedule: {e}"
 
-# Global schedule creator instance
-schedule_creator = ScheduleCreator()
+# Calendar services of signed-in users; the 'default' user is the deployment-wide token
+calendar_service_pool = CalendarServicePool(TokenStore(), fallback=calendar_service_manager, enabled=USER_SIGN_IN)
+
+# Versioned schedule history shared by all workers
+schedule_store = open_schedule_store()
+
+# Background jobs for long-running schedule writes
+job_queue = JobQueue(dumps=app.json.dumps)
+
+# Serialized calendar reads keyed by user, range and event cache version
+response_cache = http_cache.ResponseCache()
+
+# Longest ?start=&end= span /api/get-calendar-events serves
+MAX_EVENT_RANGE_DAYS = 400
+
+def resync_calendar(user, calendar_id):
+    """Pull a calendar Google reported as changed into this worker's event cache"""
+    service = calendar_service_pool.get_service(user)
+    if service is None:
+        return
+    with acting_as(user):
+        event_store.refresh(service, calendar_id, force_refresh=True, user=user)
+
+# Push notifications from Google replace polling when CALENDAR_WEBHOOK_URL is set
+channel_store = ChannelStore()
+resync_queue = ResyncQueue(resync_calendar)
+if channel_store.address:
+    channel_store.start_renewal(calendar_service_pool.get_service)
+
+def current_user():
+    """ID of the signed-in Google user, or the deployment-wide 'default' user"""
+    if not USER_SIGN_IN:
+        return DEFAULT_USER
+    return session.get('user', DEFAULT_USER)
+
+def current_timezone(data=None):
+    """Timezone named in the request, else the signed-in user's calendar timezone; ValueError if unknown"""
+    timezone = (data or {}).get('timezone') or session.get('timezone') or DEFAULT_TIMEZONE
+    get_zone(timezone)
+    return timezone
+
+@app.before_request
+def bind_api_user():
+    # Charge this request's Calendar API calls to the signed-in user's quota
+    g.api_user_token = api_user.set(current_user())
+
+@app.teardown_request
+def unbind_api_user(exception):
+    token = g.pop('api_user_token', None)
+    if token is not None:
+        api_user.reset(token)
+
+def oauth_flow(state=None):
+    """OAuth web flow for the app's client secrets (GOOGLE_CREDENTIALS or credentials.json)"""
+    from google_auth_oauthlib.flow import Flow
+    
+    redirect_uri = os.environ.get('OAUTH_REDIRECT_URI') or request.url_root.rstrip('/') + '/api/auth/google/callback'
+    creds_json_env = os.environ.get('GOOGLE_CREDENTIALS')
+    if creds_json_env:
+        flow = Flow.from_client_config(json.loads(creds_json_env), scopes=SCOPES, state=state, redirect_uri=redirect_uri)
+    else:
+        flow = Flow.from_client_secrets_file('credentials.json', scopes=SCOPES, state=state, redirect_uri=redirect_uri)
+    return flow
 
 @app.route('/')
 def index():
-    """Main page"""
-    return render_template('schedule_creator.html')
+    """Main page, rendered once per worker and revalidated by ETag"""
+    page = getattr(app, '_index_page', None)
+    if page is None or app.debug:
+        page = app._index_page = http_cache.CachedBody(render_template('schedule_creator.html').encode('utf-8'))
+    return http_cache.send(page, 'text/html', cache_control='no-cache')
 
 @app.route('/api/test-credentials')
 def test_credentials():
@@ -436,62 +359,131 @@ def test_credentials():
         'both_set': creds_exists and token_exists
     })
 
+@app.route('/api/service-stats')
+def service_stats():
+    """Report credential/service cache and API throttling/retry counters for this worker"""
+    stats = calendar_service_manager.get_stats()
+    stats['api'] = calendar_client.get_stats()
+    stats['users'] = calendar_service_pool.get_stats()
+    stats['parser_cache'] = parser_cache_info()
+    stats['responses'] = response_cache.get_stats()
+    stats['channels'] = channel_store.get_stats()
+    stats['resyncs'] = resync_queue.get_stats()
+    return jsonify(stats)
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Timing histograms and API counters of this worker in Prometheus text format"""
+    service = calendar_service_manager.get_stats()
+    users = calendar_service_pool.get_stats()
+    api = calendar_client.get_stats()
+    gauges = [
+        ('schedule_service_cache_total', 'Calendar service cache lookups', 'counter',
+         {(('result', 'hit'),): service.get('hits'), (('result', 'miss'),): service.get('misses')}),
+        ('schedule_credential_refreshes_total', 'OAuth token refreshes', 'counter',
+         {(('result', 'ok'),): service.get('refreshes'), (('result', 'failed'),): service.get('refresh_failures')}),
+        ('schedule_user_pool_lookups_total', 'Signed-in user credential pool lookups', 'counter',
+         {(('result', 'hit'),): users['hits'], (('result', 'miss'),): users['misses']}),
+        ('schedule_user_pool_evictions_total', 'Users dropped from the credential pool', 'counter', users['evictions']),
+        ('schedule_user_pool_size', 'Signed-in users cached by this worker', 'gauge', users['cached_users']),
+        ('schedule_user_token_refreshes_total', 'Signed-in user token refreshes', 'counter',
+         {(('result', 'ok'),): users['refreshes'], (('result', 'failed'),): users['refresh_failures']}),
+        ('schedule_google_api_requests_total', 'Calendar API calls sent, batch sub-requests included', 'counter', api['requests']),
+        ('schedule_google_api_throttled_total', 'Calendar API calls rejected by rate limiting', 'counter', api['throttled']),
+        ('schedule_google_api_retries_total', 'Calendar API calls retried', 'counter', api['retries']),
+        ('schedule_google_api_failures_total', 'Calendar API calls that failed for good', 'counter', api['failures']),
+        ('schedule_google_api_rate_limit_wait_seconds_total', 'Time spent waiting on the local rate limiter', 'counter',
+         api['rate_limit_wait_seconds']),
+    ]
+    return Response(metrics.render_prometheus(gauges), mimetype='text/plain; version=0.0.4')
+
 @app.route('/api/get-calendar-events')
 def get_calendar_events():
-    """Get calendar events from Google Calendar"""
+    """
+    Calendar events of the signed-in user between the local dates ?start= and ?end=
+    (inclusive, in ?timezone= or the user's timezone), by default the next 7 days.
+    Answers 304 when the client already has the same events.
+    """
     try:
-        service = schedule_creator.authenticate_google_calendar()
+        user = current_user()
+        service = ScheduleCreator(user).authenticate_google_calendar()
         if not service:
             return jsonify({'success': False, 'message': 'Not authenticated'})
         
-        # Get events for the next 7 days
-        now = datetime.now()
-        time_min = now.isoformat() + 'Z'
-        time_max = (now + timedelta(days=7)).isoformat() + 'Z'
-        
-        events_result = service.events().list(
-            calendarId='primary',
-            timeMin=time_min,
-            timeMax=time_max,
-            singleEvents=True,
-            orderBy='startTime'
-        ).execute()
-        
-        events = events_result.get('items', [])
-        
-        # Format events
-        formatted_events = []
-        for event in events:
-            start = event['start'].get('dateTime', event['start'].get('date'))
-            end = event['end'].get('dateTime', event['end'].get('date'))
-            
-            formatted_events.append({
-                'title': event.get('summary', 'No Title'),
-                'start': start,
-                'end': end,
-                'description': event.get('description', '')
-            })
+        if request.args.get('start') and request.args.get('end'):
+            try:
+                timezone = current_timezone(request.args)
+                first, last = day_ordinal(request.args['start']), day_ordinal(request.args['end'])
+                if not 0 <= last - first < MAX_EVENT_RANGE_DAYS:
+                    raise ValueError(f'end must be within {MAX_EVENT_RANGE_DAYS} days after start')
+            except ValueError as e:
+                return jsonify({'success': False, 'message': str(e)}), 400
+            time_min = to_epoch_minutes(first, 0, timezone) * 60
+            time_max = to_epoch_minutes(last + 1, 0, timezone) * 60
+        else:
+            # Whole minutes, so repeated loads share a cache entry
+            time_min = int(time.time()) // 60 * 60
+            time_max = time_min + 7 * 24 * 3600
         
-        return jsonify({'success': True, 'events': formatted_events})
+        # Watched calendars resync when Google reports a change, others when the copy is old;
+        # the response is rebuilt only if that changed anything
+        try:
+            channel_store.ensure(service, user)
+        except Exception as e:
+            print(f"⚠️ Could not watch calendar of {user}, polling it instead: {e}")
+        event_store.refresh(service, force_refresh=request.args.get('refresh') == '1', user=user,
+                            changed_at=channel_store.changed_at(user))
+        key = (user, time_min, time_max, event_store.version(user=user))
+        cached = response_cache.get(key)
+        if cached is None:
+            events = event_store.query(time_min, time_max, user=user)
+            cached = response_cache.put(key, app.json.dumps({'success': True, 'events': events}).encode('utf-8'))
+        return http_cache.send(cached, 'application/json', cache=response_cache)
         
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
 
+@app.route('/webhooks/calendar', methods=['POST'])
+def calendar_webhook():
+    """Google Calendar push notification: resync the calendar that changed"""
+    state = request.headers.get('X-Goog-Resource-State')
+    channel = channel_store.notify(
+        request.headers.get('X-Goog-Channel-ID'),
+        request.headers.get('X-Goog-Channel-Token'),
+        request.headers.get('X-Goog-Resource-ID'),
+        state
+    )
+    if channel is None:
+        # Stopped, replaced or forged; Google only retries 5xx answers
+        return jsonify({'success': False, 'message': 'Unknown channel'}), 404
+    if state != 'sync':
+        resync_queue.submit(channel.user, channel.calendar_id)
+    return '', 204
+
 @app.route('/api/auth/google')
 def auth_google():
-    """Authenticate with Google Calendar"""
+    """Authenticate with Google Calendar; auth_url signs a user in with their own account"""
     try:
-        service = schedule_creator.authenticate_google_calendar()
+        service = ScheduleCreator(current_user()).authenticate_google_calendar()
         if service:
             return jsonify({
                 'success': True, 
                 'message': 'Google Calendar authenticated successfully',
+                'user': current_user(),
+                'timezone': current_timezone(),
                 'info': 'To use this feature, you need credentials.json and token.pickle files from Google Cloud Console'
             })
+        elif not USER_SIGN_IN:
+            return jsonify({
+                'success': False,
+                'message': 'Google Calendar authentication failed',
+                'info': 'Signing in with your own Google account needs SECRET_KEY to be set on the server.'
+            })
         else:
             return jsonify({
                 'success': False, 
                 'message': 'Google Calendar authentication failed',
+                'auth_url': '/api/auth/google/login',
                 'info': 'Missing credentials.json or token.pickle. Please add these files to your deployment for Google Calendar integration to work.'
             })
     except Exception as e:
@@ -501,30 +493,358 @@ def auth_google():
             'info': 'Google Calendar authentication requires credentials.json and token.pickle files'
         })
 
+@app.route('/api/auth/google/login')
+def auth_google_login():
+    """Start the OAuth web flow so a user can connect their own calendar"""
+    if not USER_SIGN_IN:
+        return jsonify({'success': False, 'message': 'Google sign-in is disabled: SECRET_KEY is not set'}), 503
+    try:
+        flow = oauth_flow()
+        auth_url, state = flow.authorization_url(access_type='offline', include_granted_scopes='true', prompt='consent')
+        session['oauth_state'] = state
+        return redirect(auth_url)
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Cannot start Google sign-in: {e}'}), 500
+
+@app.route('/api/auth/google/callback')
+def auth_google_callback():
+    """Finish the OAuth web flow and sign the user in under their primary calendar ID"""
+    if not USER_SIGN_IN:
+        return jsonify({'success': False, 'message': 'Google sign-in is disabled: SECRET_KEY is not set'}), 503
+    state = session.pop('oauth_state', None)
+    if not state or request.args.get('state') != state:
+        return jsonify({'success': False, 'message': 'Invalid OAuth state'}), 400
+    try:
+        flow = oauth_flow(state)
+        authorization_response = request.url
+        if flow.redirect_uri.startswith('https://'):
+            # TLS ends at the proxy, so Flask sees the callback as plain http
+            authorization_response = authorization_response.replace('http://', 'https://', 1)
+        flow.fetch_token(authorization_response=authorization_response)
+        creds = flow.credentials
+        
+        # The primary calendar's ID is the account's email address
+        service = build_calendar_service(creds)
+        calendar = calendar_client.execute(service.calendars().get(calendarId='primary'))
+        user = calendar['id']
+        
+        calendar_service_pool.sign_in(user, creds)
+        session['user'] = user
+        # Schedules are laid out in the user's own calendar timezone
+        session['timezone'] = calendar.get('timeZone') or DEFAULT_TIMEZONE
+        return redirect('/')
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Google sign-in failed: {e}'}), 400
+
+@app.route('/api/auth/logout', methods=['POST'])
+def auth_logout():
+    """Sign the current user out and forget their token"""
+    user = session.pop('user', None)
+    session.pop('timezone', None)
+    if user:
+        service = calendar_service_pool.get_service(user)
+        if service:
+            channel_store.stop_all(service, user)
+        calendar_service_pool.sign_out(user)
+        event_store.forget(user)
+        response_cache.discard(lambda key: key[0] == user)
+    return jsonify({'success': True, 'user': DEFAULT_USER})
+
+def run_create_schedule(data, on_progress=None, user=DEFAULT_USER, timezone=DEFAULT_TIMEZONE):
+    """Generate a schedule, write it to the user's calendar and back it up; returns the response body"""
+    with acting_as(user):
+        return _create_schedule(ScheduleCreator(user, timezone), data, on_progress)
+
+def _create_schedule(creator, data, on_progress):
+    """Body of run_create_schedule, with Calendar API calls charged to creator.user"""
+    # Create optimized schedule
+    schedule = creator.create_optimized_schedule(data)
+    creator.authenticate_google_calendar()
+    
+    # Optionally refuse to save a schedule that overlaps itself or the calendar
+    if data.get('check_conflicts'):
+        conflicts = creator.find_schedule_conflicts(schedule)
+        if conflicts and not data.get('allow_conflicts'):
+            return {
+                'success': False,
+                'message': f'Schedule has {len(conflicts)} conflicts',
+                'schedule': schedule,
+                'conflicts': conflicts
+            }
+    
+    # Save to calendar
+    calendar_success, calendar_message, calendar_results = creator.save_schedule_to_calendar(
+        schedule, on_progress, schedule_name=data.get('name') or 'default', replace=bool(data.get('replace'))
+    )
+    event_store.invalidate(user=creator.user)
+    
+    # Keep a versioned copy
+    file_success, file_message = creator.save_schedule_to_store(schedule)
+    
+    return {
+        'success': calendar_success and file_success,
+        'schedule': schedule,
+        'calendar_message': calendar_message,
+        'calendar_results': calendar_results,
+        'file_message': file_message,
+        'message': calendar_message if not calendar_success else file_message
+    }
+
+def create_schedule_job(job, data, user, timezone):
+    """Background job wrapper around run_create_schedule that reports per-event progress"""
+    def on_progress(result, total=None):
+        if total is not None:
+            job.set_total(total)
+        else:
+            job.record(result, success=result['success'])
+    
+    return run_create_schedule(data, on_progress, user, timezone)
+
 @app.route('/api/create-schedule', methods=['POST'])
 def create_schedule():
-    """Create optimized schedule"""
+    """Create optimized schedule (in the background when the body sets "async": true)"""
     try:
         data = request.get_json()
+        timezone = current_timezone(data)
         
-        # Create optimized schedule
-        schedule = schedule_creator.create_optimized_schedule(data)
+        if data.get('async'):
+            user = current_user()
+            job_id = job_queue.submit('create-schedule', user, create_schedule_job, data, user, timezone)
+            return jsonify({
+                'success': True,
+                'job_id': job_id,
+                'status_url': f'/api/jobs/{job_id}'
+            }), 202
         
-        # Save to calendar
-        calendar_success, calendar_message = schedule_creator.save_schedule_to_calendar(schedule)
+        return jsonify(run_create_schedule(data, user=current_user(), timezone=timezone))
         
-        # Save to file
-        file_success, file_message = schedule_creator.save_schedule_to_file(schedule)
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Error creating schedule: {e}'})
+
+@app.route('/api/jobs/<job_id>')
+def job_status(job_id):
+    """Progress of the caller's background job; ?since=N returns only event results recorded after N"""
+    # Other users' jobs answer 404 like unknown ones, so job IDs cannot be probed
+    job = job_queue.get(job_id, current_user(), since=request.args.get('since', 0, type=int))
+    if not job:
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+    return jsonify({'success': True, 'job': job})
+
+@app.route('/api/check-conflicts', methods=['POST'])
+def check_conflicts():
+    """Check a proposed schedule for overlaps without saving it"""
+    try:
+        data = request.get_json()
+        creator = ScheduleCreator(current_user(), current_timezone(data))
+        schedule = creator.create_optimized_schedule(data)
+        creator.authenticate_google_calendar()
+        conflicts = creator.find_schedule_conflicts(schedule)
         
         return jsonify({
-            'success': calendar_success and file_success,
-            'schedule': schedule,
-            'calendar_message': calendar_message,
-            'file_message': file_message
+            'success': True,
+            'checked_calendar': creator.service is not None,
+            'conflicts': conflicts,
+            'count': len(conflicts)
         })
         
     except Exception as e:
-        return jsonify({'success': False, 'message': f'Error creating schedule: {e}'})
+        return jsonify({'success': False, 'message': f'Error checking conflicts: {e}'})
+
+@app.route('/api/freebusy', methods=['POST'])
+def freebusy():
+    """Free/busy matrix for many calendars over a time range"""
+    try:
+        data = request.get_json() or {}
+        calendar_ids = data.get('calendars') or ['primary']
+        
+        creator = ScheduleCreator(current_user(), current_timezone(data))
+        if not creator.authenticate_google_calendar():
+            return jsonify({'success': False, 'message': 'Not authenticated'})
+        
+        # Default to the next 7 days; times without an offset are in the user's timezone
+        time_min = event_seconds({'dateTime': data['time_min']}, creator.timezone) if data.get('time_min') else time.time()
+        time_max = event_seconds({'dateTime': data['time_max']}, creator.timezone) if data.get('time_max') else time_min + data.get('days', 7) * 24 * 3600
+        
+        report = freebusy_report(
+            creator.get_service,
+            calendar_ids,
+            time_min,
+            time_max,
+            slot_minutes=int(data.get('slot_minutes', 15))
+        )
+        return jsonify({'success': True, **report})
+        
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Error querying free/busy: {e}'})
+
+@app.route('/api/bulk-delete', methods=['POST'])
+def bulk_delete_events():
+    """Delete events in a date range matching title/type/app filters; dry run unless dry_run is false"""
+    try:
+        data = request.get_json() or {}
+        if not data.get('start') or not data.get('end'):
+            return jsonify({'success': False, 'message': 'start and end dates are required'}), 400
+        
+        creator = ScheduleCreator(current_user())
+        service = creator.authenticate_google_calendar()
+        if not service:
+            return jsonify({'success': False, 'message': 'Not authenticated'})
+        
+        time_min, time_max = date_range(data['start'], data['end'], current_timezone(data))
+        report = bulk_delete(
+            service,
+            time_min,
+            time_max,
+            title=data.get('title'),
+            session_type=data.get('type'),
+            app_only=bool(data.get('app_only')),
+            schedule_name=data.get('schedule_name'),
+            dry_run=data.get('dry_run', True) is not False,
+            get_service=creator.get_service
+        )
+        if report['deleted']:
+            event_store.invalidate(user=creator.user)
+        return jsonify({'success': not report['failed'], **report})
+        
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Error deleting events: {e}'})
+
+@app.route('/api/import-events', methods=['POST'])
+def import_events_route():
+    """
+    Stream an NDJSON or JSON array body of events into the calendar in batches.
+    Responds with one NDJSON progress report per written batch; ?name= tags the
+    events, ?validate_only=1 only checks them.
+    """
+    validate_only = request.args.get('validate_only', type=int) == 1
+    user = current_user()
+    try:
+        timezone = current_timezone(request.args)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    service = ScheduleCreator(user).authenticate_google_calendar()
+    if not service and not validate_only:
+        return jsonify({'success': False, 'message': 'Not authenticated'})
+    
+    schedule_name = request.args.get('name', 'import')
+    batch_size = min(request.args.get('batch_size', IMPORT_BATCH_SIZE, type=int), IMPORT_BATCH_SIZE)
+    
+    @stream_with_context
+    def generate():
+        report = None
+        try:
+            for report in import_events(service, read_chunks(request.stream), schedule_name,
+                                        batch_size=max(batch_size, 1), timezone=timezone,
+                                        validate_only=validate_only):
+                yield json.dumps(report) + '\n'
+        except Exception as e:
+            yield json.dumps({'success': False, 'message': f'Import failed: {e}', 'report': report}) + '\n'
+            return
+        finally:
+            if report and report['inserted'] + report['updated']:
+                event_store.invalidate(user=user)
+        yield json.dumps({'success': not (report['failed'] or report['invalid']), 'done': True, **report}) + '\n'
+    
+    return Response(generate(), mimetype='application/x-ndjson')
+
+@app.route('/api/bulk-schedules', methods=['POST'])
+def bulk_schedules():
+    """
+    Plan many users over many weeks in worker processes without touching any calendar.
+    The body is {"users": [{"user": ..., "tasks": [...], "blocked": [...], ...}],
+    "weeks": N, "start": "YYYY-MM-DD", "timezone": ...}. Responds with one NDJSON
+    line per user as each plan finishes, then a summary line.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        specs = validate_specs(data.get('users'))
+        weeks = int(data.get('weeks', 1))
+        start = datetime.strptime(data['start'], '%Y-%m-%d').date() if data.get('start') else None
+        results = generate_schedules(specs, weeks, start, current_timezone(data))
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    def generate():
+        started = time.perf_counter()
+        failed = 0
+        for result in results:
+            failed += not result['success']
+            yield json.dumps(result) + '\n'
+        yield json.dumps({'success': not failed, 'done': True, 'users': len(specs), 'failed': failed,
+                          'seconds': round(time.perf_counter() - started, 3)}) + '\n'
+    
+    return Response(generate(), mimetype='application/x-ndjson')
+
+@app.route('/api/parse', methods=['POST'])
+def parse_events():
+    """
+    Parse natural-language text into events for the custom schedule. The body is
+    {"text": ..., "today": "YYYY-MM-DD", "timezone": ...} or plain text; relative
+    dates count from "today", by default the current date in "timezone" or the
+    user's calendar timezone, one event per sentence or line.
+    """
+    if request.content_length and request.content_length > MAX_TEXT_LENGTH * 4:
+        return jsonify({'success': False, 'message': 'Text too long'}), 413
+    data = request.get_json(silent=True)
+    text = data.get('text', '') if isinstance(data, dict) else request.get_data(as_text=True)
+    if len(text) > MAX_TEXT_LENGTH:
+        return jsonify({'success': False, 'message': 'Text too long'}), 413
+    
+    data = data if isinstance(data, dict) else {}
+    try:
+        today = local_today(current_timezone(data))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    if data.get('today'):
+        try:
+            today = datetime.strptime(data['today'], '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({'success': False, 'message': 'today must be YYYY-MM-DD'}), 400
+    
+    events = parse_text(text, today)
+    return jsonify({'success': True, 'events': events, 'count': len(events)})
+
+@app.route('/api/templates')
+def templates():
+    """Named day templates that can be instantiated into custom schedule events"""
+    return jsonify({'success': True, 'templates': list_templates()})
+
+@app.route('/api/templates/<name>', methods=['POST'])
+def instantiate_template(name):
+    """
+    Events of a day template in the custom schedule format. The body is {"start":
+    "YYYY-MM-DD", "days": N, "weekdays": ["Tue", ...], "shift_minutes": M}, all optional.
+    Post the events to /api/create-schedule to write them.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        get_template(name)
+    except KeyError as e:
+        return jsonify({'success': False, 'message': str(e.args[0])}), 404
+    try:
+        creator = ScheduleCreator(current_user(), current_timezone(data))
+        events = creator.instantiate_template(name, data)
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    return jsonify({'success': True, 'template': name, 'events': events, 'count': len(events)})
+
+@app.route('/api/schedules')
+def schedule_history():
+    """Last saved week versions of the signed-in user (?limit=), or their days in ?start=&end="""
+    user = current_user()
+    if request.args.get('start') and request.args.get('end'):
+        days = schedule_store.range(user, request.args['start'], request.args['end'])
+        return jsonify({'success': True, 'user': user, 'days': days})
+    limit = min(request.args.get('limit', 10, type=int), 100)
+    return jsonify({'success': True, 'user': user, 'versions': schedule_store.history(user, limit)})
+
+@app.route('/api/schedules/<week>')
+def schedule_version(week):
+    """One stored week (Sunday 'YYYY-MM-DD'), latest version unless ?version= is given"""
+    record = schedule_store.get(current_user(), week, request.args.get('version', type=int))
+    if not record:
+        return jsonify({'success': False, 'message': 'Schedule not found'}), 404
+    return jsonify({'success': True, **record})
 
 
 if __name__ == '__main__':
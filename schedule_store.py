@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Versioned schedule storage
+Schedules are split into Sunday-based weeks and each week is stored as its own
+version per user, so saving writes only the weeks that changed. Two backends share
+one interface: SQLite in WAL mode, and an append-only file of gzip-compressed JSON
+lines with an in-memory index
+"""
+
+import fcntl
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from datetime import date, datetime, timedelta
+
+SCHEDULE_STORE_BACKEND = os.environ.get('SCHEDULE_STORE_BACKEND', 'sqlite')
+SCHEDULE_STORE_PATH = os.environ.get('SCHEDULE_STORE_PATH')
+READ_SIZE = 64 * 1024
+DEFAULT_PATHS = {'sqlite': 'schedule_store.db', 'jsonl': 'schedule_store.jsonl.gz'}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS schedule_versions (
+    user TEXT NOT NULL,
+    week TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (user, week, version)
+);
+CREATE INDEX IF NOT EXISTS schedule_versions_by_time ON schedule_versions (user, created_at);
+"""
+
+
+def _as_date(value):
+    if isinstance(value, str):
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    return value.date() if isinstance(value, datetime) else value
+
+
+def week_start(day):
+    """Return the Sunday starting the week that contains day, as 'YYYY-MM-DD'"""
+    day = _as_date(day)
+    return (day - timedelta(days=(day.weekday() + 1) % 7)).strftime('%Y-%m-%d')
+
+
+def split_weeks(schedule):
+    """Return {week: [day dicts with string dates]} for a schedule"""
+    weeks = {}
+    for day_schedule in schedule:
+        day = dict(day_schedule)
+        if isinstance(day['date'], date):
+            day['date'] = day['date'].strftime('%Y-%m-%d')
+        weeks.setdefault(week_start(day['date']), []).append(day)
+    for days in weeks.values():
+        days.sort(key=lambda day: day['date'])
+    return weeks
+
+
+def _encode(days):
+    data = json.dumps(days, separators=(',', ':'), sort_keys=True, default=str)
+    return data, hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+def _record(user, week, version, created_at, days):
+    return {'user': user, 'week': week, 'version': version, 'created_at': created_at, 'days': days}
+
+
+class ScheduleStore(ABC):
+    """Interface shared by the backends; weeks are 'YYYY-MM-DD' Sundays"""
+
+    def save(self, user, schedule):
+        """Store a new version of every week whose content changed; returns [{'week', 'version'}]"""
+        written = []
+        for week, days in split_weeks(schedule).items():
+            data, digest = _encode(days)
+            version = self._append(user, week, data, digest)
+            if version is not None:
+                written.append({'week': week, 'version': version})
+        return written
+
+    @abstractmethod
+    def get(self, user, week, version=None):
+        """Return one stored week (the latest version by default) or None"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def history(self, user, limit=10):
+        """Return metadata of the user's last `limit` saved week versions, newest first"""
+        raise NotImplementedError
+
+    def range(self, user, start, end):
+        """Return the latest stored days of the user between start and end (inclusive)"""
+        start, end = _as_date(start), _as_date(end)
+        days = []
+        week = _as_date(week_start(start))
+        while week <= end:
+            record = self.get(user, week.strftime('%Y-%m-%d'))
+            if record:
+                days.extend(day for day in record['days'] if start <= _as_date(day['date']) <= end)
+            week += timedelta(days=7)
+        return days
+
+    @abstractmethod
+    def _append(self, user, week, data, digest):
+        """Atomically add a version unless it matches the latest; return its number or None"""
+        raise NotImplementedError
+
+
+class SQLiteScheduleStore(ScheduleStore):
+    """Versions in one SQLite table; safe across gunicorn workers with WAL"""
+
+    def __init__(self, path=DEFAULT_PATHS['sqlite']):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+
+    def get(self, user, week, version=None):
+        query = 'SELECT version, created_at, data FROM schedule_versions WHERE user = ? AND week = ?'
+        params = [user, week]
+        if version is not None:
+            query += ' AND version = ?'
+            params.append(version)
+        row = self._connect().execute(query + ' ORDER BY version DESC LIMIT 1', params).fetchone()
+        if not row:
+            return None
+        version, created_at, data = row
+        return _record(user, week, version, created_at, json.loads(data))
+
+    def history(self, user, limit=10):
+        rows = self._connect().execute(
+            'SELECT week, version, created_at FROM schedule_versions WHERE user = ? '
+            'ORDER BY created_at DESC, version DESC LIMIT ?',
+            (user, limit)
+        ).fetchall()
+        return [{'week': week, 'version': version, 'created_at': created_at} for week, version, created_at in rows]
+
+    def range(self, user, start, end):
+        start, end = _as_date(start), _as_date(end)
+        # The (user, week, version) primary key serves both the range scan and the latest-version lookup
+        rows = self._connect().execute(
+            'SELECT data FROM schedule_versions AS v WHERE user = ? AND week BETWEEN ? AND ? '
+            'AND version = (SELECT MAX(version) FROM schedule_versions WHERE user = v.user AND week = v.week) '
+            'ORDER BY week',
+            (user, week_start(start), end.strftime('%Y-%m-%d'))
+        ).fetchall()
+        return [
+            day for (data,) in rows for day in json.loads(data)
+            if start <= _as_date(day['date']) <= end
+        ]
+
+    def _append(self, user, week, data, digest):
+        conn = self._connect()
+        # BEGIN IMMEDIATE takes the write lock first, so two workers cannot pick the same version
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT version, digest FROM schedule_versions WHERE user = ? AND week = ? '
+                'ORDER BY version DESC LIMIT 1',
+                (user, week)
+            ).fetchone()
+            if row and row[1] == digest:
+                conn.execute('ROLLBACK')
+                return None
+            version = row[0] + 1 if row else 1
+            conn.execute(
+                'INSERT INTO schedule_versions VALUES (?, ?, ?, ?, ?, ?)',
+                (user, week, version, digest, time.time(), data)
+            )
+            conn.execute('COMMIT')
+            return version
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def _connect(self):
+        """One connection per thread; SQLite connections must not be shared across threads"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+
+class JsonlScheduleStore(ScheduleStore):
+    """
+    Append-only file where every version is one gzip member holding one JSON line.
+    Appends happen under an exclusive flock in a single write, so concurrent workers
+    never interleave; each process indexes member offsets and reads only what it needs.
+    """
+
+    def __init__(self, path=DEFAULT_PATHS['jsonl']):
+        self.path = path
+        self._lock = threading.Lock()
+        # (user, week) -> [(version, offset, length, digest, created_at), ...] in version order
+        self._index = {}
+        self._indexed_to = 0
+        open(self.path, 'ab').close()
+
+    def get(self, user, week, version=None):
+        with self._lock:
+            self._refresh_index()
+            versions = self._index.get((user, week))
+            if not versions:
+                return None
+            entry = versions[-1] if version is None else next((item for item in versions if item[0] == version), None)
+        if entry is None:
+            return None
+        with open(self.path, 'rb') as f:
+            f.seek(entry[1])
+            record = json.loads(gzip.decompress(f.read(entry[2])))
+        return _record(user, week, record['version'], record['created_at'], record['days'])
+
+    def history(self, user, limit=10):
+        with self._lock:
+            self._refresh_index()
+            entries = [
+                {'week': week, 'version': version, 'created_at': created_at}
+                for (owner, week), versions in self._index.items() if owner == user
+                for version, _, _, _, created_at in versions
+            ]
+        entries.sort(key=lambda entry: (entry['created_at'], entry['version']), reverse=True)
+        return entries[:limit]
+
+    def _append(self, user, week, data, digest):
+        with self._lock, open(self.path, 'ab') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                # Other workers may have appended since the last look
+                self._refresh_index()
+                versions = self._index.get((user, week), [])
+                if versions and versions[-1][3] == digest:
+                    return None
+                version = versions[-1][0] + 1 if versions else 1
+                created_at = time.time()
+                line = (f'{{"user":{json.dumps(user)},"week":"{week}","version":{version},'
+                        f'"digest":"{digest}","created_at":{created_at},"days":{data}}}\n')
+                member = gzip.compress(line.encode('utf-8'))
+                offset = f.seek(0, os.SEEK_END)
+                f.write(member)
+                f.flush()
+                os.fsync(f.fileno())
+                versions.append((version, offset, len(member), digest, created_at))
+                self._index[(user, week)] = versions
+                self._indexed_to = offset + len(member)
+                return version
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _refresh_index(self):
+        """Index members appended since the last call (by this or any other process)"""
+        with open(self.path, 'rb') as f:
+            f.seek(self._indexed_to)
+            chunk_start = self._indexed_to
+            decompressor = zlib.decompressobj(wbits=31)
+            parts = []
+            while True:
+                chunk = f.read(READ_SIZE)
+                if not chunk:
+                    # Anything left over is a member still being written by another process
+                    return
+                while chunk:
+                    parts.append(decompressor.decompress(chunk))
+                    if not decompressor.eof:
+                        chunk_start += len(chunk)
+                        break
+                    rest = decompressor.unused_data
+                    end = chunk_start + len(chunk) - len(rest)
+                    record = json.loads(b''.join(parts))
+                    self._index.setdefault((record['user'], record['week']), []).append(
+                        (record['version'], self._indexed_to, end - self._indexed_to,
+                         record['digest'], record['created_at'])
+                    )
+                    self._indexed_to = chunk_start = end
+                    decompressor = zlib.decompressobj(wbits=31)
+                    parts = []
+                    chunk = rest
+
+
+BACKENDS = {'sqlite': SQLiteScheduleStore, 'jsonl': JsonlScheduleStore}
+
+
+def open_schedule_store(backend=SCHEDULE_STORE_BACKEND, path=SCHEDULE_STORE_PATH):
+    """Return a store for the configured backend ('sqlite' or 'jsonl')"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown schedule store backend: {backend}")
+    return BACKENDS[backend](path or DEFAULT_PATHS[backend])
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Idempotent schedule sync
+Events written by this app carry a stable key in their private extendedProperties.
+Syncing lists the tagged events in the schedule's range once, diffs them against
+the desired events and sends only the inserts, patches and deletes that are needed
+"""
+
+import hashlib
+
+from calendar_batch import execute_batch
+from calendar_client import calendar_client
+from timezones import DEFAULT_TIMEZONE, date_string, event_minutes, event_time, to_local
+
+APP_TAG = 'schedule-creator'
+PAGE_SIZE = 2500
+
+# Event fields owned by the app; anything else the user edits is left alone
+SYNCED_FIELDS = ('summary', 'description', 'colorId', 'reminders', 'recurrence')
+
+
+def event_key(*parts):
+    """Return a stable key for an event from the values that identify it"""
+    return hashlib.sha1('\x1f'.join(str(part) for part in parts).encode('utf-8')).hexdigest()[:20]
+
+
+def tag_event(body, key, schedule_name, **properties):
+    """Mark an event body as owned by this app under `key` and return it"""
+    private = body.setdefault('extendedProperties', {}).setdefault('private', {})
+    private.update({'app': APP_TAG, 'scheduleName': schedule_name, 'scheduleKey': key})
+    private.update({name: str(value) for name, value in properties.items()})
+    return body
+
+
+def session_event(session, start, end, timezone=DEFAULT_TIMEZONE):
+    """Return the calendar event body for a schedule session from start to end (epoch minutes)"""
+    return {
+        'summary': session['title'],
+        'description': f"{session['description']}\n\n📊 Session Type: {session['type']}\n⏰ Duration: {end - start} minutes\n🎯 Optimized for productivity",
+        'start': event_time(start, timezone),
+        'end': event_time(end, timezone),
+        'reminders': {
+            'useDefault': False,
+            'overrides': [
+                {'method': 'email', 'minutes': 1440},
+                {'method': 'popup', 'minutes': 15},
+            ],
+        },
+    }
+
+
+def needs_update(existing, desired):
+    """Return True if the app-owned fields of an existing event differ from the desired body"""
+    for field in ('start', 'end'):
+        if event_minutes(existing[field]) != event_minutes(desired[field]):
+            return True
+    for field in SYNCED_FIELDS:
+        if field in desired and existing.get(field) != desired[field]:
+            return True
+    existing_private = existing.get('extendedProperties', {}).get('private', {})
+    return any(existing_private.get(name) != value
+               for name, value in desired.get('extendedProperties', {}).get('private', {}).items())
+
+
+def _start_day(event, timezone):
+    """Local 'YYYY-MM-DD' an event (or a recurring event's first instance) starts on"""
+    return date_string(to_local(event_minutes(event['start'], timezone), timezone)[0])
+
+
+def list_tagged_events(service, calendar_id, schedule_name, time_min, time_max):
+    """Return every event of this schedule overlapping [time_min, time_max), following all pages"""
+    params = {
+        'calendarId': calendar_id,
+        'timeMin': time_min,
+        'timeMax': time_max,
+        'privateExtendedProperty': [f'app={APP_TAG}', f'scheduleName={schedule_name}'],
+        'maxResults': PAGE_SIZE,
+    }
+    events = []
+    while True:
+        result = calendar_client.execute(service.events().list(**params))
+        events.extend(result.get('items', []))
+        params['pageToken'] = result.get('nextPageToken')
+        if not params['pageToken']:
+            return events
+
+
+def sync_events(service, desired, schedule_name, time_min, time_max, calendar_id='primary',
+                delete_missing=True, on_result=None, get_service=None, delete_days=None, timezone=DEFAULT_TIMEZONE):
+    """
+    Make the tagged events of `schedule_name` in [time_min, time_max) match `desired`.
+
+    desired maps each key to an event body (already tagged with tag_event). Events
+    that are already correct are not touched, changed ones are patched, new ones are
+    inserted and, with delete_missing, tagged events no longer desired are deleted;
+    given delete_days ('YYYY-MM-DD' local dates in timezone), only those starting on
+    one of those days are.
+    All writes go out as batch requests. on_result(key, action, response, exception)
+    is called for every key, including unchanged ones. get_service lets the batches
+    go out concurrently (see execute_batch).
+
+    Returns {'inserted', 'updated', 'deleted', 'unchanged', 'failed'} key lists and
+    'responses' mapping each successfully written key to the API response.
+    """
+    existing = {}
+    duplicates = []
+    for event in list_tagged_events(service, calendar_id, schedule_name, time_min, time_max):
+        key = event.get('extendedProperties', {}).get('private', {}).get('scheduleKey')
+        if key in existing:
+            duplicates.append(event)
+        else:
+            existing[key] = event
+
+    summary = {'inserted': [], 'updated': [], 'deleted': [], 'unchanged': [], 'failed': [], 'responses': {}}
+    requests = []
+    events = service.events()
+
+    for key, body in desired.items():
+        current = existing.get(key)
+        if current is None:
+            requests.append((('inserted', key), events.insert(calendarId=calendar_id, body=body)))
+        elif needs_update(current, body):
+            requests.append((('updated', key), events.patch(calendarId=calendar_id, eventId=current['id'], body=body)))
+        else:
+            summary['unchanged'].append(key)
+            summary['responses'][key] = current
+            if on_result:
+                on_result(key, 'unchanged', current, None)
+
+    stale = duplicates
+    if delete_missing:
+        stale = stale + [event for key, event in existing.items() if key not in desired
+                         and (delete_days is None or _start_day(event, timezone) in delete_days)]
+    for event in stale:
+        requests.append((('deleted', event['id']), events.delete(calendarId=calendar_id, eventId=event['id'])))
+
+    def record(request_key, response, exception):
+        action, key = request_key
+        if exception is None:
+            summary[action].append(key)
+            summary['responses'][key] = response
+        else:
+            summary['failed'].append(key)
+        if on_result:
+            on_result(key, action, response, exception)
+
+    if requests:
+        execute_batch(service, requests, on_result=record, get_service=get_service)
+
+    return summary
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Named day templates
+Day layouts (analysis day, bootcamp day, sleep-aligned day) are read from
+schedule_templates.json once, validated and compiled into immutable tuples.
+Instantiating a template for a date, a time shift and any number of days only
+copies the precomputed fields into event dicts in the create_custom_schedule
+format, so thousands of days cost next to nothing
+"""
+
+import json
+import os
+from collections import namedtuple
+from functools import lru_cache
+from types import MappingProxyType
+
+from timeslots import format_minutes, parse_hhmm
+from timezones import MINUTES_PER_DAY, date_string, day_ordinal
+
+TEMPLATES_PATH = os.environ.get(
+    'SCHEDULE_TEMPLATES_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'schedule_templates.json')
+)
+# Most days one request may instantiate
+MAX_TEMPLATE_DAYS = 3660
+
+
+# One session of a template: day offset from the instantiated date, start and duration in minutes
+Slot = namedtuple('Slot', 'day start duration title description type color')
+
+
+class Template(namedtuple('Template', 'name title description slots')):
+    """A compiled template; slots is a sorted tuple of Slot"""
+
+    __slots__ = ()
+
+    def summary(self):
+        days = {slot.day for slot in self.slots}
+        return {
+            'name': self.name,
+            'title': self.title,
+            'description': self.description,
+            'sessions': len(self.slots),
+            'minutes': sum(slot.duration for slot in self.slots),
+            'first_day': min(days),
+            'last_day': max(days),
+        }
+
+
+def compile_template(name, definition):
+    """Validate a template definition and return its compiled Template, or raise ValueError"""
+    if not isinstance(definition, dict) or not isinstance(definition.get('sessions'), list) or not definition['sessions']:
+        raise ValueError(f"Template {name!r}: needs a non-empty 'sessions' list")
+    slots = []
+    for number, session in enumerate(definition['sessions'], 1):
+        where = f"Template {name!r} session {number}"
+        if not isinstance(session, dict) or not session.get('title'):
+            raise ValueError(f"{where}: needs a title")
+        try:
+            start = parse_hhmm(session['start'])
+            end = parse_hhmm(session['end']) if 'end' in session else None
+            duration = end - start if end is not None else int(session.get('duration', 60))
+            day = int(session.get('day', 0))
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"{where}: needs an 'HH:MM' start and an 'HH:MM' end or a duration in minutes") from None
+        if not 0 <= start < MINUTES_PER_DAY or not 0 < duration <= MINUTES_PER_DAY:
+            raise ValueError(f"{where}: must start within its day and last between 1 minute and 24 hours")
+        slots.append(Slot(day, start, duration, str(session['title']),
+                          str(session.get('description', session['title'])),
+                          str(session.get('type', 'custom')), str(session.get('color', ''))))
+    slots.sort()
+    return Template(name, str(definition.get('title', name)), str(definition.get('description', '')), tuple(slots))
+
+
+@lru_cache(maxsize=None)
+def load_templates(path=TEMPLATES_PATH):
+    """Read and compile every template in a JSON file once; returns a read-only name -> Template map"""
+    with open(path, encoding='utf-8') as f:
+        definitions = json.load(f)
+    return MappingProxyType({name: compile_template(name, definition) for name, definition in definitions.items()})
+
+
+def list_templates():
+    return [template.summary() for template in load_templates().values()]
+
+
+def get_template(name):
+    """Return the compiled template, raising KeyError for unknown names"""
+    templates = load_templates()
+    if name not in templates:
+        raise KeyError(f"Unknown template: {name}")
+    return templates[name]
+
+
+@lru_cache(maxsize=1024)
+def _shifted(template, shift):
+    """Per-slot (day offset, 'HH:MM', duration, event fields) with times moved by shift minutes"""
+    prepared = []
+    for slot in template.slots:
+        days, minute = divmod(slot.start + shift, MINUTES_PER_DAY)
+        fields = {'duration': slot.duration, 'title': slot.title, 'description': slot.description, 'type': slot.type}
+        if slot.color:
+            fields['color'] = slot.color
+        prepared.append((slot.day + days, format_minutes(minute), fields))
+    return tuple(prepared)
+
+
+def instantiate(name, start, days=1, weekdays=None, shift=0):
+    """
+    Return create_custom_schedule events for template `name` on each of `days` days
+    from start (a date or 'YYYY-MM-DD'), optionally only on the given weekday
+    indexes (Monday is 0), with every session moved by `shift` minutes.
+    """
+    if not 1 <= days <= MAX_TEMPLATE_DAYS:
+        raise ValueError(f"days must be between 1 and {MAX_TEMPLATE_DAYS}")
+    prepared = _shifted(get_template(name), int(shift))
+    first = day_ordinal(start)
+    events = []
+    for ordinal in range(first, first + days):
+        # Ordinal 1 (0001-01-01) was a Monday
+        if weekdays is not None and (ordinal - 1) % 7 not in weekdays:
+            continue
+        for offset, time, fields in prepared:
+            events.append({'date': date_string(ordinal + offset), 'time': time, **fields})
+    return events
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Constraint-based schedule placement engine
+Packs tasks with durations, cognitive types and deadlines into the free time left
+around blocked windows (bootcamp, lunch) using one integer bitmask of 15-minute
+slots per day, a greedy earliest-deadline-first pass and a swap-based local search
+"""
+
+from datetime import date, datetime, timedelta
+
+from timeslots import (SLOT_MINUTES, SLOTS_PER_DAY, fitting_starts, format_minutes, lowest_slot,
+                       minutes_mask, parse_hhmm, slot_range_mask, to_hhmm, to_slot)
+
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# Preferred start windows for each kind of work: demanding work early, admin late
+PREFERRED_WINDOWS = {
+    'high_cognitive': ('09:00', '12:00'),
+    'learning': ('08:00', '12:00'),
+    'medium_cognitive': ('13:00', '17:00'),
+    'low_cognitive': ('15:00', '19:00'),
+}
+
+THEMES = {
+    'high_cognitive': '🧠 DEEP WORK',
+    'medium_cognitive': '🔧 DEVELOPMENT FOCUS',
+    'low_cognitive': '📝 ADMIN & WRAP-UP',
+    'learning': '📚 LEARNING & DEVELOPMENT',
+}
+
+# Upper bound on local search swap attempts per misplaced task
+SWAP_CANDIDATES = 200
+
+# Longest span plan_weeks will solve in one call
+MAX_PLAN_WEEKS = 52
+
+DEFAULT_BLOCKED = [
+    {
+        'title': '📚 Bootcamp Session',
+        'days': ['Tuesday', 'Thursday'],
+        'start': '08:00',
+        'end': '13:00',
+        'description': 'Organization-wide bootcamp training',
+        'type': 'learning'
+    },
+    {'days': DAY_NAMES, 'start': '12:00', 'end': '13:00'},
+]
+
+# The research-based work week; 'day' pins each task to a day offset from Sunday
+DEFAULT_TASKS = [
+    {'title': '🔍 JIRA Analysis - Git Comparison', 'description': 'Deep analysis of JIRA tickets and Git commits', 'type': 'high_cognitive', 'day': 0},
+    {'title': '🔍 Test Failure Investigation', 'description': 'Investigate and document test failures', 'type': 'high_cognitive', 'day': 0},
+    {'title': '📝 Use Case Documentation', 'description': 'Document use cases and requirements', 'type': 'medium_cognitive', 'day': 0},
+    {'title': '📝 Implementation Planning', 'description': 'Plan implementation approach and timeline', 'type': 'medium_cognitive', 'day': 0},
+    {'title': '🔧 Core Logic Implementation', 'description': 'Implement core business logic', 'type': 'high_cognitive', 'day': 1},
+    {'title': '🔧 Integration Development', 'description': 'Develop integration components', 'type': 'high_cognitive', 'day': 1},
+    {'title': '🔍 Test Environment Setup', 'description': 'Set up and configure test environments', 'type': 'medium_cognitive', 'day': 1},
+    {'title': '🔍 Integration Test Development', 'description': 'Develop integration tests', 'type': 'medium_cognitive', 'day': 1},
+    {'title': '🔧 Post-Bootcamp Development', 'description': 'Apply bootcamp learnings to development', 'type': 'medium_cognitive', 'day': 2},
+    {'title': '🔍 Testing & Debugging', 'description': 'Test and debug developed features', 'type': 'medium_cognitive', 'day': 2},
+    {'title': '🔧 Regular JIRA Tasks', 'description': 'Work on regular JIRA tickets', 'type': 'low_cognitive', 'day': 2},
+    {'title': '🔍 Comprehensive Testing', 'description': 'Execute comprehensive test suite', 'type': 'high_cognitive', 'day': 3},
+    {'title': '🔍 Bug Fixing Session', 'description': 'Fix identified bugs and issues', 'type': 'high_cognitive', 'day': 3},
+    {'title': '🔧 Final Development Push', 'description': 'Complete remaining development tasks', 'type': 'medium_cognitive', 'day': 3},
+    {'title': '🎯 Code Review Preparation', 'description': 'Prepare code for review submission', 'type': 'medium_cognitive', 'day': 3},
+    {'title': '🎯 Final Review & Submission', 'description': 'Final code review and submission', 'type': 'medium_cognitive', 'day': 4},
+    {'title': '📝 Documentation Finalization', 'description': 'Finalize all documentation', 'type': 'low_cognitive', 'day': 4},
+    {'title': '🎯 Project Wrap-up', 'description': 'Project closure and wrap-up activities', 'type': 'low_cognitive', 'day': 4},
+]
+
+
+def _as_date(value, start_date):
+    if value is None:
+        return None
+    if isinstance(value, int):
+        return start_date + timedelta(days=value)
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def solve(tasks, start_date, days=7, blocked=DEFAULT_BLOCKED, work_days=None,
+          day_start='09:00', day_end='19:00', max_daily_minutes=300,
+          buffer_minutes=15, local_search=True):
+    """
+    Place tasks into free time between start_date and start_date + days.
+
+    Each task is a dict with 'title', optional 'duration' in minutes (default 75),
+    'type', 'description', 'deadline' and 'earliest' (date, 'YYYY-MM-DD' or a day
+    offset), or 'day' to pin it to a single day. Blocked windows are dicts with 'start'/'end' and either 'days'
+    (weekday names) or 'date'; windows with a 'title' are also emitted as sessions.
+
+    Returns (schedule, stats) where schedule uses the create_optimized_schedule format.
+    """
+    if isinstance(start_date, datetime):
+        start_date = start_date.date()
+    dates = [start_date + timedelta(days=offset) for offset in range(days)]
+    buffer_slots = -(-buffer_minutes // SLOT_MINUTES)
+    daily_limit = max_daily_minutes if max_daily_minutes else SLOTS_PER_DAY * SLOT_MINUTES
+
+    # Free slots per day: the working window, with room for a trailing buffer past its end
+    window = slot_range_mask(to_slot(day_start), to_slot(day_end) + buffer_slots)
+    free = []
+    fixed_sessions = [[] for _ in dates]
+    for index, day in enumerate(dates):
+        day_name = DAY_NAMES[day.weekday()]
+        free.append(window if work_days is None or day_name in work_days else 0)
+        for block in blocked:
+            if 'date' in block:
+                if _as_date(block['date'], start_date) != day:
+                    continue
+            elif day_name not in block.get('days', ()):
+                continue
+            free[index] &= ~minutes_mask(parse_hhmm(block['start']), parse_hhmm(block['end']))
+            if block.get('title'):
+                fixed_sessions[index].append({
+                    'title': block['title'],
+                    'start': block['start'],
+                    'end': block['end'],
+                    'description': block.get('description', block['title']),
+                    'type': block.get('type', 'blocked')
+                })
+
+    preferred = {kind: slot_range_mask(to_slot(start), to_slot(end)) for kind, (start, end) in PREFERRED_WINDOWS.items()}
+    used_minutes = [0] * len(dates)
+
+    prepared = []
+    for order, task in enumerate(tasks):
+        duration = int(task.get('duration', 75))
+        deadline = _as_date(task.get('deadline', task.get('day')), start_date)
+        earliest = _as_date(task.get('earliest', task.get('day')), start_date)
+        prepared.append({
+            'task': task,
+            'order': order,
+            'duration': duration,
+            'length': -(-duration // SLOT_MINUTES),
+            'preferred': preferred.get(task.get('type'), 0),
+            'first_day': max((earliest - start_date).days, 0) if earliest else 0,
+            'last_day': min((deadline - start_date).days, len(dates) - 1) if deadline else len(dates) - 1,
+        })
+
+    # Earliest deadline first, longer tasks first within a deadline
+    prepared.sort(key=lambda item: (item['last_day'], -item['length'], item['order']))
+
+    placements = []
+    unplaced = []
+    for item in prepared:
+        need = item['length'] + buffer_slots
+        fallback = None
+        chosen = None
+        for day_index in range(item['first_day'], len(dates)):
+            if used_minutes[day_index] + item['duration'] > daily_limit:
+                continue
+            starts = fitting_starts(free[day_index], need)
+            if not starts:
+                continue
+            if day_index > item['last_day']:
+                if fallback is not None:
+                    break
+                # Past the deadline: take the first slot that fits anywhere
+                chosen = (day_index, lowest_slot(starts))
+                break
+            in_window = starts & item['preferred']
+            if in_window:
+                chosen = (day_index, lowest_slot(in_window))
+                break
+            if fallback is None:
+                fallback = (day_index, lowest_slot(starts))
+        if chosen is None:
+            chosen = fallback
+        if chosen is None:
+            unplaced.append(item['task'])
+            continue
+
+        day_index, slot = chosen
+        free[day_index] &= ~slot_range_mask(slot, slot + need)
+        used_minutes[day_index] += item['duration']
+        item['day'] = day_index
+        item['slot'] = slot
+        placements.append(item)
+
+    swaps = _improve(placements) if local_search else 0
+
+    schedule = []
+    for index, day in enumerate(dates):
+        sessions = list(fixed_sessions[index])
+        for item in placements:
+            if item['day'] == index:
+                task = item['task']
+                sessions.append({
+                    'title': task['title'],
+                    'start': to_hhmm(item['slot']),
+                    'end': format_minutes(item['slot'] * SLOT_MINUTES + item['duration']),
+                    'description': task.get('description', task['title']),
+                    'type': task.get('type', 'custom')
+                })
+        if not sessions:
+            continue
+        sessions.sort(key=lambda session: session['start'])
+        schedule.append({
+            'date': day,
+            'day_name': DAY_NAMES[day.weekday()],
+            'theme': _theme(sessions),
+            'sessions': sessions
+        })
+
+    stats = {
+        'tasks': len(tasks),
+        'placed': len(placements),
+        'unplaced': len(unplaced),
+        'unplaced_titles': [task['title'] for task in unplaced],
+        'in_preferred_window': sum(1 for item in placements if _is_preferred(item, item['slot'])),
+        'late': sum(1 for item in placements if item['day'] > item['last_day']),
+        'swaps': swaps,
+    }
+    return schedule, stats
+
+
+def week_start(day):
+    """Return the Sunday on or before day"""
+    if isinstance(day, datetime):
+        day = day.date()
+    return day - timedelta(days=(day.weekday() + 1) % 7)
+
+
+def plan_weeks(config, start_date, weeks=1):
+    """
+    Solve the same weekly tasks for `weeks` consecutive weeks from start_date.
+
+    config carries the options create_optimized_schedule takes: 'tasks', 'days' per
+    week (default 5), 'blocked', 'work_days' and 'max_daily_minutes'. Task day
+    offsets and deadlines count from the start of each week. Returns (schedule,
+    stats) with the stats summed over all weeks.
+    """
+    if not 1 <= weeks <= MAX_PLAN_WEEKS:
+        raise ValueError(f"weeks must be between 1 and {MAX_PLAN_WEEKS}")
+    schedule = []
+    totals = {'tasks': 0, 'placed': 0, 'unplaced': 0, 'unplaced_titles': [],
+              'in_preferred_window': 0, 'late': 0, 'swaps': 0}
+    for week in range(weeks):
+        week_schedule, stats = solve(
+            config.get('tasks') or DEFAULT_TASKS,
+            start_date=start_date + timedelta(weeks=week),
+            days=config.get('days', 5),
+            blocked=config.get('blocked', DEFAULT_BLOCKED),
+            work_days=config.get('work_days'),
+            max_daily_minutes=config.get('max_daily_minutes', 300)
+        )
+        schedule.extend(week_schedule)
+        for name, value in stats.items():
+            totals[name] += value
+    return schedule, totals
+
+
+def _is_preferred(item, slot):
+    return not item['preferred'] or bool(item['preferred'] >> slot & 1)
+
+
+def _theme(sessions):
+    """Name the day after its dominant kind of work"""
+    minutes = {}
+    for session in sessions:
+        minutes[session['type']] = minutes.get(session['type'], 0) + parse_hhmm(session['end']) - parse_hhmm(session['start'])
+    dominant = max(minutes, key=minutes.get)
+    return THEMES.get(dominant, '📅 FOCUS DAY')
+
+
+def _improve(placements):
+    """Swap equal-duration tasks so more of them start inside their preferred window"""
+    by_duration = {}
+    for item in placements:
+        by_duration.setdefault(item['duration'], []).append(item)
+
+    swaps = 0
+    for item in placements:
+        if _is_preferred(item, item['slot']):
+            continue
+        for other in by_duration[item['duration']][:SWAP_CANDIDATES]:
+            if other is item or not (item['first_day'] <= other['day'] <= item['last_day']):
+                continue
+            if not (other['first_day'] <= item['day'] <= other['last_day']):
+                continue
+            before = _is_preferred(item, item['slot']) + _is_preferred(other, other['slot'])
+            after = _is_preferred(item, other['slot']) + _is_preferred(other, item['slot'])
+            if after > before:
+                item['day'], other['day'] = other['day'], item['day']
+                item['slot'], other['slot'] = other['slot'], item['slot']
+                swaps += 1
+                break
+    return swaps
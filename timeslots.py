@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Compact time representation for schedules
+A day is an integer bitmask of fixed-size slots (bit i = slot i is busy or free),
+so union, intersection and free-slot search are single integer operations. The
+scheduler and the free/busy merge work on these masks; 'HH:MM' parsing and
+formatting are memoized for every module that converts session times
+"""
+
+from functools import lru_cache
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+
+
+@lru_cache(maxsize=4096)
+def parse_hhmm(hhmm):
+    """Return minutes after midnight for an 'HH:MM' string (hours may exceed 23)"""
+    hours, minutes = hhmm.split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+@lru_cache(maxsize=4096)
+def format_minutes(minutes):
+    """Return the 'HH:MM' string for minutes after midnight"""
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def to_slot(hhmm):
+    """Return the slot index of an 'HH:MM' time, rounding down to the slot grid"""
+    return parse_hhmm(hhmm) // SLOT_MINUTES
+
+
+def to_hhmm(slot):
+    """Return the 'HH:MM' start time of a slot index"""
+    return format_minutes(slot * SLOT_MINUTES)
+
+
+def slot_range_mask(start, end):
+    """Return a bitmask with slots [start, end) set"""
+    return ((1 << max(end - start, 0)) - 1) << start
+
+
+def minutes_mask(start_minutes, end_minutes):
+    """Return the mask of every slot touched by [start_minutes, end_minutes)"""
+    return slot_range_mask(start_minutes // SLOT_MINUTES, -(-end_minutes // SLOT_MINUTES))
+
+
+def fitting_starts(free, length):
+    """Return a mask of slots where `length` consecutive free slots begin"""
+    runs = free
+    covered = 1
+    # Doubling: after each step bit i means slots i .. i + covered - 1 are all free
+    while covered < length:
+        step = min(covered, length - covered)
+        runs &= runs >> step
+        covered += step
+    return runs
+
+
+def lowest_slot(mask):
+    """Return the index of the lowest set bit of a non-zero mask"""
+    return (mask & -mask).bit_length() - 1
+
+
+def iter_runs(mask):
+    """Yield (start_slot, end_slot) for each run of consecutive set slots"""
+    while mask:
+        start = lowest_slot(mask)
+        shifted = mask >> start
+        length = ((shifted + 1) & ~shifted).bit_length() - 1
+        yield start, start + length
+        mask &= ~slot_range_mask(start, start + length)
+
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Timezone normalization
+Schedules are local wall-clock times; everything that compares or ranges over
+them works in epoch minutes. A zone's UTC offsets are worked out once per local
+day, DST changes included, and cached, so converting a whole schedule is integer
+arithmetic instead of a pytz localize and a formatted string per session. Strings
+are only made at the edges, for the Calendar API
+"""
+
+import os
+import time
+from array import array
+from datetime import date, datetime
+from functools import lru_cache
+
+import pytz
+
+from timeslots import format_minutes, parse_hhmm
+
+DEFAULT_TIMEZONE = os.environ.get('SCHEDULE_TIMEZONE', 'America/New_York')
+
+MINUTES_PER_DAY = 24 * 60
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+@lru_cache(maxsize=None)
+def get_zone(name):
+    """Return the pytz zone for an IANA name, raising ValueError for unknown names"""
+    try:
+        return pytz.timezone(name)
+    except pytz.UnknownTimeZoneError:
+        raise ValueError(f"Unknown timezone: {name}") from None
+
+
+@lru_cache(maxsize=8192)
+def _date_ordinal(text):
+    return datetime.strptime(text, '%Y-%m-%d').toordinal()
+
+
+def day_ordinal(day):
+    """Return the proleptic ordinal of a date, datetime, 'YYYY-MM-DD' string or ordinal"""
+    if isinstance(day, int):
+        return day
+    if isinstance(day, str):
+        return _date_ordinal(day)
+    return day.toordinal()
+
+
+@lru_cache(maxsize=8192)
+def date_string(ordinal):
+    return date.fromordinal(ordinal).isoformat()
+
+
+@lru_cache(maxsize=256)
+def offset_string(offset):
+    """'+HH:MM' / '-HH:MM' for a UTC offset in minutes"""
+    sign = '-' if offset < 0 else '+'
+    return f"{sign}{format_minutes(abs(offset))}"
+
+
+def _offset_at(zone, epoch_minute):
+    """UTC offset in minutes in effect at an instant"""
+    return int(datetime.fromtimestamp(epoch_minute * 60, zone).utcoffset().total_seconds()) // 60
+
+
+def _wall_offset(zone, wall_minute):
+    """UTC offset in effect at a local wall-clock time (as minutes since the local epoch)"""
+    return _offset_at(zone, wall_minute - _offset_at(zone, wall_minute))
+
+
+@lru_cache(maxsize=65536)
+def day_offsets(timezone, ordinal):
+    """
+    Return (offset, change, offset_after) in minutes for one local day.
+
+    Wall times before minute `change` of the day are at `offset`, later ones at
+    `offset_after`. Wall times a DST change skips or repeats resolve to the
+    earlier offset, as zoneinfo's fold=0 does.
+    """
+    zone = get_zone(timezone)
+    wall = (ordinal - EPOCH_ORDINAL) * MINUTES_PER_DAY
+    # From the last minute of the previous day, so changes at midnight count
+    before = _wall_offset(zone, wall - 1)
+    after = _wall_offset(zone, wall + MINUTES_PER_DAY - 1)
+    if before == after:
+        return before, MINUTES_PER_DAY, after
+
+    # Bisect the instant of the change
+    low, high = wall - 1 - before, wall + MINUTES_PER_DAY - 1 - after
+    while high - low > 1:
+        middle = (low + high) // 2
+        if _offset_at(zone, middle) == before:
+            low = middle
+        else:
+            high = middle
+    # Old wall clock at the change, moved past the gap when clocks go forward
+    change = high + before + max(after - before, 0) - wall
+    return before, change, after
+
+
+def to_epoch_minutes(day, minute, timezone=DEFAULT_TIMEZONE):
+    """Return the epoch minute of a local wall time, `minute` minutes after midnight on `day`"""
+    ordinal = day_ordinal(day)
+    if not 0 <= minute < MINUTES_PER_DAY:
+        days, minute = divmod(minute, MINUTES_PER_DAY)
+        ordinal += days
+    before, change, after = day_offsets(timezone, ordinal)
+    return (ordinal - EPOCH_ORDINAL) * MINUTES_PER_DAY + minute - (before if minute < change else after)
+
+
+def datetime_minutes(moment, timezone=DEFAULT_TIMEZONE):
+    """Epoch minute of a datetime; naive ones are wall times in `timezone`"""
+    if moment.tzinfo is not None:
+        return int(moment.timestamp()) // 60
+    return to_epoch_minutes(moment.toordinal(), moment.hour * 60 + moment.minute, timezone)
+
+
+def to_local(epoch_minute, timezone=DEFAULT_TIMEZONE):
+    """Return (date ordinal, minute of day, UTC offset) of an epoch minute in `timezone`"""
+    offset = _offset_at(get_zone(timezone), epoch_minute)
+    ordinal, minute = divmod(epoch_minute + offset, MINUTES_PER_DAY)
+    return EPOCH_ORDINAL + ordinal, minute, offset
+
+
+def local_today(timezone=DEFAULT_TIMEZONE):
+    """Today's date in `timezone`"""
+    return date.fromordinal(to_local(int(time.time()) // 60, timezone)[0])
+
+
+def rfc3339(epoch_minute, timezone=DEFAULT_TIMEZONE):
+    """RFC 3339 local time with its UTC offset, e.g. '2026-11-01T09:00:00-05:00'"""
+    ordinal, minute, offset = to_local(epoch_minute, timezone)
+    return f"{date_string(ordinal)}T{format_minutes(minute)}:00{offset_string(offset)}"
+
+
+def event_time(epoch_minute, timezone=DEFAULT_TIMEZONE):
+    """Calendar API start/end value for an epoch minute"""
+    return {'dateTime': rfc3339(epoch_minute, timezone), 'timeZone': timezone}
+
+
+def date_range(start, end, timezone=DEFAULT_TIMEZONE):
+    """Return RFC 3339 (time_min, time_max) covering the whole local days from start to end inclusive"""
+    return (
+        rfc3339(to_epoch_minutes(start, 0, timezone), timezone),
+        rfc3339(to_epoch_minutes(day_ordinal(end) + 1, 0, timezone), timezone),
+    )
+
+
+def event_seconds(value, timezone='UTC'):
+    """
+    Return epoch seconds of a Calendar API start/end. Naive dateTimes are read in
+    their timeZone, all-day dates at local midnight, falling back to `timezone`.
+    """
+    text = value.get('dateTime')
+    if text is None:
+        return to_epoch_minutes(value['date'], 0, value.get('timeZone') or timezone) * 60
+    moment = datetime.fromisoformat(text.replace('Z', '+00:00'))
+    if moment.tzinfo is not None:
+        return moment.timestamp()
+    minutes = to_epoch_minutes(moment.toordinal(), moment.hour * 60 + moment.minute, value.get('timeZone') or timezone)
+    return minutes * 60 + moment.second + moment.microsecond / 1e6
+
+
+def event_minutes(value, timezone='UTC'):
+    """event_seconds rounded down to the minute"""
+    return int(event_seconds(value, timezone) // 60)
+
+
+def schedule_minutes(schedule, timezone=DEFAULT_TIMEZONE):
+    """
+    Return (starts, ends) arrays of epoch minutes for every session of a schedule,
+    in schedule order. Offsets are looked up once per day; sessions are plain
+    integer arithmetic on their 'HH:MM' times.
+    """
+    starts, ends = array('q'), array('q')
+    for day_schedule in schedule:
+        ordinal = day_ordinal(day_schedule['date'])
+        midnight = (ordinal - EPOCH_ORDINAL) * MINUTES_PER_DAY
+        before, change, after = day_offsets(timezone, ordinal)
+        for session in day_schedule['sessions']:
+            for hhmm, out in ((session['start'], starts), (session['end'], ends)):
+                minute = parse_hhmm(hhmm)
+                if minute < MINUTES_PER_DAY:
+                    out.append(midnight + minute - (before if minute < change else after))
+                else:
+                    out.append(to_epoch_minutes(ordinal, minute, timezone))
+    return starts, ends
+
+
+def session_minutes(day, session, timezone=DEFAULT_TIMEZONE):
+    """(start, end) epoch minutes of one session on `day`"""
+    return (to_epoch_minutes(day, parse_hhmm(session['start']), timezone),
+            to_epoch_minutes(day, parse_hhmm(session['end']), timezone))
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Per-user OAuth token storage
+Authorized-user token JSON is kept in a SQLite file (WAL mode) shared by every
+gunicorn worker, so a user who signed in through one worker is known to all of
+them and a token refreshed by one worker is picked up by the others
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+TOKEN_DB_PATH = os.environ.get('TOKEN_DB_PATH', 'user_tokens.db')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tokens (
+    user TEXT PRIMARY KEY,
+    token TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+class TokenStore:
+    """SQLite table of user -> authorized-user token JSON"""
+
+    def __init__(self, path=TOKEN_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        created = path != ':memory:' and not os.path.exists(path)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+        if created:
+            # Refresh tokens are long-lived secrets
+            os.chmod(path, 0o600)
+
+    def get(self, user):
+        """Return (token_json, updated_at) for a user, or None"""
+        return self._connect().execute('SELECT token, updated_at FROM tokens WHERE user = ?', (user,)).fetchone()
+
+    def save(self, user, token):
+        with self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO tokens VALUES (?, ?, ?)', (user, token, time.time()))
+
+    def delete(self, user):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM tokens WHERE user = ?', (user,))
+
+    def count(self):
+        return self._connect().execute('SELECT COUNT(*) FROM tokens').fetchone()[0]
+
+    def _connect(self):
+        """One connection per thread; SQLite connections must not be shared across threads"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            self._local.conn = conn
+        return conn
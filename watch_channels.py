@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Calendar push notifications
+Each watched calendar has one events().watch channel pointing at
+/webhooks/calendar. Google posts to it whenever the calendar changes; the
+notification time is kept in a SQLite file shared by every gunicorn worker, so
+each worker's event cache resyncs only the calendar that changed, only when it
+changed, instead of polling. Channels are renewed shortly before Google expires
+them
+"""
+
+import hmac
+import os
+import secrets
+import sqlite3
+import tempfile
+import threading
+import time
+import traceback
+import uuid
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from calendar_client import calendar_client, error_status
+
+CHANNEL_DB_PATH = os.environ.get('CHANNEL_DB_PATH', os.path.join(tempfile.gettempdir(), 'calendar_channels.db'))
+# Public https address of /webhooks/calendar; calendars are polled as before when unset
+CALENDAR_WEBHOOK_URL = os.environ.get('CALENDAR_WEBHOOK_URL')
+# Lifetime asked of Google for new channels (Google may grant less)
+CHANNEL_TTL_SECONDS = int(os.environ.get('CHANNEL_TTL_SECONDS', 7 * 24 * 3600))
+# Channels closer than this to expiring are replaced
+CHANNEL_RENEW_MARGIN = int(os.environ.get('CHANNEL_RENEW_MARGIN', 6 * 3600))
+# How often each worker looks for channels to renew
+CHANNEL_RENEW_INTERVAL = int(os.environ.get('CHANNEL_RENEW_INTERVAL', 300))
+# A worker that claimed a channel for (re)opening and went quiet this long is presumed
+# dead; a failed watch call is also retried after this long
+CLAIM_TIMEOUT = 120
+RESYNC_WORKERS = int(os.environ.get('RESYNC_WORKERS', 2))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS channels (
+    user TEXT NOT NULL,
+    calendar_id TEXT NOT NULL,
+    channel_id TEXT NOT NULL,
+    resource_id TEXT,
+    token TEXT NOT NULL,
+    expiration REAL NOT NULL,
+    notified_at REAL,
+    claimed_at REAL,
+    PRIMARY KEY (user, calendar_id)
+);
+CREATE INDEX IF NOT EXISTS channels_by_id ON channels (channel_id);
+"""
+
+COLUMNS = 'user, calendar_id, channel_id, resource_id, token, expiration, notified_at, claimed_at'
+
+# One row of the channels table; resource_id is None while the channel is being opened
+Channel = namedtuple('Channel', COLUMNS.replace(',', ''))
+
+
+class ChannelStore:
+    """Watch channels of every watched calendar, shared across workers"""
+
+    def __init__(self, path=CHANNEL_DB_PATH, address=CALENDAR_WEBHOOK_URL, ttl=CHANNEL_TTL_SECONDS,
+                 renew_margin=CHANNEL_RENEW_MARGIN):
+        self.path = path
+        self.address = address
+        self.ttl = ttl
+        self.renew_margin = renew_margin
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stats = {'notifications': 0, 'rejected': 0, 'opened': 0, 'renewed': 0, 'stopped': 0, 'failures': 0}
+        self._renewer = None
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+
+    def get(self, user, calendar_id='primary'):
+        return self._one('WHERE user = ? AND calendar_id = ?', (user, calendar_id))
+
+    def ensure(self, service, user, calendar_id='primary'):
+        """
+        Make sure the calendar has a channel that is not about to expire, opening or
+        renewing one if needed. Returns the current Channel, or None when push
+        notifications are not configured. Only one worker (re)opens a given channel.
+        """
+        if not self.address:
+            return None
+        channel = self.get(user, calendar_id)
+        if channel is not None and channel.resource_id and channel.expiration - time.time() > self.renew_margin:
+            return channel
+        if not self._claim(user, calendar_id, channel):
+            return channel
+        return self._open(service, user, calendar_id, channel)
+
+    def changed_at(self, user, calendar_id='primary'):
+        """
+        Epoch second of the last change Google reported for a watched calendar (0 if
+        none yet), or None when it has no live channel and has to be polled.
+        """
+        channel = self.get(user, calendar_id)
+        if channel is None or not channel.resource_id or channel.expiration <= time.time():
+            return None
+        return channel.notified_at or 0
+
+    def notify(self, channel_id, token, resource_id, state):
+        """
+        Record a notification from the X-Goog-* headers. Returns the watched Channel,
+        or None when the notification does not belong to a live channel of ours.
+        The 'sync' message Google sends when a channel opens carries no change.
+        """
+        channel = self._one('WHERE channel_id = ?', (channel_id or '',))
+        if (channel is None or not channel.resource_id or resource_id != channel.resource_id
+                or not hmac.compare_digest(channel.token, token or '')):
+            self._count('rejected')
+            return None
+        if state != 'sync':
+            with self._connect() as conn:
+                conn.execute('UPDATE channels SET notified_at = ? WHERE channel_id = ?', (time.time(), channel_id))
+        self._count('notifications')
+        return channel
+
+    def renew_due(self, get_service):
+        """Renew every channel close to expiring; get_service(user) returns that user's service or None"""
+        due = self._all('WHERE expiration < ?', (time.time() + self.renew_margin,))
+        for channel in due:
+            service = get_service(channel.user)
+            try:
+                if service is None:
+                    # Signed out elsewhere: nothing can renew or stop it, let it lapse
+                    self._delete(channel)
+                else:
+                    self.ensure(service, channel.user, channel.calendar_id)
+            except Exception as e:
+                print(f"⚠️ Could not renew watch channel for {channel.user}/{channel.calendar_id}: {e}")
+        return len(due)
+
+    def start_renewal(self, get_service, interval=CHANNEL_RENEW_INTERVAL):
+        """Run renew_due every `interval` seconds on a daemon thread (once per process)"""
+        with self._lock:
+            if self._renewer is not None:
+                return
+            self._renewer = threading.Thread(target=self._renew_forever, args=(get_service, interval),
+                                             name='channel-renewal', daemon=True)
+        self._renewer.start()
+
+    def stop_all(self, service, user):
+        """Stop and forget every channel of a user (before their token is deleted)"""
+        for channel in self._all('WHERE user = ?', (user,)):
+            self._stop(service, channel)
+            self._delete(channel)
+
+    def get_stats(self):
+        now = time.time()
+        active = self._connect().execute(
+            'SELECT COUNT(*) FROM channels WHERE resource_id IS NOT NULL AND expiration > ?', (now,)
+        ).fetchone()[0]
+        with self._lock:
+            return {**self._stats, 'active_channels': active, 'enabled': bool(self.address)}
+
+    def _claim(self, user, calendar_id, channel):
+        """Reserve (re)opening the calendar's channel for this thread; False if another one holds it"""
+        now = time.time()
+        with self._connect() as conn:
+            if channel is None:
+                # Placeholder row until Google answers
+                cursor = conn.execute(
+                    'INSERT OR IGNORE INTO channels (user, calendar_id, channel_id, token, expiration, claimed_at) '
+                    "VALUES (?, ?, '', '', 0, ?)", (user, calendar_id, now)
+                )
+            else:
+                cursor = conn.execute(
+                    'UPDATE channels SET claimed_at = ? WHERE user = ? AND calendar_id = ? '
+                    'AND (claimed_at IS NULL OR claimed_at < ?)', (now, user, calendar_id, now - CLAIM_TIMEOUT)
+                )
+        return cursor.rowcount == 1
+
+    def _open(self, service, user, calendar_id, previous):
+        channel_id = uuid.uuid4().hex
+        token = secrets.token_urlsafe(24)
+        body = {'id': channel_id, 'type': 'web_hook', 'address': self.address, 'token': token,
+                'params': {'ttl': str(self.ttl)}}
+        try:
+            response = calendar_client.execute(service.events().watch(calendarId=calendar_id, body=body), user)
+        except Exception:
+            # The claim stays, so no worker tries again for CLAIM_TIMEOUT seconds
+            self._count('failures')
+            raise
+
+        # Google answers with the expiration in epoch milliseconds
+        expiration = int(response.get('expiration') or 0) / 1000 or time.time() + self.ttl
+        renewal = previous is not None and previous.resource_id is not None
+        with self._connect() as conn:
+            # A new channel may have missed changes made before it opened, so readers resync once
+            conn.execute(
+                'UPDATE channels SET channel_id = ?, resource_id = ?, token = ?, expiration = ?, '
+                'notified_at = ?, claimed_at = NULL WHERE user = ? AND calendar_id = ?',
+                (channel_id, response['resourceId'], token, expiration,
+                 previous.notified_at if renewal else time.time(), user, calendar_id)
+            )
+        self._count('renewed' if renewal else 'opened')
+        print(f"🔔 {'Renewed' if renewal else 'Opened'} watch channel for {user}/{calendar_id} "
+              f"until {time.strftime('%Y-%m-%d %H:%M', time.gmtime(expiration))} UTC")
+        if renewal:
+            # The new channel already reports changes, so the old one can go
+            self._stop(service, previous)
+        return self.get(user, calendar_id)
+
+    def _stop(self, service, channel):
+        if not channel.resource_id:
+            return
+        try:
+            calendar_client.execute(
+                service.channels().stop(body={'id': channel.channel_id, 'resourceId': channel.resource_id}),
+                channel.user
+            )
+            self._count('stopped')
+        except Exception as e:
+            # Already expired or stopped: Google answers 404
+            if error_status(e) != 404:
+                self._count('failures')
+                print(f"⚠️ Could not stop watch channel {channel.channel_id}: {e}")
+
+    def _renew_forever(self, get_service, interval):
+        while True:
+            try:
+                self.renew_due(get_service)
+            except Exception:
+                traceback.print_exc()
+            time.sleep(interval)
+
+    def _delete(self, channel):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM channels WHERE user = ? AND calendar_id = ? AND channel_id = ?',
+                         (channel.user, channel.calendar_id, channel.channel_id))
+
+    def _one(self, where, params):
+        row = self._connect().execute(f'SELECT {COLUMNS} FROM channels {where}', params).fetchone()
+        return Channel(*row) if row else None
+
+    def _all(self, where, params):
+        return [Channel(*row) for row in self._connect().execute(f'SELECT {COLUMNS} FROM channels {where}', params)]
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _connect(self):
+        """One connection per thread; SQLite connections must not be shared across threads"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            self._local.conn = conn
+        return conn
+
+
+class ResyncQueue:
+    """
+    Runs resync(user, calendar_id) on background threads for notified calendars.
+    Google sends a burst of notifications for a burst of changes; those arriving
+    before the calendar's resync starts share it.
+    """
+
+    def __init__(self, resync, max_workers=RESYNC_WORKERS):
+        self.resync = resync
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='calendar-resync')
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._stats = {'queued': 0, 'coalesced': 0, 'failures': 0}
+
+    def submit(self, user, calendar_id='primary'):
+        """Queue a resync unless one is already waiting; returns whether a new one was queued"""
+        key = (user, calendar_id)
+        with self._lock:
+            if key in self._pending:
+                self._stats['coalesced'] += 1
+                return False
+            self._pending.add(key)
+            self._stats['queued'] += 1
+        self._executor.submit(self._run, key)
+        return True
+
+    def get_stats(self):
+        with self._lock:
+            return {**self._stats, 'pending': len(self._pending)}
+
+    def _run(self, key):
+        with self._lock:
+            # Notifications from here on may be for changes this resync misses
+            self._pending.discard(key)
+        try:
+            self.resync(*key)
+        except Exception as e:
+            with self._lock:
+                self._stats['failures'] += 1
+            print(f"⚠️ Resync of {key[0]}/{key[1]} failed: {e}")